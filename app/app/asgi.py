@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Product reads are served natively on the event loop; the rest as usual
+from product.asgi import AsyncReadHandler  # noqa: E402
+
+application = AsyncReadHandler(fallback=django_application)
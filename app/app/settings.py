@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,15 +81,46 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# DB_POOL=1 swaps in the pooling backend, which hands connections back to
+# a per-process pool when Django closes them; persistent connections
+# (DB_CONN_MAX_AGE seconds) are used otherwise.
+
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql' if DB_POOL
+        else 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0 if DB_POOL
+        else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
+
+# Ping reused connections idle for DB_CONN_HEALTH_CHECK_IDLE seconds before
+# a request and drop dead ones
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1'
+DB_CONN_HEALTH_CHECK_IDLE = int(
+    os.environ.get('DB_CONN_HEALTH_CHECK_IDLE', 10)
+)
+
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 5))
+DB_POOL_MAX_AGE = int(os.environ.get('DB_POOL_MAX_AGE', 1800))
+DB_POOL_CHECK_INTERVAL = int(os.environ.get('DB_POOL_CHECK_INTERVAL', 30))
+DB_POOL_STATS_FLUSH = int(os.environ.get('DB_POOL_STATS_FLUSH', 10))
+
+# Product reads run concurrently under ASGI (`product.asgi`); more wait on
+# the event loop rather than holding threads and database connections
+ASYNC_READ_CONCURRENCY = int(
+    os.environ.get('ASYNC_READ_CONCURRENCY', DB_POOL_MAX_SIZE)
+)
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -96,6 +129,132 @@ DATABASES = {
 # }
 
 
+# SQL instrumentation
+# Per-request query counts and timings exposed as Server-Timing headers and
+# aggregated per view; dump the aggregate with `manage.py query_stats`.
+
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '0') == '1'
+SQL_INSTRUMENTATION_TOP = int(os.environ.get('SQL_INSTRUMENTATION_TOP', 5))
+SQL_INSTRUMENTATION_WINDOW = int(
+    os.environ.get('SQL_INSTRUMENTATION_WINDOW', 500)
+)
+SQL_INSTRUMENTATION_FLUSH = int(
+    os.environ.get('SQL_INSTRUMENTATION_FLUSH', 10)
+)
+SQL_INSTRUMENTATION_DIR = os.environ.get(
+    'SQL_INSTRUMENTATION_DIR',
+    os.path.join(tempfile.gettempdir(), 'sqlstats')
+)
+
+
+# Token authentication cache
+# `user.authentication.CachedTokenAuthentication` keeps tokens in a local
+# LRU and, when AUTH_TOKEN_SHARED_CACHE names a cache alias, in that cache.
+
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 30))
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(
+    os.environ.get('AUTH_TOKEN_SHARED_CACHE_TTL', 300)
+)
+
+
+# Response cache of the public product catalog
+# Serialized pages are kept in a local LRU and, when CATALOG_SHARED_CACHE
+# names a cache alias, in that cache too; see `product.cache`.
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 512))
+CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 60))
+CATALOG_CACHE_STALE_TTL = int(os.environ.get('CATALOG_CACHE_STALE_TTL', 30))
+CATALOG_SHARED_CACHE = os.environ.get('CATALOG_SHARED_CACHE')
+
+
+# Product listing read model
+# The product lists read the denormalized `ProductListing` table, kept in
+# sync by `product.signals`; set PRODUCT_LISTING_READS=0 to read the
+# product tables instead, e.g. while `rebuild_product_listing` runs.
+PRODUCT_LISTING_READS = os.environ.get('PRODUCT_LISTING_READS', '1') == '1'
+
+# Fast list serialization
+# List actions render `values()` rows without model serializers and encode
+# them with orjson when installed; responses are byte-identical either way
+# (see `product.fast`).
+FAST_LIST_SERIALIZATION = \
+    os.environ.get('FAST_LIST_SERIALIZATION', '0') == '1'
+
+# Product search
+# Most terms accepted in a query, and the shortest last term searched as a
+# prefix while the user is still typing; see `product.search`.
+SEARCH_MAX_TERMS = int(os.environ.get('SEARCH_MAX_TERMS', 8))
+SEARCH_MIN_PREFIX = int(os.environ.get('SEARCH_MIN_PREFIX', 2))
+
+# Product facets
+# Upper bounds of the price buckets counted by the `facets` action; a last
+# bucket holds the prices above the highest one.
+PRODUCT_FACET_PRICE_BUCKETS = tuple(
+    int(edge) for edge in
+    os.environ.get('PRODUCT_FACET_PRICE_BUCKETS', '5,10,20,50,100').split(',')
+)
+
+# Product image processing
+# Uploads are stored as-is and rendered into the variants below by the
+# `process_images` worker; set IMAGE_PROCESSING_EAGER=1 to render inline.
+
+PRODUCT_IMAGE_VARIANTS = {'thumb': 150, 'medium': 600, 'large': 1200}
+PRODUCT_IMAGE_FORMATS = ('webp', 'jpeg')
+PRODUCT_IMAGE_QUALITY = int(os.environ.get('PRODUCT_IMAGE_QUALITY', 85))
+IMAGE_PROCESSING_EAGER = os.environ.get('IMAGE_PROCESSING_EAGER', '0') == '1'
+IMAGE_WORKER_PROCESSES = int(os.environ.get('IMAGE_WORKER_PROCESSES', 0))
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_TIMEOUT = 300
+
+# Uploads stream to temporary files (`product.uploads`) and are refused as
+# soon as they pass PRODUCT_IMAGE_MAX_BYTES, or their header shows another
+# format or more than PRODUCT_IMAGE_MAX_PIXELS pixels.
+PRODUCT_IMAGE_MAX_BYTES = int(
+    os.environ.get('PRODUCT_IMAGE_MAX_BYTES', 25 * 1024 * 1024)
+)
+PRODUCT_IMAGE_MAX_PIXELS = int(
+    os.environ.get('PRODUCT_IMAGE_MAX_PIXELS', 50000000)
+)
+PRODUCT_IMAGE_UPLOAD_FORMATS = ('JPEG', 'MPO', 'PNG', 'WEBP', 'GIF')
+
+
+# Bulk product import/export
+# Rows validated and written per transaction, and rows fetched per
+# server-side cursor round trip when exporting.
+
+PRODUCT_IMPORT_CHUNK_SIZE = int(
+    os.environ.get('PRODUCT_IMPORT_CHUNK_SIZE', 1000)
+)
+PRODUCT_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('PRODUCT_EXPORT_CHUNK_SIZE', 2000)
+)
+
+
+# Password hashing
+# The PBKDF2 cost is set per environment; stored hashes with another cost
+# are upgraded on login. Hashing runs on a bounded thread pool per process
+# (`user.hashing`) that answers 429 once PASSWORD_HASH_QUEUE checks wait.
+
+PASSWORD_HASHERS = [
+    'user.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 180000)
+)
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+)
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+PASSWORD_HASH_RETRY_AFTER = 1
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -140,3 +299,32 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
+
+
+# Media delivery
+# `core.media.serve_media` answers conditional and range requests for
+# MEDIA_URL. Set MEDIA_ACCEL_REDIRECT to an nginx `internal` location
+# aliased to MEDIA_ROOT, or MEDIA_X_SENDFILE=1 behind Apache or lighttpd,
+# to let the front server send the bytes. Content-hashed names are cached
+# for a year; other files for MEDIA_MAX_AGE seconds.
+
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_X_SENDFILE = os.environ.get('MEDIA_X_SENDFILE', '0') == '1'
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 3600))
+
+# Product images are stored once per content (`core.storage`); `gc_media`
+# removes files left without references for MEDIA_GC_GRACE seconds.
+MEDIA_GC_GRACE = int(os.environ.get('MEDIA_GC_GRACE', 3600))
+
+
+# Pagination of the product API lists
+# Default page size and hard cap for the `page_size` query parameter
+
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 25))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 100))
+
+# Most IDs accepted by the `tags` and `categories` list filters
+API_MAX_FILTER_IDS = int(os.environ.get('API_MAX_FILTER_IDS', 100))
+
+# Most items accepted by the bulk tag and category endpoints
+API_MAX_BULK_ITEMS = int(os.environ.get('API_MAX_BULK_ITEMS', 500))
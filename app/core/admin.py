@@ -29,3 +29,4 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Tag)
 admin.site.register(models.Category)
 admin.site.register(models.Product)
+admin.site.register(models.ImageJob)
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core.db.health import check_connections, mark_idle
+        request_started.connect(
+            check_connections, dispatch_uid='core.db.check_connections'
+        )
+        request_finished.connect(
+            mark_idle, dispatch_uid='core.db.mark_idle'
+        )
@@ -0,0 +1,222 @@
+import asyncio
+import contextlib
+import json
+import math
+import random
+import threading
+import time
+
+from django.db import connection
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment
+)
+
+
+@contextlib.contextmanager
+def throwaway_database(keepdb=False):
+    """Run a benchmark against fresh `test_*` databases
+
+    Uses the same machinery as `manage.py test`, so benchmarks never
+    touch real data and run against the configured database backend.
+    """
+    setup_test_environment()
+    old_config = setup_databases(
+        verbosity=0, interactive=False, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+class Timer:
+    # Context manager measuring wall clock seconds
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.start
+
+
+def rate(count, seconds):
+    # Items per second, rounded for reports
+    return round(count / seconds, 1) if seconds else None
+
+
+def sample_rows(count, tags, categories, tags_per_product, seed=None):
+    """Generate NDJSON lines resembling a supplier catalog"""
+    rng = random.Random(count if seed is None else seed)
+    tag_names = [f'tag-{i}' for i in range(tags)]
+    category_names = [f'category-{i}' for i in range(categories)]
+    for i in range(count):
+        yield json.dumps({
+            'title': f'Product {i}',
+            'time_minutes': rng.randint(1, 120),
+            'price': f'{rng.randint(100, 99999) / 100:.2f}',
+            'link': f'https://example.com/p/{i}',
+            'categories': rng.choice(category_names),
+            'tags': rng.sample(tag_names, min(tags_per_product, tags)),
+        })
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an unsorted list
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def run_concurrent(request, total, concurrency, setup=None):
+    """Call `request(state)` `total` times from `concurrency` threads
+
+    `setup()` builds the per-thread state, typically an API client.
+    Each call is timed and its database queries counted on the calling
+    thread's connection. Returns `(samples, seconds)` where each sample
+    is `(seconds, queries, ok)`.
+    """
+    samples = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        state = setup() if setup else None
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(count):
+                while True:
+                    with lock:
+                        if next(counter, None) is None:
+                            break
+                    queries = 0
+                    start = time.perf_counter()
+                    try:
+                        ok = request(state)
+                    except Exception:
+                        ok = False
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        samples.append((elapsed, queries, ok))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return samples, timer.seconds
+
+
+def summarize(samples, seconds):
+    """Latency percentiles, throughput and query counts of a run"""
+    latencies = [elapsed * 1000 for elapsed, _, ok in samples if ok]
+    queries = [count for _, count, ok in samples if ok]
+
+    def ms(pct):
+        value = percentile(latencies, pct)
+        return round(value, 2) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, ok in samples if not ok),
+        'p50_ms': ms(50),
+        'p95_ms': ms(95),
+        'p99_ms': ms(99),
+        'requests_per_second': rate(len(samples), seconds),
+        'queries_per_request': round(sum(queries) / len(queries), 2)
+        if queries else None,
+    }
+
+
+def find_regressions(report, baseline, max_regression):
+    """Compare two `bench_api` reports scenario by scenario
+
+    Latency and throughput may move by `max_regression` percent before
+    they count; query counts are deterministic, so any increase does,
+    as does any new error.
+    """
+    problems = []
+    allowed = 1 + max_regression / 100
+    for name, current in report['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if before[metric] and current[metric] and \
+                    current[metric] > before[metric] * allowed:
+                problems.append(
+                    f'{name}: {metric} {before[metric]} -> {current[metric]}'
+                )
+        if before['requests_per_second'] and \
+                current['requests_per_second'] and \
+                current['requests_per_second'] * allowed < \
+                before['requests_per_second']:
+            problems.append(
+                f'{name}: requests_per_second '
+                f'{before["requests_per_second"]} -> '
+                f'{current["requests_per_second"]}'
+            )
+        if (current['queries_per_request'] or 0) > \
+                (before['queries_per_request'] or 0):
+            problems.append(
+                f'{name}: queries_per_request '
+                f'{before["queries_per_request"]} -> '
+                f'{current["queries_per_request"]}'
+            )
+        if current['errors'] > before['errors']:
+            problems.append(
+                f'{name}: errors {before["errors"]} -> {current["errors"]}'
+            )
+
+    return problems
+
+
+async def asgi_request(app, path, method='GET', query_string=b'',
+                       headers=(), send_delay=0):
+    """Call an ASGI app like a client, optionally one that reads slowly
+
+    Each body message takes `send_delay` seconds to be accepted, as when
+    the client's socket buffer is full. Returns `(status, headers,
+    body)`.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(b'host', b'testserver')] + list(headers),
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and send_delay:
+            await asyncio.sleep(send_delay)
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), body
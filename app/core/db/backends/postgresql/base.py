@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.base import Database
+
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool, registry
+
+
+def ping(connection):
+    # Cheapest round trip proving the server still answers
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except Database.Error:
+        return False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend borrowing connections from a per-process pool
+
+    Closing a connection hands it back to the pool instead of ending
+    the session, so use it with `CONN_MAX_AGE = 0`: every request checks
+    a connection out and returns it when it finishes. Pool sizes and
+    timeouts come from the `DB_POOL_*` settings.
+    """
+
+    def pool(self, conn_params):
+        return registry.get(self.alias, lambda: ConnectionPool(
+            connect=lambda: Database.connect(**conn_params),
+            is_usable=ping,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            timeout=settings.DB_POOL_TIMEOUT,
+            max_age=settings.DB_POOL_MAX_AGE,
+            check_interval=settings.DB_POOL_CHECK_INTERVAL,
+        ))
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.pool(conn_params)
+        connection = self._pool.get()
+
+        # As in the parent class, read or apply the isolation level
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        status = connection.get_transaction_status()
+        broken = bool(connection.closed) or \
+            status == extensions.TRANSACTION_STATUS_UNKNOWN
+        if not broken and status != extensions.TRANSACTION_STATUS_IDLE:
+            # Never hand a connection inside a transaction to the next user
+            try:
+                connection.rollback()
+            except Database.Error:
+                broken = True
+        self._pool.put(connection, broken=broken)
+        registry.maybe_flush()
@@ -0,0 +1,44 @@
+import time
+import weakref
+
+from django.conf import settings
+from django.db import connections
+
+from core.db.pool import registry
+
+
+# When each connection last finished serving a request
+_idle_since = weakref.WeakKeyDictionary()
+
+
+def check_connections(**kwargs):
+    """Drop persistent connections that stopped answering
+
+    Connected to `request_started`, so a connection the server closed
+    while it sat idle between requests is replaced before the view
+    runs instead of failing its first query. Only connections idle for
+    at least DB_CONN_HEALTH_CHECK_IDLE seconds are probed; busy ones
+    skip the round trip.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        idle_since = _idle_since.get(connection)
+        if idle_since is not None and \
+                now - idle_since < settings.DB_CONN_HEALTH_CHECK_IDLE:
+            continue
+        if not connection.is_usable():
+            connection.close()
+            registry.record_drop(connection.alias)
+    registry.maybe_flush()
+
+
+def mark_idle(**kwargs):
+    # Connected to `request_finished`
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            _idle_since[connection] = now
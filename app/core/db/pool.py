@@ -0,0 +1,234 @@
+import atexit
+import collections
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of raw DB-API connections
+
+    `connect()` opens a new connection and `is_usable(connection)` pings
+    one. Idle connections are handed out most recently used first and
+    are pinged when they sat idle for more than `check_interval`
+    seconds; broken ones are replaced, counted as reconnects. At most
+    `max_size` connections are open; further checkouts wait up to
+    `timeout` seconds. Connections older than `max_age` are retired.
+    """
+
+    def __init__(self, connect, is_usable, max_size=10, timeout=5,
+                 max_age=None, check_interval=30):
+        self.connect = connect
+        self.is_usable = is_usable
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._idle = collections.deque()
+        self._born = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = collections.Counter()
+
+    def _take(self):
+        # Pop an idle connection, or reserve a slot for a new one (None)
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No connection free after {self.timeout}s '
+                        f'({self.max_size} in use)'
+                    )
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                start = time.monotonic()
+                self._cond.wait(remaining)
+                self._stats['wait_ms'] += (time.monotonic() - start) * 1000
+
+    def get(self):
+        """Check a connection out of the pool"""
+        while True:
+            entry = self._take()
+            if entry is None:
+                try:
+                    connection = self.connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._born[id(connection)] = time.monotonic()
+                    self._stats['created'] += 1
+                    self._stats['checkouts'] += 1
+                return connection
+
+            connection, last_used = entry
+            now = time.monotonic()
+            if self._expired(connection, now):
+                self._discard(connection, 'expired')
+                continue
+            if now - last_used >= self.check_interval and \
+                    not self.is_usable(connection):
+                self._discard(connection, 'reconnects')
+                continue
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return connection
+
+    def put(self, connection, broken=False):
+        """Return a connection; broken or expired ones are closed"""
+        if broken:
+            self._discard(connection, 'reconnects')
+        elif self._expired(connection, time.monotonic()):
+            self._discard(connection, 'expired')
+        else:
+            with self._cond:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+
+    def _expired(self, connection, now):
+        born = self._born.get(id(connection), now)
+        return self.max_age is not None and now - born >= self.max_age
+
+    def _discard(self, connection, reason):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._born.pop(id(connection), None)
+            self._size -= 1
+            self._stats[reason] += 1
+            self._stats['closed'] += 1
+            self._cond.notify()
+
+    def close_all(self):
+        # Close the idle connections, e.g. after forking
+        with self._cond:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection, 'closed_idle')
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                name: 0 for name in (
+                    'checkouts', 'waits', 'timeouts', 'created', 'closed',
+                    'reconnects', 'expired'
+                )
+            }
+            stats.update(self._stats)
+            stats.pop('closed_idle', None)
+            stats['wait_ms'] = round(stats.get('wait_ms', 0), 3)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            })
+        return stats
+
+
+class PoolRegistry:
+    """Per-process pools by database alias and their statistics
+
+    Like the SQL statistics, snapshots are written to
+    `SQL_INSTRUMENTATION_DIR` so the `db_pool_stats` command can merge
+    the workers' numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._drops = collections.Counter()
+        self._last_flush = time.monotonic()
+
+    def get(self, alias, factory):
+        # Return the pool of `alias`, creating it with `factory()` once
+        with self._lock:
+            pool = self._pools.get(alias)
+            if pool is None:
+                pool = self._pools[alias] = factory()
+            return pool
+
+    def record_drop(self, alias):
+        # A persistent connection failed its pre-request health check
+        with self._lock:
+            self._drops[alias] += 1
+
+    def snapshot(self):
+        with self._lock:
+            pools = dict(self._pools)
+            drops = dict(self._drops)
+        snapshot = {alias: pool.stats() for alias, pool in pools.items()}
+        for alias, count in drops.items():
+            snapshot.setdefault(alias, {})['health_check_drops'] = count
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close_all()
+            self._pools.clear()
+            self._drops.clear()
+
+    def maybe_flush(self):
+        # Write the snapshot out at most once per flush interval
+        now = time.monotonic()
+        if now - self._last_flush < settings.DB_POOL_STATS_FLUSH:
+            return
+        self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        snapshot = self.snapshot()
+        if not snapshot:
+            return
+        directory = settings.SQL_INSTRUMENTATION_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'dbpool-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(snapshot, fp)
+        os.replace(tmp_path, path)
+
+
+registry = PoolRegistry()
+atexit.register(registry.flush)
+
+
+def load_snapshots(directory):
+    """Sum the pool statistics written by every worker process"""
+    merged = {}
+    for path in glob.glob(os.path.join(directory, 'dbpool-*.json')):
+        with open(path) as fp:
+            try:
+                snapshot = json.load(fp)
+            except ValueError:
+                continue
+        for alias, stats in snapshot.items():
+            totals = merged.setdefault(alias, collections.Counter())
+            totals.update(stats)
+            totals['workers'] += 1
+
+    return {alias: dict(totals) for alias, totals in merged.items()}
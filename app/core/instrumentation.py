@@ -0,0 +1,240 @@
+import atexit
+import collections
+import glob
+import heapq
+import json
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape so repeated queries compare equal"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def view_name(view_func, method):
+    """Return a readable name like `ProductViewset.list` for a view"""
+    cls = getattr(view_func, 'cls', None) or \
+        getattr(view_func, 'view_class', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__qualname__}'
+
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        action = actions.get(method.lower(), method.lower())
+        return f'{cls.__name__}.{action}'
+
+    return cls.__name__
+
+
+class QueryRecorder:
+    """Execute wrapper timing every statement run during one request"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.queries.append((sql, duration))
+
+    def summary(self, top=5):
+        # Summarise the recorded statements for reporting
+        counts = collections.Counter(
+            fingerprint(sql) for sql, _ in self.queries
+        )
+        slowest = heapq.nlargest(top, self.queries, key=lambda q: q[1])
+
+        return {
+            'queries': len(self.queries),
+            'db_ms': sum(duration for _, duration in self.queries),
+            'duplicates': {
+                sql: count for sql, count in counts.items() if count > 1
+            },
+            'slowest': [
+                {'sql': fingerprint(sql), 'ms': round(duration, 3)}
+                for sql, duration in slowest
+            ],
+        }
+
+
+def server_timing(summary):
+    """Format a request summary as a `Server-Timing` header value"""
+    duplicates = sum(count - 1 for count in summary['duplicates'].values())
+    metrics = [
+        'db;dur={:.2f};desc="{} queries, {} duplicates"'.format(
+            summary['db_ms'], summary['queries'], duplicates
+        )
+    ]
+    for index, query in enumerate(summary['slowest'], start=1):
+        metrics.append('db-slow-{};dur={:.2f}'.format(index, query['ms']))
+
+    return ', '.join(metrics)
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * len(ordered))))
+    return ordered[index]
+
+
+class ViewStats:
+    """Rolling window of request summaries for one view"""
+
+    def __init__(self, window, top):
+        self.top = top
+        self.requests = 0
+        self.samples = collections.deque(maxlen=window)
+        self.duplicates = collections.Counter()
+        self.slowest = []
+
+    def add(self, summary):
+        self.requests += 1
+        self.samples.append((summary['queries'], summary['db_ms']))
+        self.duplicates.update(summary['duplicates'])
+        for query in summary['slowest']:
+            item = (query['ms'], query['sql'])
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heappushpop(self.slowest, item)
+
+    def as_dict(self):
+        queries = [q for q, _ in self.samples]
+        db_ms = [ms for _, ms in self.samples]
+        window = len(self.samples) or 1
+
+        return {
+            'requests': self.requests,
+            'window': len(self.samples),
+            'queries_avg': round(sum(queries) / window, 2),
+            'queries_max': max(queries, default=0),
+            'db_ms_avg': round(sum(db_ms) / window, 3),
+            'db_ms_p95': round(_percentile(db_ms, 95), 3),
+            'duplicates': dict(self.duplicates.most_common(self.top)),
+            'slowest': [
+                {'sql': sql, 'ms': ms}
+                for ms, sql in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+class StatsRegistry:
+    """Per-process aggregate of query statistics keyed by view name
+
+    The registry lives in worker memory; it is periodically written to
+    `SQL_INSTRUMENTATION_DIR` so the `query_stats` command can read it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, name, summary):
+        with self._lock:
+            stats = self._views.get(name)
+            if stats is None:
+                stats = self._views[name] = ViewStats(
+                    settings.SQL_INSTRUMENTATION_WINDOW,
+                    settings.SQL_INSTRUMENTATION_TOP
+                )
+            stats.add(summary)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: stats.as_dict() for name, stats in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def maybe_flush(self):
+        # Write the snapshot out at most once per flush interval
+        now = time.monotonic()
+        if now - self._last_flush < settings.SQL_INSTRUMENTATION_FLUSH:
+            return
+        self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        if not self._views:
+            return
+        directory = settings.SQL_INSTRUMENTATION_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'sqlstats-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(self.snapshot(), fp)
+        os.replace(tmp_path, path)
+
+
+registry = StatsRegistry()
+atexit.register(registry.flush)
+
+
+def load_snapshots(directory):
+    """Merge the snapshots written by every worker process"""
+    merged = {}
+    for path in glob.glob(os.path.join(directory, 'sqlstats-*.json')):
+        with open(path) as fp:
+            try:
+                snapshot = json.load(fp)
+            except ValueError:
+                continue
+        for name, stats in snapshot.items():
+            current = merged.get(name)
+            if current is None:
+                merged[name] = stats
+                continue
+            merged[name] = _merge(current, stats)
+
+    return merged
+
+
+def _merge(first, second):
+    window = first['window'] + second['window'] or 1
+    duplicates = collections.Counter(first['duplicates'])
+    duplicates.update(second['duplicates'])
+    top = max(len(first['slowest']), len(second['slowest']))
+    slowest = sorted(
+        first['slowest'] + second['slowest'],
+        key=lambda query: query['ms'],
+        reverse=True
+    )
+
+    def weighted(key):
+        return round((
+            first[key] * first['window'] + second[key] * second['window']
+        ) / window, 3)
+
+    return {
+        'requests': first['requests'] + second['requests'],
+        'window': first['window'] + second['window'],
+        'queries_avg': weighted('queries_avg'),
+        'queries_max': max(first['queries_max'], second['queries_max']),
+        'db_ms_avg': weighted('db_ms_avg'),
+        'db_ms_p95': max(first['db_ms_p95'], second['db_ms_p95']),
+        'duplicates': dict(duplicates),
+        'slowest': slowest[:top],
+    }
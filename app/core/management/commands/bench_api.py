@@ -0,0 +1,215 @@
+import io
+import json
+import random
+import tempfile
+import threading
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import (
+    find_regressions, run_concurrent, sample_rows, summarize,
+    throwaway_database
+)
+from core.models import Product
+from product.bulk import ProductImporter, iter_ndjson
+
+
+PASSWORD = 'benchmark-password'
+
+
+def sample_image():
+    # A small JPEG upload body, rebuilt per request like a real client
+    data = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 80, 40)).save(data, 'JPEG')
+    data.seek(0)
+    data.name = 'bench.jpg'
+    return data
+
+
+class Scenarios:
+    """The API requests driven by `bench_api`, one method per route
+
+    Each method takes a per-thread `APIClient` and returns whether the
+    response had the expected status.
+    """
+
+    def __init__(self, users, seed=0):
+        self.users = users
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def pick(self, choices=None):
+        with self._lock:
+            return self.rng.choice(choices or self.users)
+
+    def authenticate(self, client):
+        user, token, _ = self.pick()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return user
+
+    def myproducts_list(self, client):
+        self.authenticate(client)
+        return client.get(
+            reverse('product:myproducts-list')
+        ).status_code == 200
+
+    def products_list(self, client):
+        client.credentials()
+        return client.get(reverse('product:products-list')).status_code == 200
+
+    def products_search(self, client):
+        # Typeahead over the catalog, as a client types a tag name
+        client.credentials()
+        with self._lock:
+            query = f'tag {self.rng.randint(0, 9)}'
+        return client.get(
+            reverse('product:products-search'), {'q': query}
+        ).status_code == 200
+
+    def tag_list(self, client):
+        self.authenticate(client)
+        return client.get(reverse('product:tag-list')).status_code == 200
+
+    def token(self, client):
+        client.credentials()
+        user, _, _ = self.pick()
+        return client.post(reverse('user:token'), {
+            'email': user.email, 'password': PASSWORD
+        }).status_code == 200
+
+    def upload_image(self, client):
+        user, token, product_ids = self.pick()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        url = reverse(
+            'product:myproducts-upload-image',
+            args=[self.pick(product_ids)]
+        )
+        return client.post(
+            url, {'image': sample_image()}, format='multipart'
+        ).status_code == 200
+
+
+SCENARIOS = {
+    'myproducts-list': Scenarios.myproducts_list,
+    'products-list': Scenarios.products_list,
+    'products-search': Scenarios.products_search,
+    'tag-list': Scenarios.tag_list,
+    'token': Scenarios.token,
+    'upload-image': Scenarios.upload_image,
+}
+
+
+class Command(BaseCommand):
+    # Django command load testing the product and user APIs in-process
+    help = 'Benchmark API latency, throughput and queries per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--products', type=int, default=200,
+                            help='Products per user')
+        parser.add_argument('--tags', type=int, default=50,
+                            help='Distinct tags per user')
+        parser.add_argument('--categories', type=int, default=10,
+                            help='Distinct categories per user')
+        parser.add_argument('--tags-per-product', type=int, default=3)
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Scenario to run; may be repeated, defaults to all'
+        )
+        parser.add_argument('--output', help='Also write the report here')
+        parser.add_argument(
+            '--baseline', help='Report to compare against'
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=20,
+            help='Percent latency or throughput loss tolerated against '
+                 'the baseline'
+        )
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as fp:
+                    baseline = json.load(fp)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read the baseline: {exc}')
+
+        with throwaway_database(keepdb=options['keepdb']), \
+                tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media):
+            report = self.run(options)
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as fp:
+                fp.write(output + '\n')
+
+        if baseline is not None:
+            problems = find_regressions(
+                report, baseline, options['max_regression']
+            )
+            if problems:
+                raise CommandError(
+                    'Regressions against the baseline:\n  ' +
+                    '\n  '.join(problems)
+                )
+
+    def seed(self, options):
+        # Create users with tokens and their catalogs, returned as
+        # `(user, token key, product ids)` triples
+        users = []
+        for i in range(options['users']):
+            user = get_user_model().objects.create_user(
+                f'bench{i}@example.com', PASSWORD
+            )
+            ProductImporter(user).run(iter_ndjson(sample_rows(
+                options['products'], options['tags'], options['categories'],
+                options['tags_per_product'], seed=i
+            )))
+            users.append((
+                user,
+                Token.objects.create(user=user).key,
+                list(Product.objects.filter(user=user)
+                     .values_list('id', flat=True)),
+            ))
+        return users
+
+    def run(self, options):
+        users = self.seed(options)
+        scenarios = Scenarios(users)
+        report = {
+            'dataset': {
+                'users': options['users'],
+                'products_per_user': options['products'],
+                'tags_per_user': options['tags'],
+                'categories_per_user': options['categories'],
+                'tags_per_product': options['tags_per_product'],
+            },
+            'concurrency': options['concurrency'],
+            'scenarios': {},
+        }
+        for name in options['scenario'] or SCENARIOS:
+            scenario = SCENARIOS[name]
+            samples, seconds = run_concurrent(
+                lambda client: scenario(scenarios, client),
+                options['requests'],
+                options['concurrency'],
+                setup=APIClient
+            )
+            report['scenarios'][name] = summarize(samples, seconds)
+
+        return report
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import reverse
+
+from core.benchmark import Timer, asgi_request, summarize, throwaway_database
+from core.management.commands.bench_api import Command as BenchApiCommand
+from product.asgi import AsyncReadHandler
+
+
+def wsgi_request(handler, path, token, delay):
+    # A WSGI request whose client drains the body slowly; the worker
+    # thread is blocked writing until it does
+    environ = RequestFactory().get(
+        path, HTTP_AUTHORIZATION=f'Token {token}'
+    ).environ
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'] = int(status.split()[0])
+
+    body = handler(environ, start_response)
+    try:
+        for _ in body:
+            time.sleep(delay)
+    finally:
+        body.close()
+    return result['status']
+
+
+class Command(BaseCommand):
+    # Django command comparing thread-per-request serving with the ASGI
+    # read path while slow clients hold their connections
+    help = 'Benchmark product reads under slow-client load, WSGI vs ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slow-clients', type=int, default=100)
+        parser.add_argument('--client-delay', type=float, default=0.5,
+                            help='Seconds a slow client takes to read')
+        parser.add_argument('--fast-clients', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Worker threads available to each mode')
+        parser.add_argument('--products', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            report = self.run(options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, options):
+        users = BenchApiCommand().seed({
+            'users': 1, 'products': options['products'], 'tags': 20,
+            'categories': 5, 'tags_per_product': 3,
+        })
+        token = users[0][1]
+        path = reverse('product:myproducts-list')
+        headers = [(b'authorization', f'Token {token}'.encode())]
+
+        wsgi = WSGIHandler()
+        modes = {
+            'wsgi-threads': lambda delay: asyncio.get_running_loop()
+            .run_in_executor(None, wsgi_request, wsgi, path, token, delay),
+            'asgi-stock': lambda delay, app=ASGIHandler(): asgi_request(
+                app, path, headers=headers, send_delay=delay
+            ),
+            'asgi-read': lambda delay, app=AsyncReadHandler(): asgi_request(
+                app, path, headers=headers, send_delay=delay
+            ),
+        }
+
+        report = {
+            'slow_clients': options['slow_clients'],
+            'client_delay': options['client_delay'],
+            'fast_clients': options['fast_clients'],
+            'threads': options['threads'],
+            'modes': {},
+        }
+        for name, request in modes.items():
+            report['modes'][name] = asyncio.run(
+                self.drive(request, options)
+            )
+        return report
+
+    async def drive(self, request, options):
+        # Start the slow clients, then time fast ones arriving behind them
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=options['threads'])
+        )
+
+        async def timed(delay):
+            start = time.perf_counter()
+            try:
+                result = await request(delay)
+                status = result if isinstance(result, int) else result[0]
+                ok = status == 200
+            except Exception:
+                ok = False
+            return time.perf_counter() - start, 0, ok
+
+        with Timer() as timer:
+            slow = [
+                asyncio.ensure_future(timed(options['client_delay']))
+                for _ in range(options['slow_clients'])
+            ]
+            await asyncio.sleep(0.05)
+            fast = await asyncio.gather(*[
+                timed(0) for _ in range(options['fast_clients'])
+            ])
+            slow = await asyncio.gather(*slow)
+
+        results = {
+            'seconds': round(timer.seconds, 3),
+            'slow': summarize(slow, timer.seconds),
+            'fast': summarize(fast, timer.seconds),
+        }
+        for summary in (results['slow'], results['fast']):
+            del summary['queries_per_request']
+        return results
@@ -0,0 +1,81 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.benchmark import Timer, rate, sample_rows, throwaway_database
+from core.models import Tag, Category, Product
+from product.bulk import ProductImporter, iter_export, iter_ndjson
+from product.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    # Django command measuring bulk import/export throughput
+    help = 'Benchmark bulk product import/export against per-row creates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--baseline-rows', type=int, default=500)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--tags-per-product', type=int, default=3)
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            report = self.run(options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, options):
+        user = get_user_model().objects.create_user(
+            'bench@example.com', 'benchmark'
+        )
+        lines = sample_rows(
+            options['rows'], options['tags'], options['categories'],
+            options['tags_per_product']
+        )
+        importer = ProductImporter(user, chunk_size=options['chunk_size'])
+        with Timer() as bulk_import:
+            imported = importer.run(iter_ndjson(lines))
+
+        with Timer() as export:
+            exported = sum(
+                1 for _ in iter_export(Product.objects.filter(user=user))
+            )
+
+        # The one-at-a-time path taken by ProductViewset.create
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        category = Category.objects.filter(user=user).first()
+        with Timer() as per_row:
+            for i in range(options['baseline_rows']):
+                serializer = ProductSerializer(data={
+                    'title': f'Single {i}',
+                    'time_minutes': 10,
+                    'price': '9.99',
+                    'categories': category.id,
+                    'tags': tag_ids[:options['tags_per_product']],
+                })
+                serializer.is_valid(raise_exception=True)
+                serializer.save(user=user)
+
+        return {
+            'import': {
+                'rows': imported['created'],
+                'seconds': round(bulk_import.seconds, 3),
+                'rows_per_second': rate(imported['created'],
+                                        bulk_import.seconds),
+            },
+            'export': {
+                'rows': exported,
+                'seconds': round(export.seconds, 3),
+                'rows_per_second': rate(exported, export.seconds),
+            },
+            'per_row_create': {
+                'rows': options['baseline_rows'],
+                'seconds': round(per_row.seconds, 3),
+                'rows_per_second': rate(options['baseline_rows'],
+                                        per_row.seconds),
+            },
+        }
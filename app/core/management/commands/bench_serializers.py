@@ -0,0 +1,95 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.benchmark import sample_rows, throwaway_database
+from product.bulk import ProductImporter, iter_ndjson
+
+
+PRODUCT_MODES = {
+    # name: (PRODUCT_LISTING_READS, FAST_LIST_SERIALIZATION)
+    'tables-serializer': (False, False),
+    'tables-fast': (False, True),
+    'listing-serializer': (True, False),
+    'listing-fast': (True, True),
+}
+TAG_MODES = {
+    'serializer': (True, False),
+    'fast': (True, True),
+}
+
+
+class Command(BaseCommand):
+    # Django command measuring the CPU cost of rendering list pages
+    help = 'Benchmark per-item CPU time of product and tag list responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--tags-per-product', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requests timed per mode and endpoint')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            report = self.run(options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, options):
+        user = get_user_model().objects.create_user(
+            'bench@example.com', 'benchmark'
+        )
+        ProductImporter(user).run(iter_ndjson(sample_rows(
+            options['products'], options['tags'], 10,
+            options['tags_per_product']
+        )))
+        client = APIClient()
+        client.force_authenticate(user)
+        page_size = options['page_size']
+        endpoints = {
+            'myproducts-list': (
+                reverse('product:myproducts-list'), PRODUCT_MODES
+            ),
+            'tag-list': (reverse('product:tag-list'), TAG_MODES),
+        }
+
+        report = {'page_size': page_size, 'endpoints': {}}
+        with override_settings(RESPONSE_CACHE_ENABLED=False,
+                               API_MAX_PAGE_SIZE=page_size):
+            for endpoint, (url, modes) in endpoints.items():
+                results = report['endpoints'][endpoint] = {}
+                for mode, (listing, fast) in modes.items():
+                    with override_settings(PRODUCT_LISTING_READS=listing,
+                                           FAST_LIST_SERIALIZATION=fast):
+                        results[mode] = self.measure(
+                            client, url, page_size, options['requests']
+                        )
+        return report
+
+    def measure(self, client, url, page_size, requests):
+        # CPU time per rendered item, database time included on SQLite
+        client.get(url, {'page_size': page_size})
+        items = 0
+        with CaptureQueriesContext(connection) as queries:
+            start = time.process_time()
+            for _ in range(requests):
+                res = client.get(url, {'page_size': page_size})
+                items += len(res.data['results'])
+            seconds = time.process_time() - start
+
+        return {
+            'cpu_us_per_item': round(seconds / items * 1e6, 1)
+            if items else None,
+            'cpu_ms_per_request': round(seconds / requests * 1e3, 2),
+            'queries_per_request': round(
+                len(queries.captured_queries) / requests, 2
+            ),
+        }
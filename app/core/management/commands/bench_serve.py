@@ -0,0 +1,144 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import run_concurrent, summarize, throwaway_database
+from core.management.commands.bench_api import Command as BenchApiCommand
+from core.management.commands.serve import gunicorn_argv
+
+
+ROUTES = {
+    'products-list': '/api/product/products/',
+    'tag-list': '/api/product/tags/',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError('The server exited during startup')
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Nothing listening on port {port}')
+
+
+def http_get(port, path, token=None):
+    """Return a `run_concurrent` request reusing a keep-alive connection"""
+    headers = {'Authorization': f'Token {token}'} if token else {}
+
+    def request(state):
+        if state.get('connection') is None:
+            state['connection'] = HTTPConnection('127.0.0.1', port, 30)
+        try:
+            state['connection'].request('GET', path, headers=headers)
+            response = state['connection'].getresponse()
+            response.read()
+        except Exception:
+            state['connection'].close()
+            state['connection'] = None
+            raise
+        if response.getheader('Connection') == 'close':
+            state['connection'].close()
+            state['connection'] = None
+        return response.status == 200
+
+    return request
+
+
+class Command(BaseCommand):
+    # Django command comparing runserver with the gunicorn serving profile
+    help = 'Benchmark runserver against `manage.py serve` over HTTP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Requests per route and server')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--workers', type=int)
+        parser.add_argument('--products', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            if connection.vendor == 'sqlite' and \
+                    connection.is_in_memory_db():
+                raise CommandError(
+                    'The servers run in other processes and cannot share '
+                    'an in-memory test database; use PostgreSQL.'
+                )
+            report = self.run(options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def servers(self, options):
+        # Command lines of the servers to compare, by name
+        yield 'runserver', lambda port: [
+            sys.executable, 'manage.py', 'runserver', '--noreload',
+            f'127.0.0.1:{port}'
+        ]
+        yield 'gunicorn', lambda port: gunicorn_argv(
+            bind=f'127.0.0.1:{port}', workers=options['workers']
+        )
+
+    def run(self, options):
+        users = BenchApiCommand().seed({
+            'users': 1, 'products': options['products'], 'tags': 50,
+            'categories': 10, 'tags_per_product': 3,
+        })
+        token = users[0][1]
+        env = dict(
+            os.environ,
+            DB_NAME=connection.settings_dict['NAME'],
+            GUNICORN_ACCESS_LOG='/dev/null'
+        )
+
+        report = {'concurrency': options['concurrency'], 'servers': {}}
+        for name, command in self.servers(options):
+            port = free_port()
+            process = subprocess.Popen(
+                command(port), cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_for_port(port, process)
+                results = {}
+                for route, path in ROUTES.items():
+                    samples, seconds = run_concurrent(
+                        http_get(port, path, token),
+                        options['requests'],
+                        options['concurrency'],
+                        setup=dict
+                    )
+                    results[route] = summarize(samples, seconds)
+                    # Queries run in the server, not in this process
+                    del results[route]['queries_per_request']
+                report['servers'][name] = results
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait(30)
+
+        report['speedup'] = {
+            route: round(
+                report['servers']['gunicorn'][route]['requests_per_second'] /
+                report['servers']['runserver'][route]['requests_per_second'],
+                2
+            )
+            for route in ROUTES
+        }
+        return report
@@ -0,0 +1,188 @@
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import Timer, throwaway_database
+from core.models import Product
+from product.views import ProductViewset
+
+
+BOUNDARY = 'BenchUploadBoundary'
+# Django's own upload handlers, or the streaming `ImageUploadHandler`
+MODES = ('stock', 'streaming')
+
+
+def current_rss():
+    # Resident set size of this process in bytes (Linux)
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class RssSampler(threading.Thread):
+    # Background thread recording the peak resident set size
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return max(self.peak, current_rss())
+
+
+def write_body(path, size):
+    # A multipart body holding a JPEG padded to `size` bytes, on disk so
+    # the client side costs no memory
+    buffer = io.BytesIO()
+    Image.new('RGB', (1600, 1200), color='red').save(buffer, 'JPEG')
+    image = buffer.getvalue()
+    padding = b'\0' * (1024 * 1024)
+
+    with open(path, 'wb') as body:
+        body.write(
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="image"; '
+            'filename="photo.jpg"\r\n'
+            'Content-Type: image/jpeg\r\n\r\n'.encode()
+        )
+        body.write(image)
+        remaining = size - len(image)
+        while remaining > 0:
+            body.write(padding[:remaining])
+            remaining -= len(padding)
+        body.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+
+
+def post_upload(handler, path, token, body_path):
+    # Send the body file through the WSGI handler as a client would
+    environ = RequestFactory().post(
+        path, HTTP_AUTHORIZATION=f'Token {token}'
+    ).environ
+    environ['CONTENT_TYPE'] = f'multipart/form-data; boundary={BOUNDARY}'
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'] = int(status.split()[0])
+
+    with open(body_path, 'rb') as body:
+        environ['wsgi.input'] = body
+        environ['CONTENT_LENGTH'] = str(os.path.getsize(body_path))
+        response = handler(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+    return result['status']
+
+
+def measure(mode, targets, body_path, results):
+    # Runs in a forked child, so every mode starts from the same memory
+    if mode == 'stock':
+        ProductViewset.upload_handler_class = None
+    handler = WSGIHandler()
+    statuses = []
+
+    def upload(path, token):
+        try:
+            statuses.append(post_upload(handler, path, token, body_path))
+        except Exception:
+            statuses.append(None)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=upload, args=target) for target in targets
+    ]
+    baseline = current_rss()
+    sampler = RssSampler()
+    sampler.start()
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    peak = sampler.stop()
+
+    results.put({
+        'mode': mode,
+        'uploads': len(targets),
+        'ok': statuses.count(200),
+        'seconds': round(timer.seconds, 3),
+        'baseline_rss_mb': round(baseline / 2 ** 20, 1),
+        'peak_rss_mb': round(peak / 2 ** 20, 1),
+        'peak_growth_mb': round((peak - baseline) / 2 ** 20, 1),
+        'growth_per_upload_kb': round((peak - baseline) / 1024 /
+                                      len(targets), 1),
+    })
+
+
+class Command(BaseCommand):
+    # Django command measuring worker memory under concurrent uploads
+    help = 'Benchmark peak RSS of concurrent product image uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=50,
+                            help='Uploads sent at once, one per thread')
+        parser.add_argument('--size-mb', type=int, default=20)
+        parser.add_argument('--mode', choices=MODES, action='append',
+                            help='Defaults to every mode')
+
+    def handle(self, *args, **options):
+        with throwaway_database(), \
+                tempfile.NamedTemporaryFile(suffix='.body') as body:
+            write_body(body.name, options['size_mb'] * 2 ** 20)
+            report = self.run(options, body.name)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, options, body_path):
+        user = get_user_model().objects.create_user(
+            'bench@example.com', 'benchmark'
+        )
+        token = Token.objects.create(user=user).key
+        Product.objects.bulk_create([
+            Product(user=user, title=f'Product {i}', time_minutes=1, price=1)
+            for i in range(options['uploads'])
+        ])
+        # One product per upload, so uploads never wait on each other
+        targets = [
+            (reverse('product:myproducts-upload-image', args=[pk]), token)
+            for pk in Product.objects.filter(user=user)
+            .values_list('pk', flat=True)
+        ]
+
+        report = {'upload_mb': options['size_mb'], 'modes': {}}
+        context = multiprocessing.get_context('fork')
+        for mode in options['mode'] or MODES:
+            # Children must open their own database connections
+            connections.close_all()
+            results = context.Queue()
+            child = context.Process(
+                target=measure, args=(mode, targets, body_path, results)
+            )
+            child.start()
+            result = results.get()
+            child.join()
+            report['modes'][mode] = result
+        return report
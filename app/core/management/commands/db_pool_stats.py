@@ -0,0 +1,41 @@
+import glob
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db.pool import load_snapshots
+
+
+class Command(BaseCommand):
+    # Django command to dump the connection pool statistics of the workers
+    help = 'Report connection pool checkouts, waits and reconnects'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Print the raw merged snapshot as JSON'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete the worker snapshots after reporting'
+        )
+
+    def handle(self, *args, **options):
+        directory = settings.SQL_INSTRUMENTATION_DIR
+        stats = load_snapshots(directory)
+
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+        elif not stats:
+            self.stdout.write('No connection statistics recorded yet.')
+        else:
+            for alias, values in sorted(stats.items()):
+                self.stdout.write(f'{alias}:')
+                for name, value in sorted(values.items()):
+                    self.stdout.write(f'    {name:<20} {value}')
+
+        if options['reset']:
+            for path in glob.glob(os.path.join(directory, 'dbpool-*')):
+                os.remove(path)
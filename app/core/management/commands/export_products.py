@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Product
+from product.bulk import PARSERS, iter_export
+
+
+class Command(BaseCommand):
+    # Django command to stream products out as NDJSON or CSV
+    help = 'Export products as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='File to write, or - for stdout'
+        )
+        parser.add_argument('--user', help='Only export this user (email)')
+        parser.add_argument(
+            '--format', choices=sorted(PARSERS), default='ndjson'
+        )
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user with email {options["user"]}')
+            queryset = queryset.filter(user=user)
+
+        chunks = iter_export(
+            queryset, options['format'], options['chunk_size']
+        )
+        if options['path'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+        else:
+            with open(options['path'], 'w', newline='') as fp:
+                fp.writelines(chunks)
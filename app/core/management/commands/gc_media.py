@@ -0,0 +1,137 @@
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import MediaBlob, Product, ProductImageVariant
+from core.storage import TEMP_PREFIX, content_storage
+
+
+# Directories `--scan` looks through for files without a blob row
+MEDIA_DIRS = ('uploads/product',)
+
+
+def references(names):
+    # Return {name: number of rows referring to it} for the given names
+    counts = {}
+    columns = (
+        Product.objects.filter(image__in=names)
+        .values_list('image', flat=True),
+        ProductImageVariant.objects.filter(file__in=names)
+        .values_list('file', flat=True),
+    )
+    for column in columns:
+        for name in column:
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+class Command(BaseCommand):
+    # Django command removing media files nothing refers to, in batches
+    help = 'Remove media blobs no product or image variant refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--grace', type=int,
+                            default=settings.MEDIA_GC_GRACE,
+                            help='Seconds an unreferenced blob is kept')
+        parser.add_argument('--scan', action='store_true',
+                            help='Also register files without a blob row, '
+                                 'to be removed by a later run')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        dry_run = options['dry_run']
+
+        if options['scan']:
+            count = self.scan(options['batch_size'], cutoff, dry_run)
+            self.stdout.write(f'Found {count} untracked files')
+
+        removed, repaired = self.collect(options['batch_size'], cutoff,
+                                         dry_run)
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} blobs, repaired {repaired} reference counts'
+        ))
+
+    def scan(self, batch_size, cutoff, dry_run):
+        # Register stray files, and delete uploads abandoned mid-hashing
+        found = 0
+        batch = []
+        for directory in MEDIA_DIRS:
+            root = content_storage.path(directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    if filename.startswith(TEMP_PREFIX):
+                        modified = datetime.fromtimestamp(
+                            os.path.getmtime(path), timezone.utc
+                        )
+                        if modified < cutoff and not dry_run:
+                            os.remove(path)
+                        continue
+                    batch.append(os.path.relpath(
+                        path, content_storage.location
+                    ).replace(os.sep, '/'))
+                    if len(batch) == batch_size:
+                        found += self.register(batch, dry_run)
+                        batch = []
+        return found + self.register(batch, dry_run)
+
+    def register(self, names, dry_run):
+        known = set(
+            MediaBlob.objects.filter(name__in=names)
+            .values_list('name', flat=True)
+        )
+        untracked = [name for name in names if name not in known]
+        if untracked and not dry_run:
+            MediaBlob.objects.bulk_create(
+                [MediaBlob(name=name) for name in untracked],
+                ignore_conflicts=True
+            )
+        return len(untracked)
+
+    def collect(self, batch_size, cutoff, dry_run):
+        # Walk the unreferenced blobs by name, one batch at a time
+        removed = repaired = 0
+        last = ''
+        while True:
+            names = list(
+                MediaBlob.objects.filter(
+                    refcount=0, updated_at__lt=cutoff, name__gt=last
+                ).order_by('name').values_list('name', flat=True)[:batch_size]
+            )
+            if not names:
+                return removed, repaired
+            last = names[-1]
+
+            # Counts that drifted to zero are repaired, never trusted
+            counts = references(names)
+            repaired += len(counts)
+            if not dry_run:
+                for name, count in counts.items():
+                    MediaBlob.objects.filter(name=name).update(refcount=count)
+
+            garbage = [name for name in names if name not in counts]
+            if dry_run:
+                removed += len(garbage)
+            else:
+                removed += self.remove(garbage, cutoff)
+
+    def remove(self, names, cutoff):
+        # Rows stay locked while their files go, so an upload of the same
+        # content waits for us and then writes the file again
+        with transaction.atomic():
+            doomed = list(
+                MediaBlob.objects.select_for_update().filter(
+                    name__in=names, refcount=0, updated_at__lt=cutoff
+                ).values_list('name', flat=True)
+            )
+            for name in doomed:
+                content_storage.delete(name)
+            MediaBlob.objects.filter(name__in=doomed).delete()
+        return len(doomed)
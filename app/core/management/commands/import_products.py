@@ -0,0 +1,51 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from product.bulk import PARSERS, ProductImporter
+
+
+class Command(BaseCommand):
+    # Django command to bulk import products from NDJSON or CSV
+    help = 'Import products for a user from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument(
+            '--user', required=True,
+            help='Email of the user owning the imported products'
+        )
+        parser.add_argument(
+            '--format', choices=sorted(PARSERS),
+            help='Input format; guessed from the file extension by default'
+        )
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        importer = ProductImporter(user, chunk_size=options['chunk_size'])
+
+        if path == '-':
+            report = importer.run(PARSERS[fmt](sys.stdin))
+        else:
+            with open(path, newline='') as fp:
+                report = importer.run(PARSERS[fmt](fp))
+
+        for error in report['errors']:
+            self.stderr.write(f'line {error["line"]}: '
+                              f'{json.dumps(error["errors"])}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report["created"]} products '
+            f'({report["failed"]} failed) in {report["seconds"]}s, '
+            f'{report["rows_per_second"]} rows/s'
+        ))
@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from product.images import run_worker
+
+
+class Command(BaseCommand):
+    # Django command to render product image variants from the job table
+    help = 'Process queued product images on a local pool of processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int,
+            default=settings.IMAGE_WORKER_PROCESSES or os.cpu_count(),
+            help='Number of worker processes rendering images'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=20,
+            help='Number of jobs claimed from the queue at a time'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing product images...')
+        handled = run_worker(
+            options['processes'],
+            options['batch_size'],
+            options['poll_interval'],
+            once=options['once']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Processed {handled} jobs'))
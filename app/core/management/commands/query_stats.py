@@ -0,0 +1,60 @@
+import glob
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.instrumentation import load_snapshots
+
+
+class Command(BaseCommand):
+    # Django command to dump the per-view SQL statistics of the workers
+    help = 'Report query counts and DB time per view from running workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Print the raw merged snapshot as JSON'
+        )
+        parser.add_argument(
+            '--sort', default='queries_avg',
+            choices=('queries_avg', 'queries_max', 'db_ms_avg',
+                     'db_ms_p95', 'requests'),
+            help='Column to sort views by (descending)'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete the worker snapshots after reporting'
+        )
+
+    def handle(self, *args, **options):
+        directory = settings.SQL_INSTRUMENTATION_DIR
+        stats = load_snapshots(directory)
+
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+        elif not stats:
+            self.stdout.write('No query statistics recorded yet.')
+        else:
+            self.write_report(stats, options['sort'])
+
+        if options['reset']:
+            for path in glob.glob(os.path.join(directory, 'sqlstats-*')):
+                os.remove(path)
+
+    def write_report(self, stats, sort):
+        # Print one summary line per view followed by its hot spots
+        views = sorted(stats.items(), key=lambda i: i[1][sort], reverse=True)
+        self.stdout.write('{:<40} {:>8} {:>8} {:>8} {:>10} {:>10}'.format(
+            'view', 'requests', 'q avg', 'q max', 'ms avg', 'ms p95'
+        ))
+        for name, view in views:
+            self.stdout.write('{:<40} {:>8} {:>8} {:>8} {:>10} {:>10}'.format(
+                name, view['requests'], view['queries_avg'],
+                view['queries_max'], view['db_ms_avg'], view['db_ms_p95']
+            ))
+            for sql, count in view['duplicates'].items():
+                self.stdout.write(f'    duplicate x{count}: {sql}')
+            for query in view['slowest']:
+                self.stdout.write(f'    slow {query["ms"]}ms: {query["sql"]}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from product.listing import rebuild_listings
+
+
+class Command(BaseCommand):
+    # Django command to rebuild the product listing table from scratch
+    help = 'Rebuild the denormalized product listing rows of every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding product listings...')
+        count = rebuild_listings(options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} listings'))
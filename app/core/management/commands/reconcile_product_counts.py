@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import Tag, Category, Product
+
+
+class Command(BaseCommand):
+    # Django command recounting the products of tags and categories
+    help = 'Repair drifted product counts of tags and categories'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        sources = (
+            (Tag, Product.tags.through.objects, 'tag_id'),
+            (Category, Product.objects, 'categories_id'),
+        )
+        verb = 'Would repair' if options['dry_run'] else 'Repaired'
+        for model, rows, column in sources:
+            repaired = self.reconcile(model, rows, column,
+                                      options['batch_size'],
+                                      options['dry_run'])
+            name = model._meta.verbose_name_plural.lower()
+            self.stdout.write(self.style.SUCCESS(
+                f'{verb} {repaired} {name} counts'
+            ))
+
+    def reconcile(self, model, rows, column, batch_size, dry_run):
+        # Recount one batch of rows at a time, keyed by ID. Rows are
+        # locked while counted: a concurrent writer's relative update
+        # waits and then lands on the corrected count.
+        repaired = 0
+        last = 0
+        while True:
+            with transaction.atomic():
+                batch = model.objects.filter(pk__gt=last).order_by('pk')
+                if not dry_run:
+                    batch = batch.select_for_update()
+                stored = dict(
+                    batch.values_list('pk', 'product_count')[:batch_size]
+                )
+                if not stored:
+                    return repaired
+                last = max(stored)
+
+                actual = dict(
+                    rows.filter(**{f'{column}__in': stored})
+                    .values(column).annotate(count=Count('pk'))
+                    .values_list(column, 'count')
+                )
+                drifted = {}
+                for pk, count in stored.items():
+                    if actual.get(pk, 0) != count:
+                        drifted.setdefault(actual.get(pk, 0), []).append(pk)
+                        repaired += 1
+                if not dry_run:
+                    for count, pks in drifted.items():
+                        model.objects.filter(pk__in=pks) \
+                            .update(product_count=count)
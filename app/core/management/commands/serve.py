@@ -0,0 +1,70 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+UVICORN_WORKER = 'uvicorn.workers.UvicornWorker'
+
+
+def gunicorn_argv(asgi=False, bind=None, workers=None, threads=None,
+                  timeout=None, pidfile=None):
+    """Build the gunicorn command line for the WSGI or ASGI application
+
+    Options left as None fall back to `gunicorn.conf.py`, which reads
+    the environment.
+    """
+    argv = ['gunicorn', '--config', CONFIG]
+    if asgi:
+        argv += ['--worker-class', UVICORN_WORKER]
+    for flag, value in (('--bind', bind), ('--workers', workers),
+                        ('--threads', threads), ('--timeout', timeout),
+                        ('--pid', pidfile)):
+        if value is not None:
+            argv += [flag, str(value)]
+    argv.append('app.asgi:application' if asgi else 'app.wsgi:application')
+
+    return argv
+
+
+class Command(BaseCommand):
+    # Django command to run the app under gunicorn instead of runserver
+    help = 'Serve the app with preloaded multi-process gunicorn workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Serve app.asgi with uvicorn workers instead of app.wsgi'
+        )
+        parser.add_argument('--bind')
+        parser.add_argument('--workers', type=int,
+                            help='Defaults to 2 * CPU cores + 1')
+        parser.add_argument('--threads', type=int)
+        parser.add_argument('--timeout', type=int,
+                            help='Seconds before a silent worker is killed')
+        parser.add_argument('--pidfile',
+                            help='Write the master PID here for kill -USR2')
+        parser.add_argument('--print', action='store_true',
+                            help='Print the command instead of running it')
+
+    def handle(self, *args, **options):
+        argv = gunicorn_argv(
+            asgi=options['asgi'],
+            bind=options['bind'],
+            workers=options['workers'],
+            threads=options['threads'],
+            timeout=options['timeout'],
+            pidfile=options['pidfile'],
+        )
+        if options['print']:
+            self.stdout.write(' '.join(argv))
+            return
+
+        executable = shutil.which('gunicorn')
+        if executable is None:
+            raise CommandError('gunicorn is not installed')
+        os.chdir(settings.BASE_DIR)
+        # Replace this process so signals reach the gunicorn master
+        os.execv(executable, argv)
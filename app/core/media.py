@@ -0,0 +1,180 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+
+# Hex characters of the SHA-256 digest kept in content-hashed names
+NAME_DIGEST_LENGTH = 32
+# A name whose last part before the extension is a hex digest of the
+# content, like `uploads/product/ab/<digest>.jpg`, never changes content
+HASHED_NAME_RE = re.compile(r'(?:^|[._])([0-9a-f]{16,})\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def name_digest(name):
+    # The content digest embedded in a media name, or None
+    match = HASHED_NAME_RE.search(os.path.basename(name))
+    return match.group(1) if match else None
+
+
+def parse_range(header, size):
+    """Return the inclusive `(start, end)` bytes a Range header asks for
+
+    Returns None when the whole file should be sent, which is what a
+    missing, malformed or multi-range header gets, and raises ValueError
+    when no byte of the file can satisfy the range.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+
+    if not first:
+        # A suffix range: the last `last` bytes
+        length = int(last)
+        if not length or not size:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = size - 1 if not last else min(int(last), size - 1)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+class RangeFile:
+    """Read `length` bytes of an open file, starting at `start`
+
+    The descriptor stays reachable through `fileno`, so servers using
+    `os.sendfile` for `wsgi.file_wrapper` (gunicorn does) send the range
+    from the current offset without copying it through Python.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def media_headers(path, info):
+    # Validators and caching headers of a media file
+    digest = name_digest(path)
+    if digest:
+        etag = quote_etag(digest)
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = quote_etag(f'{info.st_mtime_ns:x}-{info.st_size:x}')
+        cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+    return {
+        'ETag': etag,
+        'Last-Modified': http_date(info.st_mtime),
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file under MEDIA_ROOT with validators and byte ranges
+
+    Conditional requests are answered here. The bytes are then handed to
+    the front server with `X-Accel-Redirect` (nginx, MEDIA_ACCEL_REDIRECT
+    names the internal location) or `X-Sendfile` (Apache, lighttpd) when
+    configured, and otherwise streamed as a `FileResponse` the WSGI server
+    can `sendfile()`.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        info = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404
+
+    headers = media_headers(path, info)
+    response = get_conditional_response(
+        request, etag=headers['ETag'], last_modified=int(info.st_mtime)
+    )
+    if response is not None:
+        for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+            response[header] = headers[header]
+        return response
+
+    content_type = mimetypes.guess_type(fullpath)[0] or \
+        'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT or settings.MEDIA_X_SENDFILE:
+        # The front server sends the file and answers byte ranges
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response['X-Accel-Redirect'] = \
+                settings.MEDIA_ACCEL_REDIRECT.rstrip('/') + '/' + quote(path)
+        else:
+            response['X-Sendfile'] = fullpath
+    else:
+        response = _file_response(request, fullpath, info, headers,
+                                  content_type)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _file_response(request, fullpath, info, headers, content_type):
+    # Stream the file, or the byte range asked for, from this process
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or \
+            if_range in (headers['ETag'], headers['Last-Modified']):
+        try:
+            byte_range = parse_range(
+                request.META.get('HTTP_RANGE'), info.st_size
+            )
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{info.st_size}'
+            return response
+
+    start, end = byte_range or (0, info.st_size - 1)
+    length = end - start + 1
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = FileResponse(
+            RangeFile(open(fullpath, 'rb'), start, length),
+            content_type=content_type
+        )
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{info.st_size}'
+
+    return response
@@ -0,0 +1,43 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.instrumentation import (
+    QueryRecorder, registry, server_timing, view_name
+)
+
+
+class QueryInstrumentationMiddleware:
+    """Record the SQL cost of each request
+
+    Adds a `Server-Timing` header with the query count, total database
+    time and slowest statements, and feeds the per-view aggregate that
+    `manage.py query_stats` reports. Enabled by `SQL_INSTRUMENTATION`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        summary = recorder.summary(settings.SQL_INSTRUMENTATION_TOP)
+        response['Server-Timing'] = server_timing(summary)
+
+        name = getattr(request, '_instrumentation_view', None)
+        if name:
+            registry.record(name, summary)
+            registry.maybe_flush()
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation_view = view_name(view_func, request.method)
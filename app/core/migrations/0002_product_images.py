@@ -0,0 +1,96 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def names_to_categories(apps, schema_editor):
+    # Turn the free-text category of each product into a Category row of
+    # its user, reusing an existing one with the same name
+    alias = schema_editor.connection.alias
+    Category = apps.get_model('core', 'Category')
+    Product = apps.get_model('core', 'Product')
+
+    products = Product.objects.using(alias).exclude(category_name='')
+    pairs = products.values_list('user_id', 'category_name').distinct()
+    for user_id, name in pairs.iterator():
+        category = Category.objects.using(alias) \
+            .filter(user_id=user_id, name=name).order_by('id').first()
+        if category is None:
+            category = Category.objects.using(alias).create(
+                user_id=user_id, name=name
+            )
+        products.filter(user_id=user_id, category_name=name) \
+            .update(categories=category)
+
+
+def categories_to_names(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Category = apps.get_model('core', 'Category')
+    Product = apps.get_model('core', 'Product')
+
+    for category in Category.objects.using(alias).iterator():
+        Product.objects.using(alias).filter(categories=category) \
+            .update(category_name=category.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_status',
+            field=models.CharField(choices=[('none', 'No image'), ('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=16),
+        ),
+        migrations.RenameField(
+            model_name='product',
+            old_name='categories',
+            new_name='category_name',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='categories',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.Category'),
+        ),
+        migrations.CreateModel(
+            name='ProductImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=16)),
+                ('format', models.CharField(max_length=8)),
+                ('file', models.ImageField(max_length=255, upload_to='')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='core.Product')),
+            ],
+            options={
+                'ordering': ('width', 'format'),
+            },
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productimagevariant',
+            constraint=models.UniqueConstraint(fields=('product', 'name', 'format'), name='unique_product_image_variant'),
+        ),
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(fields=['status', 'created_at'], name='core_imagejob_queue_idx'),
+        ),
+        migrations.RunPython(names_to_categories, categories_to_names),
+    ]
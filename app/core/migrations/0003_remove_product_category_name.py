@@ -0,0 +1,19 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Apart from the conversion in 0002: PostgreSQL refuses to ALTER
+    # tables with deferred trigger events pending
+
+    dependencies = [
+        ('core', '0002_product_images'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='category_name',
+        ),
+    ]
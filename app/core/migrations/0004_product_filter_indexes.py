@@ -0,0 +1,32 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_remove_product_category_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['user', 'name'], name='core_category_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'id'], name='core_product_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='core_tag_user_name_idx'),
+        ),
+        # The auto-created through table only has (product_id, tag_id) unique;
+        # tag filters and assigned_only lookups start from the tag side.
+        migrations.RunSQL(
+            'CREATE INDEX core_product_tags_tag_product_idx '
+            'ON core_product_tags (tag_id, product_id)',
+            'DROP INDEX core_product_tags_tag_product_idx',
+        ),
+    ]
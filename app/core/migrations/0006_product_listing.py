@@ -0,0 +1,83 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:36
+
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_listings(apps, schema_editor):
+    # Copy the existing products; later writes keep the rows in sync
+    Product = apps.get_model('core', 'Product')
+    ProductListing = apps.get_model('core', 'ProductListing')
+    alias = schema_editor.connection.alias
+    products = Product.objects.using(alias).select_related('categories') \
+        .prefetch_related('tags', 'image_variants').order_by('pk')
+
+    rows = []
+    for product in products:
+        tags = sorted(product.tags.all(), key=lambda tag: tag.pk)
+        variants = sorted(product.image_variants.all(),
+                          key=lambda variant: (variant.width, variant.format))
+        rows.append(ProductListing(
+            product_id=product.pk,
+            user_id=product.user_id,
+            title=product.title,
+            time_minutes=product.time_minutes,
+            price=product.price,
+            link=product.link,
+            category_id=product.categories_id,
+            category_name=product.categories.name
+            if product.categories_id else '',
+            tag_ids=json.dumps([tag.pk for tag in tags]),
+            tag_names=json.dumps([tag.name for tag in tags]),
+            image_status=product.image_status,
+            image_variants=json.dumps([
+                {
+                    'name': variant.name,
+                    'format': variant.format,
+                    'width': variant.width,
+                    'height': variant.height,
+                    'file': variant.file.name,
+                }
+                for variant in variants
+            ])
+        ))
+    ProductListing.objects.using(alias).bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_collection_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='core.Product')),
+                ('title', models.CharField(max_length=255)),
+                ('time_minutes', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('category_id', models.IntegerField(null=True)),
+                ('category_name', models.CharField(blank=True, max_length=255)),
+                ('tag_ids', models.TextField(default='[]')),
+                ('tag_names', models.TextField(default='[]')),
+                ('image_status', models.CharField(choices=[('none', 'No image'), ('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=16)),
+                ('image_variants', models.TextField(default='[]')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['user', 'product'], name='core_listing_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['category_id', 'product'], name='core_listing_category_idx'),
+        ),
+        migrations.RunPython(populate_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:41
+
+import json
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# PostgreSQL searches a tsvector column kept current by a trigger, with
+# the title, tag names and category name weighted A, B and C
+POSTGRES_FORWARD = """
+ALTER TABLE core_productlisting ADD COLUMN search_vector tsvector;
+
+CREATE FUNCTION core_productlisting_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce((
+            SELECT string_agg(name, ' ')
+            FROM json_array_elements_text(NEW.tag_names::json) AS name
+        ), '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.category_name, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_productlisting_search_vector
+    BEFORE INSERT OR UPDATE ON core_productlisting
+    FOR EACH ROW EXECUTE PROCEDURE core_productlisting_search_vector();
+
+UPDATE core_productlisting SET title = title;
+
+CREATE INDEX core_listing_search_idx
+    ON core_productlisting USING GIN (search_vector);
+"""
+
+POSTGRES_BACKWARD = """
+DROP TRIGGER core_productlisting_search_vector ON core_productlisting;
+DROP FUNCTION core_productlisting_search_vector();
+ALTER TABLE core_productlisting DROP COLUMN search_vector;
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FORWARD)
+        return
+
+    # Elsewhere, index the existing listings into the postings table
+    # the way `product.search.listing_terms` does
+    ProductListing = apps.get_model('core', 'ProductListing')
+    ProductSearchTerm = apps.get_model('core', 'ProductSearchTerm')
+    alias = schema_editor.connection.alias
+    postings = []
+    for listing in ProductListing.objects.using(alias).iterator():
+        fields = (
+            (listing.title, 4),
+            (' '.join(json.loads(listing.tag_names)), 2),
+            (listing.category_name, 1),
+        )
+        weights = {}
+        for text, weight in fields:
+            for term in set(re.findall(r'\w+', text.lower())):
+                term = term[:64]
+                weights[term] = weights.get(term, 0) + weight
+        postings += [
+            ProductSearchTerm(term=term, listing_id=listing.pk, weight=weight)
+            for term, weight in weights.items()
+        ]
+    ProductSearchTerm.objects.using(alias).bulk_create(
+        postings, batch_size=500
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_product_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.ProductListing')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productsearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'listing'), name='unique_product_search_term'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:44
+
+import json
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    # Fold tags and categories sharing a name into the oldest of them
+    alias = schema_editor.connection.alias
+    Tag = apps.get_model('core', 'Tag')
+    Category = apps.get_model('core', 'Category')
+    Product = apps.get_model('core', 'Product')
+    ProductListing = apps.get_model('core', 'ProductListing')
+    Through = Product.tags.through
+    affected = set()
+
+    for model in (Tag, Category):
+        duplicates = model.objects.using(alias).values('user', 'name') \
+            .annotate(keep=Min('id'), count=Count('id')) \
+            .filter(count__gt=1)
+        for row in duplicates:
+            others = list(
+                model.objects.using(alias)
+                .filter(user=row['user'], name=row['name'])
+                .exclude(id=row['keep'])
+                .values_list('id', flat=True)
+            )
+            if model is Tag:
+                links = Through.objects.using(alias)
+                affected.update(
+                    links.filter(tag_id__in=others)
+                    .values_list('product_id', flat=True)
+                )
+                for other in others:
+                    links.filter(tag_id=other).exclude(
+                        product_id__in=links.filter(tag_id=row['keep'])
+                        .values('product_id')
+                    ).update(tag_id=row['keep'])
+            else:
+                products = Product.objects.using(alias) \
+                    .filter(categories_id__in=others)
+                affected.update(products.values_list('id', flat=True))
+                products.update(categories_id=row['keep'])
+            model.objects.using(alias).filter(id__in=others).delete()
+
+    # Names are unchanged, so only the IDs held by listings move
+    for product in Product.objects.using(alias).filter(id__in=affected) \
+            .prefetch_related('tags'):
+        tags = sorted(product.tags.all(), key=lambda tag: tag.pk)
+        ProductListing.objects.using(alias).filter(product_id=product.pk) \
+            .update(
+                category_id=product.categories_id,
+                tag_ids=json.dumps([tag.pk for tag in tags]),
+                tag_names=json.dumps([tag.name for tag in tags])
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_product_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Schema changes run apart from the data merge in 0008: PostgreSQL
+    # refuses to ALTER tables with deferred trigger events pending
+
+    dependencies = [
+        ('core', '0008_merge_duplicate_attr_names'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='category',
+            name='core_category_user_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_user_name_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_category_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_user_name'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.0.3 on 2026-10-16 19:59
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    # Give every stored image and variant a blob row with its references
+    alias = schema_editor.connection.alias
+    Product = apps.get_model('core', 'Product')
+    ProductImageVariant = apps.get_model('core', 'ProductImageVariant')
+    MediaBlob = apps.get_model('core', 'MediaBlob')
+
+    counts = {}
+    columns = (
+        Product.objects.using(alias).exclude(image='').exclude(image=None)
+        .values_list('image', flat=True),
+        ProductImageVariant.objects.using(alias)
+        .values_list('file', flat=True),
+    )
+    for column in columns:
+        for name in column.iterator():
+            counts[name] = counts.get(name, 0) + 1
+
+    MediaBlob.objects.using(alias).bulk_create([
+        MediaBlob(name=name, refcount=count)
+        for name, count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_unique_attr_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.product_image_file_path),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(fields=['refcount', 'name'], name='core_mediablob_garbage_idx'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.0.3 on 2026-10-16 20:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_products(apps, schema_editor):
+    # Fill the new counters with one grouped subquery per table
+    alias = schema_editor.connection.alias
+    Tag = apps.get_model('core', 'Tag')
+    Category = apps.get_model('core', 'Category')
+    Product = apps.get_model('core', 'Product')
+    sources = (
+        (Tag, Product.tags.through.objects.using(alias), 'tag_id'),
+        (Category, Product.objects.using(alias), 'categories_id'),
+    )
+    for model, rows, column in sources:
+        counts = rows.filter(**{column: OuterRef('pk')}) \
+            .values(column).annotate(count=Count('pk')).values('count')
+        model.objects.using(alias).update(
+            product_count=Coalesce(Subquery(counts), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,21 @@
 import uuid
 import os
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import DEFERRED
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 
 from django.conf import settings
 
+from core.storage import content_storage
+
 
 def product_image_file_path(instance, filename):
-    # Generate file path for new product image
+    # Generate file path for new product image; the content-addressed
+    # storage only keeps its directory and names it by digest and format
     ext = filename.split('.')[-1]
     filename = f'{uuid.uuid4()}.{ext}'
 
@@ -29,6 +35,20 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def create_user_from_hash(self, email, encoded_password, **extra_fields):
+        # Creates and save a new user whose password was hashed already
+        if not email:
+            raise ValueError('Users must have an email address!')
+
+        user = self.model(
+            email=self.normalize_email(email),
+            password=encoded_password,
+            **extra_fields
+        )
+        user.save(using=self._db)
+
+        return user
+
     def create_superuser(self, email, password):
         # Creates and save a new superuser
         user = self.create_user(email, password)
@@ -50,6 +70,139 @@ class User(PermissionsMixin, AbstractBaseUser):
     USERNAME_FIELD = 'email'
 
 
+class CollectionVersionManager(models.Manager):
+
+    def keys(self, collection, user=None):
+        # Version keys of a collection, per user (or user ID) or across
+        # all users
+        if user is None:
+            return [f'{collection}:all']
+        return [f'{collection}:user:{getattr(user, "pk", user)}']
+
+    def bump(self, collection, user):
+        # Record a write to a user's collection and to the shared one
+        keys = self.keys(collection, user) + self.keys(collection)
+        now = timezone.now()
+        for key in keys:
+            updated = self.filter(key=key).update(
+                version=models.F('version') + 1,
+                updated_at=now
+            )
+            if not updated:
+                try:
+                    with transaction.atomic(using=self.db):
+                        self.create(key=key, version=1)
+                except IntegrityError:
+                    self.filter(key=key).update(
+                        version=models.F('version') + 1,
+                        updated_at=now
+                    )
+
+    def current(self, keys):
+        # Return {key: (version, updated_at)} for the requested keys
+        return {
+            key: (version, updated_at)
+            for key, version, updated_at in self.filter(key__in=keys)
+            .values_list('key', 'version', 'updated_at')
+        }
+
+
+class CollectionVersion(models.Model):
+    # Write counter of a collection, used to answer conditional requests
+    key = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CollectionVersionManager()
+
+    def __str__(self):
+        return f'{self.key} v{self.version}'
+
+
+class MediaBlobManager(models.Manager):
+
+    def register(self, names):
+        # Make sure the named blobs have rows, and restart their grace
+        # period before `gc_media` may remove them
+        names = {name for name in names if name}
+        if not names:
+            return
+        self.bulk_create(
+            [self.model(name=name) for name in names],
+            ignore_conflicts=True
+        )
+        self.filter(name__in=names).update(updated_at=timezone.now())
+
+    def retain(self, names):
+        # Count a new reference to each name, registering unknown blobs
+        names = [name for name in names if name]
+        if names:
+            self.bulk_create(
+                [self.model(name=name) for name in set(names)],
+                ignore_conflicts=True
+            )
+            self._adjust(names, 1)
+
+    def release(self, names):
+        # Drop a reference to each name; blobs left at zero are garbage
+        self._adjust([name for name in names if name], -1)
+
+    def _adjust(self, names, sign):
+        # One UPDATE per distinct number of references to a name
+        counts = {}
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+        grouped = {}
+        for name, count in counts.items():
+            grouped.setdefault(count, []).append(name)
+
+        now = timezone.now()
+        for count, group in grouped.items():
+            self.filter(name__in=group).update(
+                refcount=Greatest(
+                    models.F('refcount') + sign * count, 0
+                ),
+                updated_at=now
+            )
+
+
+class MediaBlob(models.Model):
+    # A stored media file and the number of rows referencing it
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MediaBlobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('refcount', 'name'),
+                name='core_mediablob_garbage_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
+
+
+class ProductAttrManager(models.Manager):
+
+    def adjust_product_counts(self, deltas, using=None):
+        # Apply {pk: change} to `product_count`, one UPDATE per distinct
+        # change, so concurrent writers add up instead of overwriting
+        grouped = {}
+        for pk, delta in deltas.items():
+            if pk is not None and delta:
+                grouped.setdefault(delta, []).append(pk)
+
+        manager = self.db_manager(using)
+        for delta, pks in grouped.items():
+            manager.filter(pk__in=pks).update(product_count=Greatest(
+                models.F('product_count') + delta, 0
+            ))
+
+
 class Tag(models.Model):
     # Tags to be used for a rescipe
     name = models.CharField(max_length=255)
@@ -57,6 +210,20 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # Products linked to the tag, maintained by product/signals.py
+    product_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductAttrManager()
+
+    class Meta:
+        # Also the index behind lookups by name
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'name'),
+                name='unique_tag_user_name'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -68,10 +235,22 @@ class Category(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # Products in the category, maintained by product/signals.py
+    product_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductAttrManager()
 
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
+        # Also the index behind lookups by name
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'name'),
+                name='unique_category_user_name'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -79,6 +258,17 @@ class Category(models.Model):
 
 class Product(models.Model):
     # Product object
+    IMAGE_NONE = 'none'
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_NONE, 'No image'),
+        (IMAGE_PENDING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -90,7 +280,168 @@ class Product(models.Model):
     categories = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True)
     # categories = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=product_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=product_image_file_path,
+        storage=content_storage
+    )
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_NONE
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('user', 'id'),
+                name='core_product_user_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the stored image and category so saves can move their
+        # references and counts
+        instance = super().from_db(db, field_names, values)
+        instance._stored_image = instance.__dict__.get('image', DEFERRED)
+        instance._stored_category = \
+            instance.__dict__.get('categories_id', DEFERRED)
+        return instance
+
+
+class ProductImageVariant(models.Model):
+    # Resized, metadata-free rendition of a product image
+    product = models.ForeignKey(
+        'Product',
+        on_delete=models.CASCADE,
+        related_name='image_variants'
+    )
+    name = models.CharField(max_length=16)
+    format = models.CharField(max_length=8)
+    file = models.ImageField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ('width', 'format')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('product', 'name', 'format'),
+                name='unique_product_image_variant'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.name} {self.format}'
+
+
+class ProductListing(models.Model):
+    # Denormalized copy of a product as the product lists render it,
+    # maintained by `product.listing`
+    product = models.OneToOneField(
+        'Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listing'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    title = models.CharField(max_length=255)
+    time_minutes = models.IntegerField()
+    price = models.DecimalField(max_digits=5, decimal_places=2)
+    link = models.CharField(max_length=255, blank=True)
+    category_id = models.IntegerField(null=True)
+    category_name = models.CharField(max_length=255, blank=True)
+    # JSON arrays, ordered by tag ID
+    tag_ids = models.TextField(default='[]')
+    tag_names = models.TextField(default='[]')
+    image_status = models.CharField(
+        max_length=16,
+        choices=Product.IMAGE_STATUS_CHOICES,
+        default=Product.IMAGE_NONE
+    )
+    # JSON array of the variants in `ProductImageVariant` order
+    image_variants = models.TextField(default='[]')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('user', 'product'),
+                name='core_listing_user_idx'
+            ),
+            models.Index(
+                fields=('category_id', 'product'),
+                name='core_listing_category_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ProductSearchTerm(models.Model):
+    # Posting of the inverted index searched on databases without
+    # full-text search; PostgreSQL uses a tsvector column instead
+    term = models.CharField(max_length=64)
+    listing = models.ForeignKey(
+        'ProductListing',
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('term', 'listing'),
+                name='unique_product_search_term'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.term} {self.listing_id}'
+
+
+class ImageJob(models.Model):
+    # Queued image processing work, claimed by `process_images` workers
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    product = models.ForeignKey('Product', on_delete=models.CASCADE)
+    source = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('status', 'created_at'),
+                name='core_imagejob_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.status}'
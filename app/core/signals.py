@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+
+# Sent once by set-based writes to the `Product.tags` through table, which
+# send no `m2m_changed`, with sender=Product and the arguments
+# `product_ids` (every product whose tags changed), `user` (who owns
+# them) and `using`.
+product_tags_bulk_changed = Signal()
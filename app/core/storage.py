@@ -0,0 +1,96 @@
+import hashlib
+import os
+import tempfile
+
+from PIL import Image
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from core.media import NAME_DIGEST_LENGTH
+
+
+# Uploads being hashed are written next to their final directory
+TEMP_PREFIX = '.upload-'
+# Stored extensions by image format, so the name never comes from the
+# client and media are served with the type of their actual bytes
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg', 'MPO': '.jpg', 'PNG': '.png', 'WEBP': '.webp',
+    'GIF': '.gif',
+}
+
+
+def image_extension(content, path):
+    # The extension of the format probed when the file was uploaded, or
+    # else read from the stored header; other files get none
+    info = getattr(content, 'image_info', None)
+    if info is None:
+        try:
+            with Image.open(path) as image:
+                info = (image.format,)
+        except Exception:
+            return ''
+    return FORMAT_EXTENSIONS.get(info[0], '')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Store each distinct file once, named after its SHA-256 digest
+
+    Uploads are hashed while they are copied chunk by chunk to a
+    temporary file, so no upload is held in memory, and then moved to
+    `<directory>/<aa>/<digest>.<ext>` unless that blob already exists.
+    The name asked for only contributes its directory; the extension
+    follows the image format of the content.
+    Every blob has a `MediaBlob` row counting its references, which
+    `gc_media` uses to remove unreferenced blobs.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Equal content shares a name, so there is never a clash to avoid
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.split(name)[0]
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+
+        fd, temp_path = tempfile.mkstemp(
+            prefix=TEMP_PREFIX, dir=self.path(directory)
+        )
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+
+            hexdigest = digest.hexdigest()[:NAME_DIGEST_LENGTH]
+            name = os.path.join(
+                directory, hexdigest[:2],
+                hexdigest + image_extension(content, temp_path)
+            )
+            # Registered before looking for the file, so a concurrent
+            # `gc_media` either sees the fresh row or has already
+            # removed the file we are about to write
+            apps.get_model('core', 'MediaBlob').objects.register([name])
+
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                # Racing uploads of one content write the same bytes, so
+                # whichever rename lands last is as good as the first
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return name.replace('\\', '/')
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,96 @@
+import contextlib
+import json
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.benchmark import find_regressions, percentile, summarize
+from core.management.commands.bench_api import Command
+
+
+def report(**metrics):
+    scenario = {
+        'requests': 100, 'errors': 0, 'p50_ms': 10, 'p95_ms': 20,
+        'p99_ms': 30, 'requests_per_second': 500, 'queries_per_request': 3,
+    }
+    scenario.update(metrics)
+    return {'scenarios': {'tag-list': scenario}}
+
+
+class BenchmarkStatsTests(SimpleTestCase):
+    # Test the statistics of the API benchmark
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize_excludes_errors_from_latency(self):
+        samples = [(0.010, 2, True), (0.020, 2, True), (5.0, 0, False)]
+
+        summary = summarize(samples, 1.0)
+
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['p99_ms'], 20.0)
+        self.assertEqual(summary['queries_per_request'], 2)
+
+    def test_regressions(self):
+        baseline = report()
+
+        self.assertEqual(find_regressions(report(p95_ms=23), baseline, 20),
+                         [])
+        self.assertEqual(len(find_regressions(
+            report(p95_ms=25, requests_per_second=300), baseline, 20
+        )), 2)
+        self.assertEqual(find_regressions(
+            report(queries_per_request=4), baseline, 50
+        ), ['tag-list: queries_per_request 3 -> 4'])
+
+
+class BenchApiCommandTests(TransactionTestCase):
+    # Test a tiny end to end benchmark run against the real routes
+
+    def test_run_reports_every_scenario(self):
+        options = {
+            'users': 2, 'products': 5, 'tags': 4, 'categories': 2,
+            'tags_per_product': 2, 'requests': 6, 'concurrency': 2,
+            'scenario': ['myproducts-list', 'products-list', 'tag-list',
+                         'token'],
+        }
+
+        result = Command(stdout=StringIO()).run(options)
+
+        self.assertEqual(result['dataset']['users'], 2)
+        for name in options['scenario']:
+            summary = result['scenarios'][name]
+            self.assertEqual(summary['requests'], 6)
+            self.assertEqual(summary['errors'], 0, name)
+            self.assertGreater(summary['queries_per_request'], 0)
+
+    @patch('core.management.commands.bench_api.throwaway_database',
+           lambda **kwargs: contextlib.nullcontext())
+    @patch.object(Command, 'run')
+    def test_baseline_regression_fails(self, run):
+        # Test the command errors out when the baseline is beaten
+        run.return_value = report(p99_ms=90)
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as baseline:
+            json.dump(report(), baseline)
+            baseline.flush()
+
+            with self.assertRaisesMessage(CommandError, 'p99_ms 30 -> 90'):
+                call_command(
+                    'bench_api', '--baseline', baseline.name,
+                    stdout=StringIO()
+                )
+            call_command(
+                'bench_api', '--baseline', baseline.name,
+                '--max-regression', '300', stdout=StringIO()
+            )
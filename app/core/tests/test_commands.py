@@ -1,9 +1,12 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.management.commands.serve import CONFIG, gunicorn_argv
+
 
 class CommandTests(TestCase):
 
@@ -22,3 +25,36 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_serve_wsgi_defaults_to_config(self):
+        # Test serving leaves tuning to gunicorn.conf.py by default
+        self.assertEqual(
+            gunicorn_argv(),
+            ['gunicorn', '--config', CONFIG, 'app.wsgi:application']
+        )
+
+    def test_serve_asgi_overrides(self):
+        argv = gunicorn_argv(asgi=True, workers=3, timeout=10)
+
+        self.assertEqual(argv[-1], 'app.asgi:application')
+        self.assertIn('uvicorn.workers.UvicornWorker', argv)
+        self.assertEqual(argv[argv.index('--workers') + 1], '3')
+        self.assertEqual(argv[argv.index('--timeout') + 1], '10')
+
+    @patch('os.execv')
+    def test_serve_execs_gunicorn(self, execv):
+        # Test the command replaces itself with the gunicorn master
+        with patch('shutil.which', return_value='/usr/bin/gunicorn'), \
+                patch('os.chdir'):
+            call_command('serve', '--bind', '127.0.0.1:9000')
+
+        executable, argv = execv.call_args[0]
+        self.assertEqual(executable, '/usr/bin/gunicorn')
+        self.assertEqual(argv[argv.index('--bind') + 1], '127.0.0.1:9000')
+
+    def test_serve_print(self):
+        out = StringIO()
+
+        call_command('serve', '--print', stdout=out)
+
+        self.assertTrue(out.getvalue().startswith('gunicorn --config'))
@@ -0,0 +1,167 @@
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.db.health import check_connections, mark_idle
+from core.db.pool import (
+    ConnectionPool, PoolRegistry, PoolTimeout, load_snapshots
+)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.usable = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def sample_pool(**params):
+    return ConnectionPool(
+        connect=FakeConnection,
+        is_usable=lambda connection: connection.usable,
+        **params
+    )
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    # Test checking connections in and out of the pool
+
+    def test_connections_reused(self):
+        pool = sample_pool()
+
+        first = pool.get()
+        pool.put(first)
+        second = pool.get()
+
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = sample_pool(max_size=1, timeout=0.05)
+        pool.get()
+
+        with self.assertRaises(PoolTimeout):
+            pool.get()
+
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        pool = sample_pool(max_size=1, timeout=5)
+        connection = pool.get()
+        threading.Timer(0.05, pool.put, [connection]).start()
+
+        self.assertIs(pool.get(), connection)
+        self.assertEqual(pool.stats()['waits'], 1)
+        self.assertGreater(pool.stats()['wait_ms'], 0)
+
+    def test_broken_idle_connection_replaced(self):
+        # Test a connection that died while idle is never handed out
+        pool = sample_pool(check_interval=0)
+        connection = pool.get()
+        pool.put(connection)
+        connection.usable = False
+
+        replacement = pool.get()
+
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['reconnects'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_broken_connection_discarded_on_return(self):
+        pool = sample_pool()
+        connection = pool.get()
+
+        pool.put(connection, broken=True)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_old_connections_retired(self):
+        pool = sample_pool(max_age=0.01)
+        connection = pool.get()
+        time.sleep(0.02)
+
+        pool.put(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['expired'], 1)
+
+
+class PoolStatisticsTests(SimpleTestCase):
+    # Test publishing the pool statistics of the workers
+
+    def test_snapshots_merged_across_workers(self):
+        registry = PoolRegistry()
+        pool = registry.get('default', sample_pool)
+        pool.put(pool.get())
+        registry.record_drop('default')
+
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                override_settings(SQL_INSTRUMENTATION_DIR=tmpdir):
+            registry.flush()
+            with patch('os.getpid', return_value=1):
+                registry.flush()
+            stats = load_snapshots(tmpdir)
+
+            out = StringIO()
+            call_command('db_pool_stats', stdout=out)
+
+        self.assertEqual(stats['default']['workers'], 2)
+        self.assertEqual(stats['default']['checkouts'], 2)
+        self.assertEqual(stats['default']['health_check_drops'], 2)
+        self.assertIn('checkouts', out.getvalue())
+
+    @patch('core.db.health.registry')
+    @patch('core.db.health.connections')
+    def test_health_check_drops_dead_connections(self, connections,
+                                                 registry):
+        dead = MagicMock(alias='default', in_atomic_block=False)
+        dead.is_usable.return_value = False
+        busy = MagicMock(alias='other', in_atomic_block=True)
+        connections.all.return_value = [dead, busy]
+
+        check_connections()
+
+        dead.close.assert_called_once_with()
+        busy.is_usable.assert_not_called()
+        registry.record_drop.assert_called_once_with('default')
+
+    @override_settings(DB_CONN_HEALTH_CHECK_IDLE=10)
+    @patch('core.db.health.registry')
+    @patch('core.db.health.connections')
+    @patch('core.db.health.time.monotonic')
+    def test_health_check_skips_recently_used(self, monotonic, connections,
+                                              registry):
+        connection = MagicMock(alias='default', in_atomic_block=False)
+        connections.all.return_value = [connection]
+
+        monotonic.return_value = 100
+        mark_idle()
+        monotonic.return_value = 105
+        check_connections()
+        connection.is_usable.assert_not_called()
+
+        monotonic.return_value = 111
+        check_connections()
+        connection.is_usable.assert_called_once_with()
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=False)
+    @patch('core.db.health.connections')
+    def test_health_check_disabled(self, connections):
+        check_connections()
+
+        connections.all.assert_not_called()
@@ -0,0 +1,100 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import instrumentation
+from core.models import Tag
+
+
+class FingerprintTests(TestCase):
+
+    def test_literals_and_in_lists_collapse(self):
+        # Test that statements differing only in values share a fingerprint
+        first = instrumentation.fingerprint(
+            "SELECT * FROM core_tag WHERE id IN (%s, %s) AND name = 'a'"
+        )
+        second = instrumentation.fingerprint(
+            "SELECT  * FROM core_tag WHERE id IN (%s) AND name = 'bb'"
+        )
+
+        self.assertEqual(first, second)
+
+    def test_summary_reports_duplicates(self):
+        # Test that repeated statements are reported as duplicates
+        recorder = instrumentation.QueryRecorder()
+        recorder.queries = [
+            ('SELECT 1 FROM core_tag WHERE id = %s', 2.0),
+            ('SELECT 1 FROM core_tag WHERE id = %s', 1.0),
+            ('SELECT 1 FROM core_product', 5.0),
+        ]
+
+        summary = recorder.summary(top=1)
+
+        self.assertEqual(summary['queries'], 3)
+        self.assertEqual(summary['db_ms'], 8.0)
+        self.assertEqual(list(summary['duplicates'].values()), [2])
+        self.assertEqual(summary['slowest'][0]['ms'], 5.0)
+
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            SQL_INSTRUMENTATION=True,
+            SQL_INSTRUMENTATION_DIR=self.tmpdir.name,
+            SQL_INSTRUMENTATION_FLUSH=0
+        )
+        self.override.enable()
+        instrumentation.registry.reset()
+
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        instrumentation.registry.reset()
+        self.override.disable()
+        self.tmpdir.cleanup()
+
+    def test_server_timing_header(self):
+        # Test that responses carry the database cost of the request
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(reverse('product:tag-list'))
+
+        self.assertIn('Server-Timing', res)
+        self.assertTrue(res['Server-Timing'].startswith('db;dur='))
+        # One query for the validators, one for the page
+        self.assertIn('2 queries', res['Server-Timing'])
+
+    def test_stats_aggregated_per_view(self):
+        # Test that requests are aggregated under the viewset action name
+        self.client.get(reverse('product:tag-list'))
+        self.client.get(reverse('product:tag-list'))
+        self.client.get(reverse('product:myproducts-list'))
+
+        snapshot = instrumentation.registry.snapshot()
+
+        self.assertEqual(snapshot['TagViewSet.list']['requests'], 2)
+        self.assertEqual(snapshot['ProductViewset.list']['requests'], 1)
+
+    def test_query_stats_command(self):
+        # Test that the command reports the snapshots written by workers
+        self.client.get(reverse('product:tag-list'))
+        out = StringIO()
+
+        call_command('query_stats', '--json', stdout=out)
+
+        stats = json.loads(out.getvalue())
+        self.assertEqual(stats['TagViewSet.list']['requests'], 1)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from core import media
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+DIGEST = hashlib.sha256(CONTENT).hexdigest()[:media.NAME_DIGEST_LENGTH]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT='',
+                   MEDIA_X_SENDFILE=False, MEDIA_MAX_AGE=60)
+class ServeMediaTests(TestCase):
+    # Test serving files under MEDIA_ROOT
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, 'uploads/product'),
+                    exist_ok=True)
+        for name in (f'{DIGEST}.jpg', 'legacy.jpg'):
+            with open(os.path.join(MEDIA_ROOT, 'uploads/product', name),
+                      'wb') as target:
+                target.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, name, **headers):
+        return self.client.get(f'/media/uploads/product/{name}', **headers)
+
+    def test_hashed_name_is_immutable(self):
+        res = self.get(f'{DIGEST}.jpg')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertEqual(res['Cache-Control'], media.IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+
+    def test_other_names_expire(self):
+        res = self.get('legacy.jpg')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Cache-Control'], 'public, max-age=60')
+        self.assertNotEqual(res['ETag'], f'"{DIGEST}"')
+
+    def test_if_none_match(self):
+        etag = self.get('legacy.jpg')['ETag']
+
+        res = self.get('legacy.jpg', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_byte_range(self):
+        res = self.get(f'{DIGEST}.jpg', HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+    def test_suffix_range(self):
+        res = self.get(f'{DIGEST}.jpg', HTTP_RANGE='bytes=-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        res = self.get(f'{DIGEST}.jpg', HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_sends_whole_file(self):
+        res = self.get(f'{DIGEST}.jpg', HTTP_RANGE='bytes=0-9',
+                       HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    def test_head(self):
+        res = self.client.head(f'/media/uploads/product/{DIGEST}.jpg')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.get('missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/uploads').status_code, 404)
+        self.assertEqual(
+            self.client.get('/media/../../etc/passwd').status_code, 404
+        )
+        self.assertEqual(
+            self.client.get('/media/%2E%2E/etc/passwd').status_code, 404
+        )
+
+    def test_writes_not_allowed(self):
+        res = self.client.post(f'/media/uploads/product/{DIGEST}.jpg')
+
+        self.assertEqual(res.status_code, 405)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect(self):
+        res = self.get(f'{DIGEST}.jpg', HTTP_RANGE='bytes=0-9')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/uploads/product/{DIGEST}.jpg'
+        )
+        self.assertEqual(res['Cache-Control'], media.IMMUTABLE_CACHE_CONTROL)
+
+    @override_settings(MEDIA_X_SENDFILE=True)
+    def test_x_sendfile(self):
+        res = self.get('legacy.jpg')
+
+        self.assertEqual(
+            res['X-Sendfile'],
+            os.path.join(MEDIA_ROOT, 'uploads/product/legacy.jpg')
+        )
+
+
+class MediaHelperTests(TestCase):
+
+    def test_parse_range(self):
+        self.assertEqual(media.parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(media.parse_range('bytes=2-100', 10), (2, 9))
+        self.assertEqual(media.parse_range('bytes=-20', 10), (0, 9))
+        self.assertIsNone(media.parse_range(None, 10))
+        self.assertIsNone(media.parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(media.parse_range('bytes=5-2', 10))
+        with self.assertRaises(ValueError):
+            media.parse_range('bytes=10-', 10)
+        with self.assertRaises(ValueError):
+            media.parse_range('bytes=-0', 10)
+
+    def test_name_digest(self):
+        self.assertEqual(media.name_digest(f'a/{DIGEST}.jpg'), DIGEST)
+        self.assertEqual(
+            media.name_digest('a/x_thumb.0123456789abcdef.webp'),
+            '0123456789abcdef'
+        )
+        self.assertIsNone(media.name_digest(
+            'a/0b3e8f5c-49a2-4d8e-9f6a-2c1d7e4b5a10.jpg'
+        ))
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.media import NAME_DIGEST_LENGTH
+from core.models import MediaBlob, Product, ProductImageVariant
+from core.storage import TEMP_PREFIX, content_storage
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def blob_name(content, ext=''):
+    digest = hashlib.sha256(content).hexdigest()[:NAME_DIGEST_LENGTH]
+    return f'uploads/product/{digest[:2]}/{digest}{ext}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    # Test storing product images once per content, with references
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'testpass'
+        )
+
+    def product(self, content=None):
+        product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5
+        )
+        if content is not None:
+            product.image.save('photo.JPG', ContentFile(content))
+        return product
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', *args, grace=-1, stdout=out)
+        return out.getvalue()
+
+    def test_same_content_stored_once(self):
+        first = self.product(b'same photo')
+        second = self.product(b'same photo')
+
+        name = blob_name(b'same photo')
+        self.assertEqual(first.image.name, name)
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(os.listdir(os.path.dirname(first.image.path)),
+                         [os.path.basename(name)])
+        self.assertEqual(self.refcount(name), 2)
+
+    def test_extension_follows_image_format(self):
+        # Test that the stored type comes from the bytes, not the name
+        buffer = BytesIO()
+        Image.new('RGB', (4, 4)).save(buffer, 'JPEG')
+        product = self.product()
+
+        product.image.save('evil.html', ContentFile(buffer.getvalue()))
+
+        self.assertEqual(product.image.name,
+                         blob_name(buffer.getvalue(), '.jpg'))
+
+    def test_replace_and_delete_release_references(self):
+        product = self.product(b'old photo')
+        product = Product.objects.get(pk=product.pk)
+
+        product.image.save('photo.jpg', ContentFile(b'new photo'))
+        self.assertEqual(self.refcount(blob_name(b'old photo')), 0)
+        self.assertEqual(self.refcount(blob_name(b'new photo')), 1)
+
+        ProductImageVariant.objects.create(
+            product=product, name='thumb', format='jpeg', width=1, height=1,
+            file='uploads/product/variants/x_thumb.jpg'
+        )
+        MediaBlob.objects.retain(['uploads/product/variants/x_thumb.jpg'])
+        Product.objects.get(pk=product.pk).delete()
+        self.assertEqual(self.refcount(blob_name(b'new photo')), 0)
+        self.assertEqual(
+            self.refcount('uploads/product/variants/x_thumb.jpg'), 0
+        )
+
+    def test_gc_removes_unreferenced_blobs(self):
+        kept = self.product(b'kept photo')
+        product = self.product(b'old photo')
+        product.image.save('photo.jpg', ContentFile(b'new photo'))
+        old_path = content_storage.path(blob_name(b'old photo'))
+        self.assertTrue(os.path.exists(old_path))
+
+        self.assertIn('Removed 1 blobs', self.gc())
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertFalse(
+            MediaBlob.objects.filter(name=blob_name(b'old photo')).exists()
+        )
+        self.assertTrue(os.path.exists(kept.image.path))
+        self.assertTrue(os.path.exists(product.image.path))
+
+    def test_gc_grace_period_and_dry_run(self):
+        product = self.product(b'old photo')
+        product.image.save('photo.jpg', ContentFile(b'new photo'))
+        out = StringIO()
+
+        call_command('gc_media', stdout=out)
+        self.assertIn('Removed 0 blobs', out.getvalue())
+        self.assertIn('Would remove 1 blobs', self.gc('--dry-run'))
+        self.assertTrue(
+            MediaBlob.objects.filter(name=blob_name(b'old photo')).exists()
+        )
+
+    def test_gc_repairs_drifted_counts(self):
+        product = self.product(b'photo')
+        MediaBlob.objects.filter(name=product.image.name).update(refcount=0)
+
+        self.assertIn('Removed 0 blobs, repaired 1', self.gc())
+
+        self.assertTrue(os.path.exists(product.image.path))
+        self.assertEqual(self.refcount(product.image.name), 1)
+
+    def test_gc_scan_collects_stray_files(self):
+        root = tempfile.mkdtemp(dir=MEDIA_ROOT)
+        with override_settings(MEDIA_ROOT=root):
+            directory = content_storage.path('uploads/product')
+            os.makedirs(directory)
+            for filename in ('stray.jpg', TEMP_PREFIX + 'abc'):
+                with open(os.path.join(directory, filename), 'wb') as target:
+                    target.write(b'x')
+
+            self.assertIn('Found 1 untracked files', self.gc('--scan'))
+
+            self.assertEqual(os.listdir(directory), [])
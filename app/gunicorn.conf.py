@@ -0,0 +1,50 @@
+"""
+Gunicorn settings used by `manage.py serve` and the docker image.
+
+Every value can be overridden from the environment. The app is imported
+once in the master and forked, so workers share its memory. Because of
+that, HUP only re-forks the code the master already holds. To deploy new
+code without dropping requests, send USR2 to the master, which starts a
+new master and workers running the new code, then WINCH and QUIT to the
+old master to retire its workers gracefully. Otherwise restart gunicorn.
+With GUNICORN_PRELOAD=0 each worker imports the app itself and HUP is
+enough.
+"""
+
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+threads = env_int('GUNICORN_THREADS', 2)
+# Keep-alive only works with threaded or async workers
+worker_class = os.environ.get(
+    'GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync'
+)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+# Recycle workers now and then so slow leaks cannot pile up
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+forwarded_allow_ips = os.environ.get('GUNICORN_FORWARDED_ALLOW_IPS', '')
+# Media file responses go out with os.sendfile(), without a copy in Python
+sendfile = os.environ.get('GUNICORN_SENDFILE', '1') == '1'
+
+
+def post_fork(server, worker):
+    # Never share database sockets opened while preloading with workers
+    from django.db import connections
+    from core.db.pool import registry
+    connections.close_all()
+    registry.reset()
@@ -0,0 +1,91 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import Resolver404, resolve, set_script_prefix
+
+
+READ_ROUTES = frozenset((
+    'product:products-list',
+    'product:products-detail',
+    'product:products-search',
+    'product:myproducts-list',
+    'product:myproducts-detail',
+    'product:myproducts-search',
+))
+
+
+class AsyncReadHandler(ASGIHandler):
+    """ASGI entry point serving the product read routes off the loop
+
+    GET and HEAD requests to the product lists and details are parsed
+    and their responses sent on the event loop, so slow clients hold no
+    thread. The view itself, ORM queries, serialization and rendering,
+    runs in one executor call between `request_started` and
+    `request_finished`, so connection reuse, health checks and pool
+    returns happen on the thread that used the connection. At most
+    `ASYNC_READ_CONCURRENCY` views run at once; further requests wait
+    on the loop instead of piling onto the thread pool.
+
+    Everything else, writes included, goes to `fallback` unchanged.
+    """
+
+    def __init__(self, fallback=None):
+        super().__init__()
+        self.fallback = fallback or ASGIHandler()
+        self._slots = None
+
+    @property
+    def slots(self):
+        # Created lazily so the semaphore binds to the serving loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.ASYNC_READ_CONCURRENCY)
+        return self._slots
+
+    def is_read(self, scope):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            return False
+        try:
+            match = resolve(scope['path'])
+        except Resolver404:
+            return False
+        return match.view_name in READ_ROUTES
+
+    async def __call__(self, scope, receive, send):
+        if not self.is_read(scope):
+            return await self.fallback(scope, receive, send)
+
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(self.get_script_prefix(scope))
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(error_response, send)
+            return
+
+        async with self.slots:
+            response = await sync_to_async(
+                self.serve, thread_sensitive=False
+            )(request, scope)
+        response._handler_class = self.__class__
+        await self.send_response(response, send)
+
+    def serve(self, request, scope):
+        # Run a request cycle on one executor thread, rendered to bytes
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        try:
+            response = self.get_response(request)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            # Closes old connections and marks the rest idle here; the
+            # copy `response.close()` sends on the loop finds no
+            # connection there
+            signals.request_finished.send(sender=self.__class__)
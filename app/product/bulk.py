@@ -0,0 +1,492 @@
+import csv
+import io
+import itertools
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from rest_framework import serializers
+
+from core.models import Tag, Category, CollectionVersion, Product
+from core.signals import product_tags_bulk_changed
+from product.cache import catalog_cache
+from product.listing import refresh_listings
+
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link',
+                 'categories', 'tags')
+TAG_SEPARATOR = '|'
+MAX_REPORTED_ERRORS = 100
+VERSION_COLLECTIONS = {Tag: 'tags', Category: 'categories'}
+
+
+class ProductImportSerializer(serializers.Serializer):
+    # Validate one imported product row; relations are given by name
+    title = serializers.CharField(max_length=255)
+    time_minutes = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    link = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, default=''
+    )
+    categories = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, allow_null=True
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False,
+        default=list
+    )
+
+
+def iter_ndjson(lines):
+    """Yield `(line_number, row)` pairs from newline-delimited JSON"""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = ValueError(f'Invalid JSON: {exc}')
+        yield number, row
+
+
+def iter_csv(lines):
+    """Yield `(line_number, row)` pairs from CSV with a header line
+
+    Tags are given as a single column of names separated by `|`.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        tags = row.get('tags') or ''
+        row['tags'] = [name for name in tags.split(TAG_SEPARATOR) if name]
+        yield reader.line_num, row
+
+
+PARSERS = {'ndjson': iter_ndjson, 'csv': iter_csv}
+
+
+def decode_lines(stream, encoding='utf-8'):
+    # Turn a binary stream into text lines without reading it all
+    for line in stream:
+        yield line.decode(encoding) if isinstance(line, bytes) else line
+
+
+class ProductImporter:
+    """Import products for one user in chunked, bulk transactions
+
+    Rows are validated a chunk at a time. Tag and category names are
+    resolved to IDs with one query per chunk for the names not seen
+    before; missing ones are created. Each valid chunk is written with
+    `bulk_create` for products and for the tags through table.
+    """
+
+    def __init__(self, user, chunk_size=None, using='default'):
+        self.user = user
+        self.chunk_size = chunk_size or settings.PRODUCT_IMPORT_CHUNK_SIZE
+        self.using = using
+        self.tag_ids = {}
+        self.category_ids = {}
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+
+    def run(self, rows):
+        """Import `(line_number, row)` pairs and return a report"""
+        start = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'created': self.created,
+            'failed': self.error_count,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.created / elapsed, 1)
+            if elapsed else None,
+        }
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def validate(self, chunk):
+        # Return the valid rows of a chunk, recording the invalid ones
+        valid = []
+        for line, row in chunk:
+            if isinstance(row, Exception):
+                self.add_error(line, [str(row)])
+                continue
+            serializer = ProductImportSerializer(data=row)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                self.add_error(line, serializer.errors)
+
+        return valid
+
+    def resolve(self, model, cache, names):
+        """Map names to IDs for the user, creating the missing rows"""
+        missing = {name for name in names if name not in cache}
+        if not missing:
+            return
+        manager = model.objects.using(self.using)
+        existing = manager.filter(user=self.user, name__in=missing)
+        for pk, name in existing.values_list('id', 'name'):
+            cache.setdefault(name, pk)
+        new = missing - cache.keys()
+        if new:
+            # Another import may be creating the same names concurrently
+            manager.bulk_create(
+                [model(user=self.user, name=name) for name in sorted(new)],
+                ignore_conflicts=True
+            )
+            created = manager.filter(user=self.user, name__in=new)
+            for pk, name in created.values_list('id', 'name'):
+                cache.setdefault(name, pk)
+
+    def insert_products(self, products):
+        # Bulk insert products and make sure they come back with IDs
+        connection = connections[self.using]
+        manager = Product.objects.using(self.using)
+        if connection.features.can_return_rows_from_bulk_insert:
+            return manager.bulk_create(products)
+
+        # Backends without INSERT ... RETURNING (SQLite) serialise writers,
+        # so the rows above the previous high-water mark are this batch.
+        last = manager.filter(user=self.user).order_by('-id') \
+            .values_list('id', flat=True).first() or 0
+        manager.bulk_create(products)
+        ids = manager.filter(user=self.user, id__gt=last).order_by('id') \
+            .values_list('id', flat=True)
+        for product, pk in zip(products, ids):
+            product.pk = pk
+
+        return products
+
+    def import_chunk(self, chunk):
+        valid = self.validate(chunk)
+        if not valid:
+            return
+
+        with transaction.atomic(using=self.using):
+            self.resolve(Tag, self.tag_ids, {
+                name for row in valid for name in row['tags']
+            })
+            self.resolve(Category, self.category_ids, {
+                row['categories'] for row in valid if row.get('categories')
+            })
+
+            products = self.insert_products([
+                Product(
+                    user=self.user,
+                    title=row['title'],
+                    time_minutes=row['time_minutes'],
+                    price=row['price'],
+                    link=row['link'],
+                    categories_id=self.category_ids.get(row.get('categories'))
+                )
+                for row in valid
+            ])
+
+            through = Product.tags.through
+            links = through.objects.using(self.using).bulk_create([
+                through(product_id=product.pk, tag_id=tag_id)
+                for product, row in zip(products, valid)
+                for tag_id in {self.tag_ids[name] for name in row['tags']}
+            ])
+            # Bulk writes send no model signals
+            Tag.objects.adjust_product_counts(
+                Counter(link.tag_id for link in links), self.using
+            )
+            Category.objects.adjust_product_counts(
+                Counter(product.categories_id for product in products),
+                self.using
+            )
+            refresh_listings([product.pk for product in products], self.using)
+
+            versions = CollectionVersion.objects.db_manager(self.using)
+            for collection in ('products', 'tags', 'categories'):
+                versions.bump(collection, self.user)
+
+        self.created += len(products)
+        if products:
+            catalog_cache.invalidate_on_commit(self.using)
+
+
+class AttrBulkWriter:
+    """Create, upsert or delete a user's tags or categories in bulk
+
+    Items are validated in one pass, their names matched against the
+    user's existing rows with one query and the new ones inserted with
+    one `bulk_create`. Inserts skip rows that conflict on the
+    `(user, name)` constraint and read the winners back, so concurrent
+    writers of a name agree on its ID. Results are reported per item, in
+    payload order.
+    """
+    CREATED = 'created'
+    EXISTS = 'exists'
+    INVALID = 'invalid'
+    DELETED = 'deleted'
+    NOT_FOUND = 'not_found'
+
+    def __init__(self, model, user, using='default'):
+        self.model = model
+        self.user = user
+        self.using = using
+        self.name_field = serializers.CharField(
+            max_length=model._meta.get_field('name').max_length
+        )
+        self.id_field = serializers.IntegerField(min_value=1)
+
+    def validate(self, items, field, key=None):
+        # Return `(results, values)`, values being None for invalid items
+        results, values = [], []
+        for index, item in enumerate(items):
+            results.append({'index': index})
+            value = item
+            try:
+                if key is not None:
+                    if not isinstance(item, dict):
+                        raise serializers.ValidationError(
+                            'Expected an object.'
+                        )
+                    value = item.get(key, serializers.empty)
+                values.append(field.run_validation(value))
+            except serializers.ValidationError as exc:
+                results[-1].update(status=self.INVALID, errors=exc.detail)
+                values.append(None)
+
+        return results, values
+
+    def write(self, items, upsert=False):
+        """Create the named items, or with `upsert` return existing ones"""
+        results, names = self.validate(items, self.name_field, key='name')
+        manager = self.model.objects.using(self.using)
+        wanted = {name for name in names if name is not None}
+        existing = dict(
+            manager.filter(user=self.user, name__in=wanted)
+            .values_list('name', 'id')
+        )
+        created = {}
+        new = wanted - existing.keys()
+        if new:
+            manager.bulk_create([
+                self.model(user=self.user, name=name) for name in sorted(new)
+            ], ignore_conflicts=True)
+            created = dict(
+                manager.filter(user=self.user, name__in=new)
+                .values_list('name', 'id')
+            )
+            if created:
+                # Bulk inserts send no model signals
+                CollectionVersion.objects.db_manager(self.using).bump(
+                    VERSION_COLLECTIONS[self.model], self.user
+                )
+
+        for result, name in zip(results, names):
+            if name is None:
+                continue
+            result['name'] = name
+            if name in created:
+                result.update(status=self.CREATED, id=created.pop(name))
+                existing[name] = result['id']
+            elif upsert:
+                result.update(status=self.EXISTS, id=existing[name])
+            else:
+                result.update(status=self.INVALID, errors=[
+                    f'A {self.model._meta.verbose_name} with this name '
+                    f'already exists.'
+                ])
+
+        return results
+
+    def delete(self, items):
+        """Delete the user's objects among the given IDs"""
+        results, ids = self.validate(items, self.id_field)
+        manager = self.model.objects.using(self.using)
+        found = set(
+            manager.filter(user=self.user, id__in=set(ids) - {None})
+            .values_list('id', flat=True)
+        )
+        if found:
+            manager.filter(id__in=found).delete()
+
+        for result, pk in zip(results, ids):
+            if pk is not None:
+                result.update(
+                    id=pk,
+                    status=self.DELETED if pk in found else self.NOT_FOUND
+                )
+
+        return results
+
+
+class BulkTagsSerializer(serializers.Serializer):
+    # Validate a bulk tag assignment; replacing with no tags clears them
+    MODES = ('add', 'remove', 'replace')
+
+    products = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=1))
+    mode = serializers.ChoiceField(choices=MODES, default='add')
+
+    def validate_products(self, value):
+        limit = settings.API_MAX_BULK_ITEMS
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f'Send at most {limit} products at a time.'
+            )
+        return value
+
+    def validate(self, data):
+        if not data['tags'] and data['mode'] != 'replace':
+            raise serializers.ValidationError(
+                {'tags': ['This list may not be empty.']}
+            )
+        return data
+
+
+def _owned_ids(model, user, ids, using):
+    # Return the requested IDs, raising for any the user does not own
+    ids = set(ids)
+    owned = set(
+        model.objects.using(using).filter(user=user, id__in=ids)
+        .values_list('id', flat=True)
+    )
+    missing = ids - owned
+    if missing:
+        name = model._meta.verbose_name_plural.lower()
+        raise serializers.ValidationError({name: [
+            f'Unknown IDs: {", ".join(map(str, sorted(missing)))}.'
+        ]})
+    return owned
+
+
+def assign_tags(user, product_ids, tag_ids, mode='add', using='default'):
+    """Add, remove or replace the tags of a set of the user's products
+
+    The change is diffed against the through table and written with one
+    insert and one delete, then announced once with
+    `product_tags_bulk_changed` for the products actually changed.
+    Tag `product_count`s move by the links diffed; a concurrent writer
+    of the same links can make them drift, which
+    `reconcile_product_counts` repairs. Returns the numbers of links
+    added and removed.
+    """
+    products = _owned_ids(Product, user, product_ids, using)
+    tags = _owned_ids(Tag, user, tag_ids, using)
+    links = Product.tags.through.objects.using(using)
+
+    with transaction.atomic(using=using):
+        stale = links.none()
+        if mode == 'remove':
+            stale = links.filter(product_id__in=products, tag_id__in=tags)
+        elif mode == 'replace':
+            stale = links.filter(product_id__in=products) \
+                .exclude(tag_id__in=tags)
+        stale_links = list(stale.values_list('product_id', 'tag_id'))
+        changed = {product_id for product_id, _ in stale_links}
+        removed = stale.delete()[0] if changed else 0
+        counts = Counter()
+        counts.subtract(tag_id for _, tag_id in stale_links)
+
+        missing = []
+        if mode != 'remove':
+            current = set(
+                links.filter(product_id__in=products, tag_id__in=tags)
+                .values_list('product_id', 'tag_id')
+            )
+            missing = [
+                (product_id, tag_id)
+                for product_id in sorted(products) for tag_id in sorted(tags)
+                if (product_id, tag_id) not in current
+            ]
+            links.bulk_create([
+                links.model(product_id=product_id, tag_id=tag_id)
+                for product_id, tag_id in missing
+            ], ignore_conflicts=True)
+            changed.update(product_id for product_id, _ in missing)
+            counts.update(tag_id for _, tag_id in missing)
+
+        Tag.objects.adjust_product_counts(counts, using)
+        if changed:
+            product_tags_bulk_changed.send(
+                sender=Product, product_ids=sorted(changed), user=user,
+                using=using
+            )
+
+    return {
+        'products': len(changed),
+        'added': len(missing),
+        'removed': removed,
+    }
+
+
+def _export_rows(queryset, chunk_size):
+    # Yield export dicts, fetching tag names one chunk of products at a time
+    rows = queryset.order_by('id').values(
+        'id', 'title', 'time_minutes', 'price', 'link', 'categories__name'
+    ).iterator(chunk_size=chunk_size)
+    through = Product.tags.through
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        tags = {}
+        links = through.objects.filter(
+            product_id__in=[row['id'] for row in chunk]
+        ).order_by('tag__name').values_list('product_id', 'tag__name')
+        for product_id, name in links:
+            tags.setdefault(product_id, []).append(name)
+
+        for row in chunk:
+            yield {
+                'id': row['id'],
+                'title': row['title'],
+                'time_minutes': row['time_minutes'],
+                'price': str(row['price']),
+                'link': row['link'],
+                'categories': row['categories__name'],
+                'tags': tags.get(row['id'], []),
+            }
+
+
+def iter_export(queryset, fmt='ndjson', chunk_size=None):
+    """Stream products as NDJSON or CSV lines
+
+    Rows come from a server-side cursor where the backend has one, so
+    memory use stays flat however many products are exported.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+    rows = _export_rows(queryset, chunk_size)
+
+    if fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps(row) + '\n'
+        return
+
+    # Batch CSV lines into larger writes instead of one per row
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['categories'] = row['categories'] or ''
+        row['tags'] = TAG_SEPARATOR.join(row['tags'])
+        writer.writerow([row[field] for field in EXPORT_FIELDS])
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
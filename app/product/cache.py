@@ -0,0 +1,210 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from rest_framework.response import Response
+
+from core.cache import LRUCache
+
+
+class ResponseCache:
+    """Two tier cache of serialized responses with stampede protection
+
+    Entries live in an in-process LRU and, when `alias` names a Django
+    cache, in that shared cache as well. Every key embeds a generation
+    number; `invalidate` bumps it, which orphans all earlier entries.
+    Without a shared cache the generation is per process, so it only
+    orphans the entries of the worker that wrote: callers serving
+    several workers must also put what they validate against, such as
+    `version_tag`, in their keys. Entries are fresh for `ttl` seconds and then
+    served stale for up to `stale_ttl` more while a single caller, the
+    one holding the recompute lock, refreshes them.
+    """
+
+    def __init__(self, prefix, ttl, stale_ttl, maxsize, alias=None,
+                 lock_timeout=10):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.alias = alias
+        self.lock_timeout = lock_timeout
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self._generation = 0
+        self._computing = set()
+        self._mutex = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def generation(self):
+        shared = self.shared
+        if shared is None:
+            return self._generation
+        return shared.get(f'{self.prefix}:generation', 0)
+
+    def invalidate(self):
+        """Orphan every cached response"""
+        with self._mutex:
+            self._generation += 1
+        self.local.clear()
+        shared = self.shared
+        if shared is not None:
+            key = f'{self.prefix}:generation'
+            shared.add(key, 0, None)
+            try:
+                shared.incr(key)
+            except ValueError:
+                # Evicted between add and incr
+                shared.set(key, 1, None)
+
+    def invalidate_on_commit(self, using=None):
+        # Invalidate now and once the writing transaction is visible, so
+        # a page recomputed from the old rows in between is not kept
+        self.invalidate()
+        transaction.on_commit(self.invalidate, using=using)
+
+    def _read(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+        return entry
+
+    def _write(self, key, value):
+        entry = (time.time() + self.ttl, value)
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry, self.ttl + self.stale_ttl)
+
+    def _acquire(self, key):
+        if self.shared is not None:
+            return self.shared.add(
+                f'{key}:lock', 1, self.lock_timeout
+            )
+        with self._mutex:
+            if key in self._computing:
+                return False
+            self._computing.add(key)
+            return True
+
+    def _release(self, key):
+        if self.shared is not None:
+            self.shared.delete(f'{key}:lock')
+        with self._mutex:
+            self._computing.discard(key)
+
+    def get_or_compute(self, key, compute):
+        """Return `(value, state)` where state is hit, stale or miss
+
+        `compute` returns the value to cache, or None for responses that
+        must not be cached.
+        """
+        key = f'{self.prefix}:{self.generation()}:{key}'
+        entry = self._read(key)
+        if entry is not None and entry[0] > time.time():
+            return entry[1], 'hit'
+
+        deadline = time.monotonic() + self.lock_timeout
+        acquired = self._acquire(key)
+        while not acquired:
+            if entry is not None:
+                return entry[1], 'stale'
+            if time.monotonic() >= deadline:
+                # The lock holder is stuck or gone; compute it ourselves
+                break
+            # Someone else is computing a cold entry; wait for it briefly
+            time.sleep(0.05)
+            entry = self._read(key)
+            if entry is not None:
+                return entry[1], 'hit'
+            acquired = self._acquire(key)
+
+        try:
+            value = compute()
+            if value is not None:
+                self._write(key, value)
+        finally:
+            if acquired:
+                self._release(key)
+
+        return value, 'miss'
+
+
+catalog_cache = ResponseCache(
+    prefix='catalog',
+    ttl=settings.CATALOG_CACHE_TTL,
+    stale_ttl=settings.CATALOG_CACHE_STALE_TTL,
+    maxsize=settings.CATALOG_CACHE_SIZE,
+    alias=settings.CATALOG_SHARED_CACHE
+)
+
+
+def version_tag(view):
+    """Return the `CollectionVersion` numbers behind a view's ETag
+
+    Put in cache keys, they change on every worker as soon as a write
+    is recorded by any of them, and keep a cached body in step with the
+    ETag sent along with it.
+    """
+    current = getattr(view, 'current_versions', None)
+    if current is None:
+        return ''
+    return ','.join(
+        f'{key}={version}'
+        for key, (version, _) in sorted(current().items())
+    )
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve responses from a `ResponseCache`
+
+    Only the response data is cached; rendering still happens per
+    request. Keys are built from `cache_query_params` alone, so unknown
+    parameters cannot be used to bypass the cache, and from
+    `version_tag`, so writes recorded by other workers are seen. The
+    `X-Cache` header reports whether a response was a hit, a stale hit
+    or a miss.
+    """
+    response_cache = None
+    cache_query_params = ('cursor', 'page_size')
+
+    def get_cache_key(self, request, *args, **kwargs):
+        params = sorted(
+            (name, value)
+            for name in self.cache_query_params
+            for value in request.query_params.getlist(name)
+        )
+        query = '&'.join(f'{name}={value}' for name, value in params)
+        # Pagination links are absolute, so the host is part of the key
+        return f'{self.action}:{request.get_host()}:{kwargs}:{query}:' \
+            f'{version_tag(self)}'
+
+    def cached(self, handler, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED or self.response_cache is None:
+            return handler(request, *args, **kwargs)
+
+        response = None
+
+        def compute():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            return response.data if response.status_code == 200 else None
+
+        data, state = self.response_cache.get_or_compute(
+            self.get_cache_key(request, *args, **kwargs), compute
+        )
+        if response is None:
+            response = Response(data)
+        response['X-Cache'] = state.upper()
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
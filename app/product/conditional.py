@@ -0,0 +1,77 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from core.models import CollectionVersion
+
+
+class ConditionalReadMixin:
+    """Answer list requests with 304 when nothing has changed
+
+    The ETag and Last-Modified values come from the `CollectionVersion`
+    counters of `version_collections`, which `product.signals` bump on
+    every write. Checking them costs one indexed query and no
+    serialization. Views with `version_per_user` read the counters of the
+    requesting user; otherwise the counters shared by all users.
+    Detail views opt in by routing `retrieve` through `conditional`.
+    """
+    version_collections = ()
+    version_per_user = True
+
+    def get_version_keys(self):
+        user = self.request.user if self.version_per_user else None
+        keys = []
+        for collection in self.version_collections:
+            keys += CollectionVersion.objects.keys(collection, user)
+        return keys
+
+    def current_versions(self):
+        """Return `{key: (version, updated_at)}`, read once per request"""
+        if getattr(self, '_current_versions', None) is None:
+            self._current_versions = CollectionVersion.objects.current(
+                self.get_version_keys()
+            )
+        return self._current_versions
+
+    def get_validators(self, request):
+        """Return the `(etag, last_modified)` of the current request"""
+        versions = self.current_versions()
+        parts = [
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(request.user.pk) if self.version_per_user else '',
+        ]
+        parts += [f'{key}={versions.get(key, (0,))[0]}'
+                  for key in sorted(self.get_version_keys())]
+        etag = '"{}"'.format(
+            hashlib.md5('\n'.join(parts).encode()).hexdigest()
+        )
+        timestamps = [updated_at for _, updated_at in versions.values()]
+        last_modified = int(max(timestamps).timestamp()) \
+            if timestamps else None
+
+        return etag, last_modified
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache' \
+            if self.version_per_user else 'no-cache'
+        if self.version_per_user:
+            patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
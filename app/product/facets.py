@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db.models import Count, Q
+
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.models import Tag, Category, Product
+from product.cache import catalog_cache, version_tag
+from product.filters import ProductFilter
+
+
+def price_buckets():
+    # `(min, max)` pairs around PRODUCT_FACET_PRICE_BUCKETS, open at both
+    # ends; min is inclusive and max exclusive
+    edges = tuple(settings.PRODUCT_FACET_PRICE_BUCKETS)
+    return list(zip((None,) + edges, edges + (None,)))
+
+
+def _bucket_count(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return Count('pk', filter=condition) if condition else Count('pk')
+
+
+def _ranked(pairs):
+    # Facet values with products, most used first
+    pairs = [(pk, count) for pk, count in pairs if pk is not None and count]
+    return [
+        {'id': pk, 'count': count}
+        for pk, count in sorted(pairs, key=lambda pair: (-pair[1], pair[0]))
+    ]
+
+
+def facet_counts(queryset, product_filter, user):
+    """Count the products of `queryset` per tag, category and price bucket
+
+    A single grouped pass over the products yields the total, the
+    category counts and every price bucket as conditional aggregates;
+    tags take one more grouped query over the through table. Without
+    any filter the tag and category counts are the maintained
+    `product_count` columns instead.
+    """
+    buckets = price_buckets()
+    aggregates = {
+        f'price_{index}': _bucket_count(low, high)
+        for index, (low, high) in enumerate(buckets)
+    }
+    products = queryset.order_by()
+    through = Product.tags.through.objects
+
+    if product_filter.active:
+        rows = list(
+            products.values('categories_id')
+            .annotate(count=Count('pk'), **aggregates)
+        )
+        categories = [(row['categories_id'], row['count']) for row in rows]
+        tags = through.filter(product_id__in=products.values('pk')) \
+            .values('tag_id').annotate(count=Count('product_id')) \
+            .order_by().values_list('tag_id', 'count')
+    else:
+        rows = [products.aggregate(count=Count('pk'), **aggregates)]
+        categories = Category.objects.filter(
+            user=user, product_count__gt=0
+        ).values_list('pk', 'product_count')
+        tags = Tag.objects.filter(user=user, product_count__gt=0) \
+            .values_list('pk', 'product_count')
+
+    return {
+        'count': sum(row['count'] for row in rows),
+        'tags': _ranked(tags),
+        'categories': _ranked(categories),
+        'price': [
+            {
+                'min': low,
+                'max': high,
+                'count': sum(row[f'price_{index}'] for row in rows),
+            }
+            for index, (low, high) in enumerate(buckets)
+        ],
+    }
+
+
+class FacetsMixin:
+    """Add a `facets` action counting what the viewset's list would show
+
+    The list's filters and scoping apply. Results are cached in
+    `facet_cache` per user, filter signature and collection versions,
+    so parameters that do not change the filter share an entry, and
+    answer conditional requests through `ConditionalReadMixin`.
+    """
+    facet_cache = catalog_cache
+
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        return self.conditional(self.facet_response, request)
+
+    def facet_response(self, request):
+        product_filter = ProductFilter(request.query_params)
+        queryset = self.get_queryset()
+
+        def compute():
+            return facet_counts(queryset, product_filter, request.user)
+
+        if not settings.RESPONSE_CACHE_ENABLED or self.facet_cache is None:
+            return Response(compute())
+
+        data, state = self.facet_cache.get_or_compute(
+            f'facets:{request.user.pk}:{product_filter.signature()}:'
+            f'{version_tag(self)}', compute
+        )
+        response = Response(data)
+        response['X-Cache'] = state.upper()
+        return response
@@ -0,0 +1,253 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render the same bytes as `JSONRenderer`, with orjson when installed
+
+    Only meant for data made of strings, integers, booleans, None, lists
+    and dicts, such as list pages: orjson formats floats differently.
+    Anything orjson cannot encode the same way falls back to the parent.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or \
+                not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        # Escaped by JSONRenderer for JavaScript (JSONP) consumers
+        return ret.replace('\u2028'.encode(), b'\\u2028') \
+            .replace('\u2029'.encode(), b'\\u2029')
+
+
+@lru_cache(maxsize=None)
+def get_fast_plan(serializer_class):
+    """Describe how to render a serializer class from `values()` rows
+
+    Returns `(name, kind, source, extra)` steps in field order, or None
+    when a field needs the full serializer. Kinds are `column` for model
+    columns, `pk` for primary key relations to one object, `many_pk` for
+    primary key lists of many-to-many relations and `nested` for reverse
+    foreign keys rendered by a serializer made of columns only.
+    """
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return None
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    plan = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+
+        if isinstance(field, serializers.ListSerializer):
+            child = get_fast_plan(type(field.child))
+            if not model_field.one_to_many or child is None or \
+                    any(step[1] != 'column' for step in child):
+                return None
+            plan.append((name, 'nested', field.source, child))
+        elif isinstance(field, serializers.ManyRelatedField):
+            if not model_field.many_to_many or \
+                    type(field.child_relation) is not \
+                    serializers.PrimaryKeyRelatedField or \
+                    field.child_relation.pk_field is not None:
+                return None
+            plan.append((name, 'many_pk', field.source, None))
+        elif type(field) is serializers.PrimaryKeyRelatedField:
+            if not model_field.concrete or field.pk_field is not None:
+                return None
+            plan.append((name, 'pk', model_field.attname, None))
+        elif isinstance(field, (serializers.RelatedField,
+                                serializers.BaseSerializer)):
+            return None
+        elif model_field.concrete and (
+            not model_field.is_relation or
+            field.source == model_field.attname
+        ):
+            plan.append((name, 'column', field.source, None))
+        else:
+            return None
+
+    return tuple(plan)
+
+
+def _column_converter(field, model):
+    # The serializer field's own conversion, fed what the model would hold
+    model_field = model._meta.get_field(field.source)
+    if isinstance(model_field, models.FileField):
+        def convert(value):
+            return field.to_representation(
+                model_field.attr_class(None, model_field, value)
+            )
+        return convert
+
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """Serialize `values()` rows the way a bound serializer renders objects
+
+    Built once per request from a serializer carrying the request
+    context; each row then costs a loop over precompiled converters
+    instead of a serializer field walk. Many-to-many primary keys and
+    nested reverse relations are fetched with one query each per page,
+    in the order the optimized prefetches use.
+    """
+
+    def __init__(self, plan, serializer):
+        self.model = serializer.Meta.model
+        self.steps = []
+        self.columns = ['pk']
+        for name, kind, source, child in plan:
+            field = serializer.fields[name]
+            if kind == 'column':
+                self.steps.append(
+                    (name, kind, source, _column_converter(field, self.model))
+                )
+                self.columns.append(source)
+            elif kind == 'pk':
+                self.steps.append((name, kind, source, None))
+                self.columns.append(source)
+            elif kind == 'many_pk':
+                self.steps.append((name, kind, source, None))
+            else:
+                child_serializer = field.child
+                child_model = child_serializer.Meta.model
+                converters = [
+                    (child_name, child_source, _column_converter(
+                        child_serializer.fields[child_name], child_model
+                    ))
+                    for child_name, _, child_source, _ in child
+                ]
+                self.steps.append((name, kind, source, converters))
+
+    def values(self, queryset, extra=()):
+        return queryset.prefetch_related(None).values(
+            *dict.fromkeys(self.columns + list(extra))
+        )
+
+    def fetch_many_pk(self, source, ids, using):
+        model_field = self.model._meta.get_field(source)
+        through = model_field.remote_field.through
+        own = model_field.m2m_field_name() + '_id'
+        other = model_field.m2m_reverse_field_name() + '_id'
+        grouped = {}
+        for pk, related_pk in through._default_manager.using(using) \
+                .filter(**{f'{own}__in': ids}) \
+                .order_by(other).values_list(own, other):
+            grouped.setdefault(pk, []).append(related_pk)
+        return grouped
+
+    def fetch_nested(self, source, converters, ids, using):
+        remote = self.model._meta.get_field(source).field
+        grouped = {}
+        rows = remote.model._default_manager.using(using) \
+            .filter(**{f'{remote.name}__in': ids}) \
+            .values(remote.attname, *[
+                child_source for _, child_source, _ in converters
+            ])
+        for row in rows:
+            grouped.setdefault(row[remote.attname], []).append({
+                name: None if row[child_source] is None else
+                convert(row[child_source])
+                for name, child_source, convert in converters
+            })
+        return grouped
+
+    def render(self, rows, using='default'):
+        rows = list(rows)
+        ids = [row['pk'] for row in rows]
+        related = {}
+        for name, kind, source, converters in self.steps:
+            if kind == 'many_pk' and ids:
+                related[name] = self.fetch_many_pk(source, ids, using)
+            elif kind == 'nested' and ids:
+                related[name] = self.fetch_nested(
+                    source, converters, ids, using
+                )
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, kind, source, convert in self.steps:
+                if kind == 'column':
+                    value = row[source]
+                    item[name] = None if value is None else convert(value)
+                elif kind == 'pk':
+                    item[name] = row[source]
+                else:
+                    item[name] = related[name].get(row['pk'], [])
+            data.append(item)
+
+        return data
+
+
+class FastListMixin:
+    """Serve list actions from `values()` rows when FAST_LIST_SERIALIZATION
+
+    The page is fetched as dicts, rendered by a `ValuesSerializer` and
+    encoded by `FastJSONRenderer`, producing the same bytes as the
+    serializer and `JSONRenderer` would. Serializers with fields the
+    fast path cannot render keep the regular path.
+    """
+
+    def fast_list(self):
+        return self.action == 'list' and settings.FAST_LIST_SERIALIZATION
+
+    def perform_content_negotiation(self, request, force=False):
+        renderer, media_type = super().perform_content_negotiation(
+            request, force
+        )
+        if type(renderer) is JSONRenderer and self.fast_list():
+            renderer = FastJSONRenderer()
+        return renderer, media_type
+
+    def list(self, request, *args, **kwargs):
+        plan = None
+        if self.fast_list():
+            serializer = self.get_serializer()
+            plan = get_fast_plan(type(serializer))
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        fast = ValuesSerializer(plan, serializer)
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = ()
+        if hasattr(self.paginator, 'get_ordering'):
+            ordering = [
+                field.lstrip('-') for field in
+                self.paginator.get_ordering(request, queryset, self)
+            ]
+        rows = fast.values(queryset, ordering)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                fast.render(page, queryset.db)
+            )
+        return Response(fast.render(rows, queryset.db))
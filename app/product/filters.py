@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from core.models import Product
+
+
+TAG_MATCH_CHOICES = ('any', 'all')
+PRICE_FIELD = serializers.DecimalField(
+    max_digits=None, decimal_places=2, min_value=0
+)
+
+
+def params_to_ints(value, name):
+    """Parse a comma separated list of IDs, keeping the first of duplicates
+
+    Raises a `ValidationError` (HTTP 400) for anything that is not a
+    positive integer or when more than `API_MAX_FILTER_IDS` are given.
+    """
+    limit = settings.API_MAX_FILTER_IDS
+    ids = {}
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            pk = int(part)
+        except ValueError:
+            pk = 0
+        if pk < 1:
+            raise ValidationError({name: [f'"{part}" is not a valid ID.']})
+        ids.setdefault(pk, None)
+        if len(ids) > limit:
+            raise ValidationError(
+                {name: [f'Filter by at most {limit} IDs.']}
+            )
+
+    return list(ids)
+
+
+def param_to_price(value, name):
+    # Parse a non-negative price bound with at most two decimal places
+    try:
+        return PRICE_FIELD.run_validation(value)
+    except ValidationError as exc:
+        raise ValidationError({name: exc.detail})
+
+
+def param_to_bool(value, name):
+    # Parse the 0/1 flags accepted by the list endpoints
+    if value in (None, '', '0'):
+        return False
+    if value == '1':
+        return True
+    raise ValidationError({name: ['Must be 0 or 1.']})
+
+
+class ProductFilter:
+    """Filter products by tag and category IDs and by price
+
+    `tags` match through an `EXISTS` subquery on the through table
+    (`tags_match=any`, the default) or a `GROUP BY ... HAVING COUNT`
+    subquery (`tags_match=all`), so each product appears once and no
+    DISTINCT is needed. Filters are applied on `pk`, so they work on any
+    queryset keyed by product ID. `price_min` and `price_max` are
+    inclusive bounds.
+    """
+
+    def __init__(self, query_params):
+        tags = query_params.get('tags')
+        categories = query_params.get('categories')
+        self.tags = params_to_ints(tags, 'tags') if tags else []
+        self.categories = \
+            params_to_ints(categories, 'categories') if categories else []
+        self.tag_match = query_params.get('tags_match') or 'any'
+        if self.tag_match not in TAG_MATCH_CHOICES:
+            raise ValidationError({'tags_match': [
+                f'Choose one of: {", ".join(TAG_MATCH_CHOICES)}.'
+            ]})
+        self.price_min, self.price_max = (
+            param_to_price(query_params[name], name)
+            if query_params.get(name) else None
+            for name in ('price_min', 'price_max')
+        )
+        if self.price_min is not None and self.price_max is not None \
+                and self.price_min > self.price_max:
+            raise ValidationError(
+                {'price_max': ['Must not be less than price_min.']}
+            )
+
+    @property
+    def active(self):
+        return bool(self.tags or self.categories) or \
+            self.price_min is not None or self.price_max is not None
+
+    def signature(self):
+        """Return a canonical string of the filter, for cache keys"""
+        tag_match = self.tag_match if len(self.tags) > 1 else 'any'
+        return '&'.join([
+            f'tags={",".join(map(str, sorted(self.tags)))}',
+            f'tags_match={tag_match}',
+            f'categories={",".join(map(str, sorted(self.categories)))}',
+            f'price_min={"" if self.price_min is None else self.price_min}',
+            f'price_max={"" if self.price_max is None else self.price_max}',
+        ])
+
+    def filter_tags(self, queryset):
+        through = Product.tags.through.objects
+        if self.tag_match == 'all' and len(self.tags) > 1:
+            matching = through.filter(tag_id__in=self.tags) \
+                .values('product_id') \
+                .annotate(matched=Count('tag_id')) \
+                .filter(matched=len(self.tags)) \
+                .values('product_id')
+            return queryset.filter(pk__in=matching)
+
+        return queryset.filter(Exists(
+            through.filter(product_id=OuterRef('pk'), tag_id__in=self.tags)
+        ))
+
+    def filter(self, queryset, category_field='categories_id'):
+        if self.tags:
+            queryset = self.filter_tags(queryset)
+        if self.categories:
+            queryset = queryset.filter(
+                **{f'{category_field}__in': self.categories}
+            )
+        if self.price_min is not None:
+            queryset = queryset.filter(price__gte=self.price_min)
+        if self.price_max is not None:
+            queryset = queryset.filter(price__lte=self.price_max)
+
+        return queryset
+
+
+class ProductAttrFilter:
+    """Filter tags or categories down to those used by a product
+
+    Reads the maintained `product_count` column, so `assigned_only` costs
+    no join with the products. `with_counts` asks for the counts to be
+    serialized too.
+    """
+
+    def __init__(self, query_params):
+        self.assigned_only = param_to_bool(
+            query_params.get('assigned_only'), 'assigned_only'
+        )
+        self.with_counts = param_to_bool(
+            query_params.get('with_counts'), 'with_counts'
+        )
+
+    @property
+    def reads_counts(self):
+        # Whether the response follows writes to products
+        return self.assigned_only or self.with_counts
+
+    def filter(self, queryset):
+        if not self.assigned_only:
+            return queryset
+
+        return queryset.filter(product_count__gt=0)
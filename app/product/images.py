@@ -0,0 +1,238 @@
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import MediaBlob, Product, ProductImageVariant, ImageJob
+from core.storage import content_storage
+
+
+VARIANT_DIR = 'uploads/product/variants/'
+FORMAT_EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp', 'png': 'png'}
+ALPHA_FORMATS = {'webp', 'png'}
+VARIANT_DIGEST_LENGTH = 16
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations and the transpositions that show them upright
+ORIENTATION_TRANSPOSES = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+
+def exif_transpose(image):
+    """Return `image` turned the way its EXIF orientation displays it"""
+    if hasattr(ImageOps, 'exif_transpose'):
+        return ImageOps.exif_transpose(image)
+    # Pillow before 6.0 has no `ImageOps.exif_transpose`
+    exif = image._getexif() if hasattr(image, '_getexif') else None
+    method = ORIENTATION_TRANSPOSES.get((exif or {}).get(EXIF_ORIENTATION))
+    return image.transpose(method) if method is not None else image
+
+
+def without_alpha(image):
+    # Flatten transparent pixels onto white for formats without alpha
+    if image.mode != 'RGBA':
+        return image
+    flat = Image.new('RGB', image.size, 'white')
+    flat.paste(image, mask=image.getchannel('A'))
+    return flat
+
+
+def render_variants(source_path, target_dir, stem, sizes, formats, quality):
+    """Write resized, upright, metadata-free copies of an image to a dir
+
+    Runs inside a worker process, so it only takes and returns plain
+    data. Returns `(name, format, filename, width, height)` tuples.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    results = []
+
+    with Image.open(source_path) as original:
+        # Let the JPEG decoder downscale while decoding when it can
+        original.draft('RGB', (max(sizes.values()),) * 2)
+        alpha = 'A' in original.getbands() or \
+            'transparency' in original.info
+        # Turn the pixels upright before the orientation tag is dropped
+        image = exif_transpose(original).convert('RGBA' if alpha else 'RGB')
+
+    for name, size in sorted(sizes.items(), key=lambda item: item[1]):
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        # Rebuild from raw pixels so no EXIF, ICC or XMP data survives
+        clean = Image.frombytes(variant.mode, variant.size, variant.tobytes())
+        for fmt in formats:
+            pixels = clean if fmt in ALPHA_FORMATS else without_alpha(clean)
+            buffer = io.BytesIO()
+            pixels.save(buffer, fmt.upper(), quality=quality, optimize=True)
+            # Named after the content so the file can be cached forever
+            digest = hashlib.sha256(buffer.getbuffer()).hexdigest()
+            filename = f'{stem}_{name}.{digest[:VARIANT_DIGEST_LENGTH]}.' \
+                f'{FORMAT_EXTENSIONS[fmt]}'
+            with open(os.path.join(target_dir, filename), 'wb') as target:
+                target.write(buffer.getbuffer())
+            results.append((name, fmt, filename, clean.width, clean.height))
+
+    return results
+
+
+def enqueue_image_job(product):
+    """Mark a freshly uploaded image as pending and queue its processing"""
+    product.image_status = Product.IMAGE_PENDING
+    product.save(update_fields=['image_status', 'updated_at'])
+    job = ImageJob.objects.create(product=product, source=product.image.name)
+
+    if settings.IMAGE_PROCESSING_EAGER:
+        process_job(job)
+        product.refresh_from_db(fields=['image_status'])
+
+    return job
+
+
+def job_arguments(job):
+    # Positional arguments for `render_variants` for the given job
+    stem = os.path.splitext(os.path.basename(job.source))[0]
+    return (
+        content_storage.path(job.source),
+        default_storage.path(VARIANT_DIR),
+        stem,
+        settings.PRODUCT_IMAGE_VARIANTS,
+        settings.PRODUCT_IMAGE_FORMATS,
+        settings.PRODUCT_IMAGE_QUALITY,
+    )
+
+
+def claim_jobs(limit):
+    """Atomically take up to `limit` queued jobs for this worker
+
+    Jobs left running for longer than `IMAGE_JOB_TIMEOUT` belong to a
+    worker that died and are picked up again.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.IMAGE_JOB_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ImageJob.PENDING) |
+                Q(status=ImageJob.RUNNING, updated_at__lt=stale)
+            )
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        ImageJob.objects.filter(id__in=ids).update(
+            status=ImageJob.RUNNING,
+            attempts=F('attempts') + 1,
+            updated_at=timezone.now()
+        )
+
+    return list(ImageJob.objects.filter(id__in=ids).select_related('product'))
+
+
+def complete_job(job, results):
+    """Replace the product's variants with the freshly rendered ones"""
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=job.product_id)
+        names = [VARIANT_DIR + result[2] for result in results]
+        if product.image.name != job.source:
+            # The image was replaced while this job ran; a newer job owns
+            # it, and `gc_media` removes these unreferenced files
+            MediaBlob.objects.register(names)
+        else:
+            # Files may be shared with products holding the same image,
+            # so old ones are only released for `gc_media` to collect
+            stale = list(
+                product.image_variants.values_list('file', flat=True)
+            )
+            product.image_variants.all().delete()
+            ProductImageVariant.objects.bulk_create([
+                ProductImageVariant(
+                    product=product,
+                    name=name,
+                    format=fmt,
+                    file=VARIANT_DIR + filename,
+                    width=width,
+                    height=height
+                )
+                for name, fmt, filename, width, height in results
+            ])
+            MediaBlob.objects.retain(names)
+            MediaBlob.objects.release(stale)
+            product.image_status = Product.IMAGE_READY
+            product.save(update_fields=['image_status', 'updated_at'])
+
+        job.status = ImageJob.DONE
+        job.error = ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def fail_job(job, error):
+    """Put a failed job back in the queue or give up after max attempts"""
+    job.error = str(error)
+    if job.attempts < settings.IMAGE_JOB_MAX_ATTEMPTS:
+        job.status = ImageJob.PENDING
+    else:
+        job.status = ImageJob.FAILED
+        failed = Product.objects.filter(
+            pk=job.product_id, image=job.source
+        ).first()
+        if failed is not None:
+            failed.image_status = Product.IMAGE_FAILED
+            failed.save(update_fields=['image_status', 'updated_at'])
+    job.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def process_job(job):
+    # Render and store the variants of a single job in this process
+    try:
+        results = render_variants(*job_arguments(job))
+    except Exception as exc:
+        fail_job(job, exc)
+    else:
+        complete_job(job, results)
+
+
+def run_worker(processes, batch_size, poll_interval, once=False):
+    """Claim queued jobs and render them on a pool of worker processes
+
+    Returns the number of jobs handled. With `once` the worker stops as
+    soon as the queue is empty instead of polling for new jobs.
+    """
+    handled = 0
+    # Children must not share the parent's database sockets
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        while True:
+            jobs = claim_jobs(batch_size)
+            if not jobs:
+                if once:
+                    return handled
+                time.sleep(poll_interval)
+                continue
+
+            futures = {
+                pool.submit(render_variants, *job_arguments(job)): job
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results = future.result()
+                except Exception as exc:
+                    fail_job(job, exc)
+                else:
+                    complete_job(job, results)
+                handled += 1
@@ -0,0 +1,122 @@
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+
+from core.models import Tag, Product, ProductListing
+from product import serializers
+from product.search import index_listings
+
+
+REFRESH_CHUNK_SIZE = 500
+
+
+def listing_for(product):
+    # Build the listing row of a product loaded with its relations
+    tags = sorted(product.tags.all(), key=lambda tag: tag.pk)
+    category = product.categories
+    return ProductListing(
+        product_id=product.pk,
+        user_id=product.user_id,
+        title=product.title,
+        time_minutes=product.time_minutes,
+        price=product.price,
+        link=product.link,
+        category_id=product.categories_id,
+        category_name=category.name if category is not None else '',
+        tag_ids=json.dumps([tag.pk for tag in tags]),
+        tag_names=json.dumps([tag.name for tag in tags]),
+        image_status=product.image_status,
+        image_variants=json.dumps([
+            {
+                'name': variant.name,
+                'format': variant.format,
+                'width': variant.width,
+                'height': variant.height,
+                'file': variant.file.name,
+            }
+            for variant in product.image_variants.all()
+        ])
+    )
+
+
+def _replace(ids, rows, using):
+    # Swap the listing rows of `ids`; a concurrent refresh of the same
+    # product can insert between our delete and insert, so retry once
+    manager = ProductListing.objects.using(using)
+    for attempt in range(2):
+        try:
+            with transaction.atomic(using=using):
+                manager.filter(product_id__in=ids).delete()
+                manager.bulk_create(rows)
+                index_listings(rows, using)
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def refresh_listings(product_ids, using='default'):
+    """Rebuild the listing rows of the given products from their tables
+
+    Products that no longer exist lose their rows. Runs a fixed number
+    of queries per `REFRESH_CHUNK_SIZE` products.
+    """
+    ids = sorted(set(product_ids))
+    for start in range(0, len(ids), REFRESH_CHUNK_SIZE):
+        chunk = ids[start:start + REFRESH_CHUNK_SIZE]
+        products = Product.objects.using(using).filter(pk__in=chunk) \
+            .select_related('categories') \
+            .prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+                'image_variants'
+            )
+        _replace(chunk, [listing_for(product) for product in products],
+                 using)
+
+
+def rebuild_listings(using='default'):
+    """Refresh every listing row, chunk by chunk, and return the count"""
+    ids = Product.objects.using(using).order_by('pk') \
+        .values_list('pk', flat=True)
+    count = 0
+    chunk = []
+    for pk in ids.iterator(chunk_size=REFRESH_CHUNK_SIZE):
+        chunk.append(pk)
+        if len(chunk) == REFRESH_CHUNK_SIZE:
+            refresh_listings(chunk, using)
+            count += len(chunk)
+            chunk = []
+    refresh_listings(chunk, using)
+
+    return count + len(chunk)
+
+
+class ListingReadMixin:
+    """Serve the list action from the denormalized `ProductListing` rows
+
+    Each page is one indexed query on the listing table instead of a
+    product query plus the category, tag and variant lookups. Views
+    start their list queryset from `get_source_queryset` and filter it
+    on columns both tables share; `PRODUCT_LISTING_READS=0` falls back
+    to the product tables. Searches always read the listing.
+    """
+
+    def reads_listing(self):
+        if self.action == 'search':
+            return True
+        return self.action == 'list' and settings.PRODUCT_LISTING_READS
+
+    def get_source_queryset(self):
+        if self.reads_listing():
+            return ProductListing.objects.all()
+        return self.queryset.all()
+
+    def get_queryset(self):
+        return self.get_source_queryset()
+
+    def get_serializer_class(self):
+        if self.reads_listing():
+            return serializers.ProductListingSerializer
+        return super().get_serializer_class()
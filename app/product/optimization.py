@@ -0,0 +1,93 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+from rest_framework import serializers
+
+
+def _concrete_sources(serializer, model):
+    # Return the model columns a nested serializer actually reads
+    names = {model._meta.pk.name}
+    for field in serializer.fields.values():
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.is_relation:
+            names.add(model_field.name)
+
+    return sorted(names)
+
+
+@lru_cache(maxsize=None)
+def get_related_plan(serializer_class):
+    """Work out which relations a serializer class touches
+
+    Returns a `(select_related, prefetch_related)` pair. Primary key
+    relations to a single object are skipped because DRF renders them
+    from the `<field>_id` column without loading the related row.
+    """
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    select, prefetch = [], []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+        related_model = model_field.related_model
+
+        if isinstance(field, serializers.ListSerializer):
+            only = _concrete_sources(field.child, related_model)
+            if model_field.one_to_many:
+                # Reverse foreign keys are grouped by the remote column
+                only.append(model_field.field.name)
+            prefetch.append((field.source, only))
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.append((field.source, [related_model._meta.pk.name]))
+        elif isinstance(field, serializers.BaseSerializer):
+            select.append(field.source)
+        elif isinstance(field, serializers.RelatedField):
+            if not field.use_pk_only_optimization():
+                select.append(field.source)
+
+    return tuple(select), tuple(prefetch)
+
+
+def optimize_queryset(queryset, serializer_class):
+    """Apply select/prefetch related lookups needed by a serializer"""
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return queryset
+
+    select, prefetch = get_related_plan(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    for source, only in prefetch:
+        related_model = queryset.model._meta.get_field(source).related_model
+        related = related_model._default_manager.only(*only)
+        if not related.ordered:
+            # Tags and other unordered relations render in ID order
+            related = related.order_by('pk')
+        queryset = queryset.prefetch_related(
+            Prefetch(source, queryset=related)
+        )
+
+    return queryset
+
+
+class QuerysetOptimizationMixin:
+    """Prefetch what the active serializer renders for every lookup
+
+    Hooks into `filter_queryset` so list, retrieve and custom actions
+    all go through it, after any filtering done in `get_queryset`.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return optimize_queryset(queryset, self.get_serializer_class())
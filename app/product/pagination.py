@@ -0,0 +1,37 @@
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination seeking on an indexed sort key instead of OFFSET
+
+    Views pick the sort key through a `keyset_ordering` attribute. The
+    first field is the seek key and should be unique (or nearly so) so
+    every page is an index seek: `WHERE key < cursor ORDER BY key LIMIT n`.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        # Allow each view to declare its own stable sort key
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+
+        return tuple(ordering)
+
+    def get_page_size(self, request):
+        # Default to API_PAGE_SIZE and never exceed the hard cap
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            page_size = 0
+        if page_size < 1:
+            page_size = settings.API_PAGE_SIZE
+
+        return min(page_size, self.max_page_size)
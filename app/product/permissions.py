@@ -0,0 +1,17 @@
+from rest_framework import permissions
+
+
+class IsSupplierOrReadOnly(permissions.BasePermission):
+    """Allow read access to anyone, writes to the owning supplier only"""
+
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
+        return bool(request.user and request.user.is_authenticated)
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
+        return obj.user == request.user
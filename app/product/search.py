@@ -0,0 +1,180 @@
+import json
+import operator
+import re
+from functools import reduce
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import (
+    BooleanField, IntegerField, OuterRef, Q, Subquery, Sum
+)
+from django.db.models.expressions import RawSQL
+
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from core.models import ProductSearchTerm
+from product import serializers
+
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+# Weights of a term found in the title, a tag name or the category name;
+# PostgreSQL stores them as the A, B and C tsvector weights
+TITLE_WEIGHT = 4
+TAG_WEIGHT = 2
+CATEGORY_WEIGHT = 1
+# ts_rank weights for D, C, B and A, and the factor turning its float
+# into the integer rank both backends page through
+TS_RANK_WEIGHTS = '{0.1, 0.25, 0.5, 1}'
+TS_RANK_SCALE = 10000
+
+
+def tokenize(text):
+    return [term[:MAX_TERM_LENGTH] for term in TOKEN_RE.findall(text.lower())]
+
+
+def listing_terms(listing):
+    # Return {term: weight} for a listing row, summed across its fields
+    fields = (
+        (listing.title, TITLE_WEIGHT),
+        (' '.join(json.loads(listing.tag_names)), TAG_WEIGHT),
+        (listing.category_name, CATEGORY_WEIGHT),
+    )
+    weights = {}
+    for text, weight in fields:
+        for term in set(tokenize(text)):
+            weights[term] = weights.get(term, 0) + weight
+
+    return weights
+
+
+def uses_postings(using):
+    # PostgreSQL keeps its tsvector column current with a trigger
+    return connections[using].vendor != 'postgresql'
+
+
+def index_listings(listings, using='default'):
+    """Write the inverted index postings of freshly inserted listings
+
+    Old postings go with their listing rows through the cascade.
+    """
+    if not uses_postings(using):
+        return
+
+    ProductSearchTerm.objects.using(using).bulk_create([
+        ProductSearchTerm(term=term, listing_id=listing.pk, weight=weight)
+        for listing in listings
+        for term, weight in listing_terms(listing).items()
+    ])
+
+
+class SearchQuery:
+    """The terms of a `q` parameter, all of which a result must contain
+
+    While the user is still typing, that is unless `q` ends with a
+    space, the last term matches as a prefix when it has at least
+    `SEARCH_MIN_PREFIX` characters.
+    """
+
+    def __init__(self, text):
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms:
+            raise ValidationError({'q': ['Enter a search term.']})
+        if len(terms) > settings.SEARCH_MAX_TERMS:
+            raise ValidationError({'q': [
+                f'Search for at most {settings.SEARCH_MAX_TERMS} terms.'
+            ]})
+
+        self.prefix = None
+        if not text[-1].isspace() and \
+                len(terms[-1]) >= settings.SEARCH_MIN_PREFIX:
+            self.prefix = terms.pop()
+        self.terms = terms
+
+    def tsquery(self):
+        # Terms are word characters only, so quoting them is enough
+        parts = [f"'{term}'" for term in self.terms]
+        if self.prefix:
+            parts.append(f"'{self.prefix}':*")
+        return ' & '.join(parts)
+
+    def term_filters(self):
+        filters = [Q(term=term) for term in self.terms]
+        if self.prefix:
+            # A range instead of LIKE so the term index is used
+            filters.append(
+                Q(term__gte=self.prefix, term__lt=self.prefix + '\U0010ffff')
+            )
+        return filters
+
+
+def _search_postings(queryset, query):
+    postings = ProductSearchTerm.objects.using(queryset.db)
+    filters = query.term_filters()
+    for term_filter in filters:
+        queryset = queryset.filter(
+            pk__in=postings.filter(term_filter).values('listing')
+        )
+    rank = postings.filter(
+        reduce(operator.or_, filters), listing=OuterRef('pk')
+    ).values('listing').annotate(total=Sum('weight')).values('total')
+
+    return queryset.annotate(
+        rank=Subquery(rank, output_field=IntegerField())
+    )
+
+
+def _search_tsvector(queryset, query):
+    column = f'{queryset.model._meta.db_table}.search_vector'
+    tsquery = query.tsquery()
+    match = RawSQL(
+        f"{column} @@ to_tsquery('simple', %s)",
+        (tsquery,),
+        output_field=BooleanField()
+    )
+    rank = RawSQL(
+        f"CAST(ts_rank(%s, {column}, to_tsquery('simple', %s)) * "
+        f"{TS_RANK_SCALE} AS integer)",
+        (TS_RANK_WEIGHTS, tsquery),
+        output_field=IntegerField()
+    )
+
+    return queryset.filter(match).annotate(rank=rank)
+
+
+def search_listings(queryset, query):
+    """Filter listings to those matching `query`, annotated with `rank`
+
+    Ranks are integers on every backend so results can be paged with a
+    keyset on `(rank, pk)`.
+    """
+    if uses_postings(queryset.db):
+        return _search_postings(queryset, query)
+    return _search_tsvector(queryset, query)
+
+
+class SearchMixin:
+    """Add a ranked `search` action over the viewset's listing rows
+
+    The viewset's own filters and scoping apply, so the action searches
+    what its list would show.
+    """
+    search_ordering = ('-rank', '-pk')
+
+    @action(methods=['GET'], detail=False)
+    def search(self, request):
+        query = SearchQuery(request.query_params.get('q', ''))
+        queryset = search_listings(
+            self.filter_queryset(self.get_queryset()), query
+        )
+        self.keyset_ordering = self.search_ordering
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_serializer_class(self):
+        if self.action == 'search':
+            return serializers.ProductSearchSerializer
+        return super().get_serializer_class()
@@ -1,8 +1,34 @@
+import json
+
+from django.core.files.storage import default_storage
+
 from rest_framework import serializers
-from core.models import Tag, Category, Product
+from core.models import (
+    Tag, Category, Product, ProductImageVariant, ProductListing
+)
+from product.uploads import UploadImageField
+
+
+class ProductAttrSerializer(serializers.ModelSerializer):
+    # Serializer for attributes whose names are unique per user
 
+    def validate_name(self, value):
+        request = self.context.get('request')
+        model = self.Meta.model
+        if request is not None and model.objects.filter(
+            user=request.user, name=value
+        ).exists():
+            raise serializers.ValidationError(self.name_taken(value))
+        return value
 
-class TagSerializer(serializers.ModelSerializer):
+    def name_taken(self, value):
+        return (
+            f'You already have a {self.Meta.model._meta.verbose_name} '
+            f'named "{value}".'
+        )
+
+
+class TagSerializer(ProductAttrSerializer):
     # Serializer for tag objects
     class Meta:
         model = Tag
@@ -10,7 +36,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_Fields = ('id',)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ProductAttrSerializer):
     # Serializer for category objects
     class Meta:
         model = Category
@@ -18,6 +44,28 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class TagCountSerializer(TagSerializer):
+    # Tags with the number of products using them
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('product_count',)
+        read_only_fields = ('id', 'product_count')
+
+
+class CategoryCountSerializer(CategorySerializer):
+    # Categories with the number of products in them
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ('product_count',)
+        read_only_fields = ('id', 'product_count')
+
+
+class ProductImageVariantSerializer(serializers.ModelSerializer):
+    # Serializer for the processed renditions of a product image
+    class Meta:
+        model = ProductImageVariant
+        fields = ('name', 'format', 'width', 'height', 'file')
+        read_only_fields = fields
+
+
 class ProductSerializer(serializers.ModelSerializer):
     # Serialize a product
 
@@ -28,11 +76,13 @@ class ProductSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    image_status = serializers.CharField(read_only=True)
+    image_variants = ProductImageVariantSerializer(many=True, read_only=True)
 
     class Meta:
         model = Product
         fields = ('id', 'title', 'categories', 'tags', 'time_minutes',
-                  'price', 'link'
+                  'price', 'link', 'image_status', 'image_variants'
                   )
         read_only_Fields = ('id',)
 
@@ -43,10 +93,56 @@ class ProductDetailSerializer(ProductSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
+class JSONListField(serializers.ReadOnlyField):
+    # Read a JSON array stored in a text column
+    def to_representation(self, value):
+        return json.loads(value)
+
+
+class ListingVariantsField(JSONListField):
+    # Render stored variants the way ProductImageVariantSerializer does
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = super().to_representation(value)
+        for variant in variants:
+            url = default_storage.url(variant['file'])
+            variant['file'] = request.build_absolute_uri(url) \
+                if request is not None else url
+
+        return variants
+
+
+class ProductListingSerializer(serializers.ModelSerializer):
+    # Serialize a listing row exactly as ProductSerializer does a product
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    categories = serializers.IntegerField(source='category_id',
+                                          read_only=True)
+    tags = JSONListField(source='tag_ids')
+    image_variants = ListingVariantsField()
+
+    class Meta:
+        model = ProductListing
+        fields = ProductSerializer.Meta.fields
+        read_only_fields = fields
+
+
+class ProductSearchSerializer(ProductListingSerializer):
+    # Serialize a search result with its relevance
+    rank = serializers.IntegerField(read_only=True)
+
+    class Meta(ProductListingSerializer.Meta):
+        fields = ProductListingSerializer.Meta.fields + ('rank',)
+        read_only_fields = fields
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     # Serializer for uploading images for products
+    image = UploadImageField()
+    image_status = serializers.CharField(read_only=True)
+    image_variants = ProductImageVariantSerializer(many=True, read_only=True)
 
     class Meta:
         model = Product
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_status', 'image_variants')
         read_only_Fields = ('id',)
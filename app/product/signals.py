@@ -0,0 +1,261 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Category, CollectionVersion, MediaBlob, Product
+from core.signals import product_tags_bulk_changed
+from product.cache import catalog_cache
+from product.listing import refresh_listings
+
+
+# Collection versions back the ETags of `ConditionalReadMixin` and the
+# keys of cached responses, so writes bump them here whatever their path:
+# viewsets, the admin, the shell or management commands. Bulk writes that
+# send no model signals bump them themselves.
+
+def bump_version(collection, user, using=None):
+    CollectionVersion.objects.db_manager(using).bump(collection, user)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_version(sender, instance, using=None, **kwargs):
+    bump_version('products', instance.user_id, using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_version(sender, instance, using=None, **kwargs):
+    bump_version('tags', instance.user_id, using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_version(sender, instance, using=None, **kwargs):
+    bump_version('categories', instance.user_id, using)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def product_tags_version(sender, instance, action, using=None, **kwargs):
+    # Either side belongs to the user owning both
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version('products', instance.user_id, using)
+
+
+# The catalog serializes tags and categories by ID only, so renaming one
+# leaves cached pages valid; only changes to products and their links do.
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    catalog_cache.invalidate_on_commit()
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def product_tags_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        catalog_cache.invalidate_on_commit()
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, using=None, **kwargs):
+    # Through rows are removed without m2m_changed, so check for them
+    if Product.tags.through.objects.filter(tag=instance).exists():
+        catalog_cache.invalidate_on_commit()
+        bump_version('products', instance.user_id, using)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, using=None, **kwargs):
+    # Products are detached with a plain UPDATE that sends no signals
+    if Product.objects.filter(categories=instance).exists():
+        catalog_cache.invalidate_on_commit()
+        bump_version('products', instance.user_id, using)
+
+
+# Listing rows copy products with their category and tag names, so they
+# follow every write to those tables, renames included.
+
+def _product_ids(**lookup):
+    return list(Product.objects.filter(**lookup).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_listing(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_listings([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def refresh_tagged_listings(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_listings([instance.pk])
+    elif action == 'pre_clear':
+        instance._listing_products = _product_ids(tags=instance)
+    elif action == 'post_clear':
+        refresh_listings(getattr(instance, '_listing_products', ()))
+    elif action in ('post_add', 'post_remove'):
+        refresh_listings(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_listings(_product_ids(tags=instance))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_listings(_product_ids(categories=instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    instance._listing_products = _product_ids(tags=instance)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    instance._listing_products = _product_ids(categories=instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def attr_deleted(sender, instance, **kwargs):
+    refresh_listings(getattr(instance, '_listing_products', ()))
+
+
+@receiver(product_tags_bulk_changed, sender=Product)
+def product_tags_bulk_changed_handler(sender, product_ids, user, using,
+                                      **kwargs):
+    # One refresh, invalidation and bump for the whole set-based change
+    refresh_listings(product_ids, using)
+    catalog_cache.invalidate_on_commit(using)
+    bump_version('products', user, using)
+
+
+# Media blobs count the products and image variants naming them, so that
+# `gc_media` can remove the ones nothing refers to any more.
+
+@receiver(pre_save, sender=Product)
+def product_image_saving(sender, instance, update_fields=None, **kwargs):
+    # Look the stored image up only when it was not loaded with the row
+    if getattr(instance, '_stored_image', None) is DEFERRED and \
+            (update_fields is None or 'image' in update_fields):
+        instance._stored_image = Product.objects.filter(pk=instance.pk) \
+            .values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def product_image_saved(sender, instance, update_fields=None, **kwargs):
+    stored = getattr(instance, '_stored_image', None)
+    if stored is DEFERRED or \
+            update_fields is not None and 'image' not in update_fields:
+        return
+    name = instance.image.name or ''
+    stored = stored or ''
+    if name != stored:
+        MediaBlob.objects.retain([name])
+        MediaBlob.objects.release([stored])
+    instance._stored_image = name
+
+
+@receiver(pre_delete, sender=Product)
+def product_media_deleting(sender, instance, **kwargs):
+    instance._media_names = [instance.image.name] + list(
+        instance.image_variants.values_list('file', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def product_media_deleted(sender, instance, **kwargs):
+    MediaBlob.objects.release(getattr(instance, '_media_names', ()))
+
+
+# Tags and categories count their products, so that `assigned_only` and
+# `with_counts` read a column instead of joining the products. Counts
+# move with UPDATE ... SET product_count = product_count + n, so
+# concurrent writers add up; `reconcile_product_counts` repairs drift.
+
+def _category_saved(update_fields):
+    return update_fields is None or \
+        not {'categories', 'categories_id'}.isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=Product)
+def product_category_saving(sender, instance, raw=False, update_fields=None,
+                            using=None, **kwargs):
+    # Look the stored category up when the row was loaded without it
+    if raw or instance.pk is None or not _category_saved(update_fields):
+        return
+    if getattr(instance, '_stored_category', DEFERRED) is DEFERRED:
+        instance._stored_category = Product.objects.using(using) \
+            .filter(pk=instance.pk) \
+            .values_list('categories_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def product_category_saved(sender, instance, created, raw=False,
+                           update_fields=None, using=None, **kwargs):
+    if raw or not _category_saved(update_fields):
+        return
+    stored = None if created else instance._stored_category
+    category = instance.categories_id
+    if category != stored:
+        Category.objects.adjust_product_counts(
+            {category: 1, stored: -1}, using
+        )
+    instance._stored_category = category
+
+
+@receiver(pre_delete, sender=Product)
+def product_counts_deleting(sender, instance, using=None, **kwargs):
+    # Through rows are removed without m2m_changed
+    instance._counted_tags = list(
+        Product.tags.through.objects.using(using)
+        .filter(product_id=instance.pk).values_list('tag_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def product_counts_deleted(sender, instance, using=None, **kwargs):
+    Tag.objects.adjust_product_counts(
+        {pk: -1 for pk in getattr(instance, '_counted_tags', ())}, using
+    )
+    Category.objects.adjust_product_counts(
+        {instance.categories_id: -1}, using
+    )
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def count_tag_links(sender, instance, action, reverse, pk_set, using,
+                    **kwargs):
+    # `remove()` reports every ID it was given, linked or not, so the
+    # links about to go are read before they do
+    own, other = ('tag_id', 'product_id') if reverse \
+        else ('product_id', 'tag_id')
+    if action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.using(using).filter(**{own: instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{other}__in': pk_set})
+        instance._uncounted_links = list(
+            links.values_list(other, flat=True)
+        )
+        return
+    if action == 'post_add':
+        linked, sign = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        linked, sign = getattr(instance, '_uncounted_links', ()), -1
+    else:
+        return
+
+    if reverse:
+        deltas = {instance.pk: sign * len(linked)}
+    else:
+        deltas = {pk: sign for pk in linked}
+    Tag.objects.adjust_product_counts(deltas, using)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.urls import reverse
+from django.test import TransactionTestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import asgi_request
+from core.models import Category, Product
+from product.asgi import AsyncReadHandler
+
+
+class FallbackApp:
+    # Records the requests passed through to the stock handler
+
+    def __init__(self):
+        self.paths = []
+
+    async def __call__(self, scope, receive, send):
+        self.paths.append((scope['method'], scope['path']))
+        await send({'type': 'http.response.start', 'status': 204,
+                    'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+class AsyncReadHandlerTests(TransactionTestCase):
+    # Test serving the product read routes from the ASGI read path
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.token = Token.objects.create(user=self.user).key
+        category = Category.objects.create(user=self.user, name='Dinner')
+        self.product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5,
+            categories=category
+        )
+        self.fallback = FallbackApp()
+        self.handler = AsyncReadHandler(fallback=self.fallback)
+
+    def request(self, path, **kwargs):
+        return async_to_sync(asgi_request)(self.handler, path, **kwargs)
+
+    def auth(self):
+        return [(b'authorization', f'Token {self.token}'.encode())]
+
+    def test_catalog_list(self):
+        status, headers, body = self.request(
+            reverse('product:products-list')
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'Content-Type'], b'application/json')
+        self.assertEqual(
+            [item['title'] for item in json.loads(body)['results']],
+            ['Curry']
+        )
+        self.assertEqual(self.fallback.paths, [])
+
+    def test_authenticated_detail(self):
+        path = reverse('product:myproducts-detail', args=[self.product.id])
+
+        status, _, body = self.request(path, headers=self.auth())
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['categories']['name'], 'Dinner')
+
+        status, _, _ = self.request(path)
+        self.assertEqual(status, 401)
+
+    def test_conditional_request(self):
+        path = reverse('product:myproducts-list')
+        _, headers, _ = self.request(path, headers=self.auth())
+
+        status, _, body = self.request(path, headers=self.auth() + [
+            (b'if-none-match', headers[b'ETag'])
+        ])
+
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_request_finished_on_view_thread(self):
+        # Test that connections are released and marked idle by the
+        # thread that used them
+        threads = {'served': set(), 'finished': set()}
+        serve = AsyncReadHandler.serve
+
+        def recording_serve(handler, request, scope):
+            threads['served'].add(threading.get_ident())
+            return serve(handler, request, scope)
+
+        def finished(**kwargs):
+            threads['finished'].add(threading.get_ident())
+
+        request_finished.connect(finished)
+        try:
+            with patch.object(AsyncReadHandler, 'serve', recording_serve):
+                self.request(reverse('product:products-list'))
+        finally:
+            request_finished.disconnect(finished)
+
+        self.assertTrue(threads['served'])
+        self.assertLessEqual(threads['served'], threads['finished'])
+
+    def test_writes_use_fallback(self):
+        list_path = reverse('product:myproducts-list')
+        tags_path = reverse('product:tag-list')
+
+        self.request(list_path, method='POST', headers=self.auth())
+        self.request(tags_path)
+
+        self.assertEqual(
+            self.fallback.paths, [('POST', list_path), ('GET', tags_path)]
+        )
+
+    @override_settings(ASYNC_READ_CONCURRENCY=2)
+    def test_concurrent_views_bounded(self):
+        # Test no more than the configured number of views run at once
+        running = []
+        peak = []
+        lock = threading.Lock()
+        serve = AsyncReadHandler.serve
+
+        def slow_serve(handler, request, scope):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+            return serve(handler, request, scope)
+
+        async def burst():
+            path = reverse('product:products-list')
+            return await asyncio.gather(*[
+                asgi_request(self.handler, path) for _ in range(6)
+            ])
+
+        with patch.object(AsyncReadHandler, 'serve', slow_serve):
+            results = async_to_sync(burst)()
+
+        self.assertEqual([status for status, _, _ in results], [200] * 6)
+        self.assertEqual(max(peak), 2)
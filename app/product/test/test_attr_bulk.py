@@ -0,0 +1,156 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product, ProductListing
+
+
+TAGS_BULK_URL = reverse('product:tag-bulk')
+TAGS_BULK_DELETE_URL = reverse('product:tag-bulk-delete')
+CATEGORIES_BULK_URL = reverse('product:category-bulk')
+CATEGORIES_BULK_DELETE_URL = reverse('product:category-bulk-delete')
+CATALOG_URL = reverse('product:products-list')
+
+
+class BulkAttrApiTests(TestCase):
+    # Test creating, upserting and deleting tags and categories in bulk
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_create_reports_each_item(self):
+        res = self.client.post(TAGS_BULK_URL, [
+            {'name': 'Spicy'}, {'name': 'Vegan'}, {'name': ''},
+            {'name': 'Spicy'}, 'Sweet',
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['created', 'invalid', 'invalid', 'invalid', 'invalid']
+        )
+        spicy = Tag.objects.get(user=self.user, name='Spicy')
+        self.assertEqual(res.data['results'][0]['id'], spicy.id)
+        self.assertEqual(res.data['counts'], {'created': 1, 'invalid': 4})
+
+    def test_create_nothing_valid_rejected(self):
+        res = self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}],
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upsert_returns_existing_ids(self):
+        res = self.client.put(TAGS_BULK_URL, [
+            {'name': 'Vegan'}, {'name': 'Spicy'}, {'name': 'Vegan'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        results = res.data['results']
+        self.assertEqual([result['status'] for result in results],
+                         ['exists', 'created', 'exists'])
+        self.assertEqual(results[0]['id'], self.vegan.id)
+        self.assertEqual(results[2]['id'], self.vegan.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_upsert_runs_constant_queries(self):
+        self.client.put(TAGS_BULK_URL, [{'name': 'Spicy'}], format='json')
+        for count in (2, 20):
+            payload = [{'name': f'Tag {count} {i}'} for i in range(count)]
+            # Read existing, insert, read back and two version bumps
+            with self.assertNumQueries(5):
+                self.client.put(TAGS_BULK_URL, payload, format='json')
+
+    def test_categories_supported(self):
+        res = self.client.post(CATEGORIES_BULK_URL, [{'name': 'Dinner'}],
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Category.objects.filter(name='Dinner').exists())
+
+    def test_names_scoped_to_user(self):
+        other = get_user_model().objects.create_user(
+            'other@root.com',
+            'Welcome1234'
+        )
+        Tag.objects.create(user=other, name='Spicy')
+
+        res = self.client.post(TAGS_BULK_URL, [{'name': 'Spicy'}],
+                               format='json')
+
+        self.assertEqual(res.data['results'][0]['status'], 'created')
+
+    def test_delete(self):
+        product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5
+        )
+        product.tags.add(self.vegan)
+        other = get_user_model().objects.create_user(
+            'other@root.com',
+            'Welcome1234'
+        )
+        foreign = Tag.objects.create(user=other, name='Vegan')
+
+        res = self.client.post(TAGS_BULK_DELETE_URL, [
+            self.vegan.id, foreign.id, 'x',
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['deleted', 'not_found', 'invalid']
+        )
+        self.assertFalse(Tag.objects.filter(id=self.vegan.id).exists())
+        self.assertTrue(Tag.objects.filter(id=foreign.id).exists())
+        self.assertEqual(
+            ProductListing.objects.get(product=product).tag_ids, '[]'
+        )
+
+    def test_delete_changes_catalog_etag(self):
+        # Test that products losing a tag or category are not modified
+        lunch = Category.objects.create(user=self.user, name='Lunch')
+        product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5,
+            categories=lunch
+        )
+        product.tags.add(self.vegan)
+        catalog = APIClient()
+
+        for url, pk, field, empty in (
+            (TAGS_BULK_DELETE_URL, self.vegan.id, 'tags', []),
+            (CATEGORIES_BULK_DELETE_URL, lunch.id, 'categories', None),
+        ):
+            etag = catalog.get(CATALOG_URL)['ETag']
+            self.client.post(url, [pk], format='json')
+
+            res = catalog.get(CATALOG_URL, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['results'][0][field], empty)
+
+    @override_settings(API_MAX_BULK_ITEMS=2)
+    def test_payload_checked(self):
+        for payload in ({'name': 'Spicy'}, [{'name': str(i)}
+                                            for i in range(3)]):
+            res = self.client.post(TAGS_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_required(self):
+        self.client.force_authenticate(None)
+
+        res = self.client.post(TAGS_BULK_URL, [{'name': 'Spicy'}],
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_names_unique_per_user(self):
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user=self.user, name='Vegan')
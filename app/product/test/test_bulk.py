@@ -0,0 +1,276 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product, ProductListing
+from core.signals import product_tags_bulk_changed
+from product.bulk import ProductImporter, iter_ndjson
+
+IMPORT_URL = reverse('product:myproducts-import-products')
+EXPORT_URL = reverse('product:myproducts-export-products')
+BULK_TAGS_URL = reverse('product:myproducts-bulk-tags')
+
+
+def ndjson(*rows):
+    return ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+class ProductImportTests(TestCase):
+    # Test streaming bulk import of products
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        # Test importing products resolves tags and categories by name
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        body = ndjson(
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+             'categories': 'Dinner', 'tags': ['Vegan', 'Spicy']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': '4.00',
+             'tags': ['Vegan']},
+        )
+
+        res = self.client.post(
+            IMPORT_URL, body, content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        curry = Product.objects.get(title='Curry')
+        self.assertEqual(curry.categories.name, 'Dinner')
+        self.assertEqual(
+            sorted(tag.name for tag in curry.tags.all()), ['Spicy', 'Vegan']
+        )
+        salad = Product.objects.get(title='Salad')
+        self.assertEqual(list(salad.tags.all()), [existing])
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 1)
+
+    def test_import_csv(self):
+        # Test importing products from CSV with pipe separated tags
+        body = (
+            'title,time_minutes,price,link,categories,tags\r\n'
+            'Soup,20,3.20,,Lunch,Hot|Vegan\r\n'
+        )
+
+        res = self.client.post(IMPORT_URL, body, content_type='text/csv')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        soup = Product.objects.get(title='Soup')
+        self.assertEqual(soup.tags.count(), 2)
+        self.assertEqual(soup.user, self.user)
+
+    def test_invalid_rows_reported(self):
+        # Test that invalid rows are skipped and reported by line
+        body = ndjson(
+            {'title': 'Good', 'time_minutes': 1, 'price': '1.00'},
+            {'title': 'Bad', 'time_minutes': 'soon', 'price': '1.00'},
+        ) + '{not json\n'
+
+        res = self.client.post(
+            IMPORT_URL, body, content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertEqual(
+            [error['line'] for error in res.data['errors']], [2, 3]
+        )
+
+    def test_queries_grow_per_chunk_not_per_row(self):
+        # Test that a chunk costs the same number of queries at any size
+        def rows(count):
+            return iter_ndjson(ndjson(*[
+                {'title': f'P{i}', 'time_minutes': 1, 'price': '1.00',
+                 'categories': 'C', 'tags': ['A', 'B']}
+                for i in range(count)
+            ]).splitlines())
+
+        ProductImporter(self.user).run(rows(1))
+        # 8 for the import itself, 2 for the tag and category counts, 8
+        # to refresh the listing rows and their search terms and 6 to
+        # bump the product, tag and category versions
+        with self.assertNumQueries(24):
+            ProductImporter(self.user).run(rows(5))
+        with self.assertNumQueries(24):
+            ProductImporter(self.user).run(rows(50))
+
+
+class ProductExportTests(TestCase):
+    # Test streaming export of products
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(user=self.user, name='Dinner')
+        self.product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=30, price=7.5,
+            categories=category
+        )
+        self.product.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+
+    def test_export_ndjson(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        rows = [json.loads(line) for line in
+                b''.join(res.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, [{
+            'id': self.product.id, 'title': 'Curry', 'time_minutes': 30,
+            'price': '7.50', 'link': '', 'categories': 'Dinner',
+            'tags': ['Hot'],
+        }])
+
+    def test_export_csv(self):
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,title,time_minutes,price,link,'
+                                   'categories,tags')
+        self.assertEqual(lines[1], f'{self.product.id},Curry,30,7.50,,'
+                                   f'Dinner,Hot')
+
+    def test_export_then_import_commands(self):
+        # Test that the commands round-trip a catalog between users
+        get_user_model().objects.create_user('copy@root.com', 'Welcome1234')
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as ntf:
+            call_command('export_products', ntf.name, user='root@root.com')
+            call_command(
+                'import_products', ntf.name, user='copy@root.com',
+                stdout=StringIO()
+            )
+
+        copy = Product.objects.get(user__email='copy@root.com')
+        self.assertEqual(copy.title, 'Curry')
+        self.assertEqual(copy.categories.name, 'Dinner')
+        self.assertEqual([tag.name for tag in copy.tags.all()], ['Hot'])
+
+
+class ProductBulkTagsTests(TestCase):
+    # Test assigning tags to many products in one request
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.products = [
+            Product.objects.create(
+                user=self.user, title=f'P{i}', time_minutes=1, price=1
+            )
+            for i in range(3)
+        ]
+        self.products[0].tags.add(self.vegan)
+
+    def post(self, products, tags, mode):
+        return self.client.post(BULK_TAGS_URL, {
+            'products': [product.id for product in products],
+            'tags': [tag.id for tag in tags],
+            'mode': mode,
+        }, format='json')
+
+    def tag_names(self, product):
+        return sorted(product.tags.values_list('name', flat=True))
+
+    def test_add(self):
+        res = self.post(self.products, [self.vegan, self.spicy], 'add')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'products': 3, 'added': 5, 'removed': 0})
+        for product in self.products:
+            self.assertEqual(self.tag_names(product), ['Spicy', 'Vegan'])
+
+    def test_remove(self):
+        res = self.post(self.products, [self.vegan], 'remove')
+
+        self.assertEqual(res.data, {'products': 1, 'added': 0, 'removed': 1})
+        self.assertEqual(self.tag_names(self.products[0]), [])
+
+    def test_replace(self):
+        res = self.post(self.products[:2], [self.spicy], 'replace')
+
+        self.assertEqual(res.data, {'products': 2, 'added': 2, 'removed': 1})
+        self.assertEqual(self.tag_names(self.products[0]), ['Spicy'])
+        self.assertEqual(self.tag_names(self.products[2]), [])
+
+    def test_unchanged_products_not_announced(self):
+        changes = []
+
+        def receiver(sender, product_ids, **kwargs):
+            changes.append(product_ids)
+
+        product_tags_bulk_changed.connect(receiver)
+        try:
+            self.post(self.products, [self.vegan], 'add')
+            self.post(self.products, [self.vegan], 'add')
+        finally:
+            product_tags_bulk_changed.disconnect(receiver)
+
+        self.assertEqual(
+            changes, [[product.id for product in self.products[1:]]]
+        )
+
+    def test_refreshes_listings(self):
+        self.post(self.products, [self.spicy], 'add')
+
+        for product in self.products:
+            self.assertIn(
+                self.spicy.id,
+                json.loads(ProductListing.objects.get(product=product)
+                           .tag_ids)
+            )
+
+    def test_constant_queries(self):
+        self.post(self.products[:1], [self.spicy], 'add')
+        for count in (2, 20):
+            products = [
+                Product.objects.create(
+                    user=self.user, title=f'Q{i}', time_minutes=1, price=1
+                )
+                for i in range(count)
+            ]
+            # The diff, writes, counts, listing refresh and version bumps
+            with self.assertNumQueries(20):
+                self.post(products, [self.vegan, self.spicy], 'replace')
+
+    def test_foreign_ids_rejected(self):
+        other = get_user_model().objects.create_user(
+            'other@root.com',
+            'Welcome1234'
+        )
+        foreign = Tag.objects.create(user=other, name='Vegan')
+
+        res = self.post(self.products, [foreign], 'add')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(foreign.id), str(res.data['tags']))
+        self.assertEqual(self.tag_names(self.products[1]), [])
+
+    def test_empty_tags_only_for_replace(self):
+        res = self.post(self.products, [], 'add')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.post(self.products, [], 'replace')
+        self.assertEqual(res.data['removed'], 1)
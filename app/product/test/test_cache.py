@@ -0,0 +1,235 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+from product.bulk import ProductImporter
+from product.cache import ResponseCache, catalog_cache
+from product.views import MyProductViewset
+
+CATALOG_URL = reverse('product:products-list')
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog-tests',
+    },
+}
+
+
+def sample_product(user, **params):
+    # Create a sample product
+    defaults = {
+        'title': 'Sample Product',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Product.objects.create(user=user, **defaults)
+
+
+class CatalogCacheTests(TestCase):
+    # Test the response cache of the public catalog
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.product = sample_product(self.user, title='Curry')
+        catalog_cache.invalidate()
+
+    def get(self, params=None):
+        res = self.client.get(CATALOG_URL, params or {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_repeat_request_served_from_cache(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+
+        # Only the ETag validators are read from the database
+        with self.assertNumQueries(1):
+            res = self.get()
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['results'][0]['title'], 'Curry')
+
+    def test_key_ignores_unknown_params(self):
+        self.get()
+
+        self.assertEqual(self.get({'utm_source': 'mail'})['X-Cache'], 'HIT')
+        self.assertEqual(self.get({'page_size': 1})['X-Cache'], 'MISS')
+
+    def test_product_writes_invalidate(self):
+        self.get()
+        sample_product(self.user, title='Salad')
+
+        res = self.get()
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+
+        self.product.delete()
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+
+    def test_tag_links_invalidate(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.get()
+
+        self.product.tags.add(tag)
+        res = self.get()
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+        tag.delete()
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+
+    def test_unused_attribute_writes_keep_cache(self):
+        # Test that only changes visible in the catalog invalidate it
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.get()
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        tag.delete()
+        Category.objects.create(user=self.user, name='Lunch').delete()
+
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_category_delete_invalidates(self):
+        category = Category.objects.create(user=self.user, name='Lunch')
+        self.product.categories = category
+        self.product.save()
+        self.get()
+
+        category.delete()
+
+        res = self.get()
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertIsNone(res.data['results'][0]['categories'])
+
+    def test_bulk_import_invalidates(self):
+        self.get()
+
+        ProductImporter(self.user).run([
+            (1, {'title': 'Soup', 'time_minutes': 5, 'price': '2.00'})
+        ])
+
+        self.assertEqual(len(self.get().data['results']), 2)
+
+    def test_writes_seen_by_every_worker(self):
+        # Test that a write served by one worker, which only invalidates
+        # its own local cache, is not hidden by another worker's entries
+        workers = [ResponseCache('workers', 60, 30, 10) for _ in range(2)]
+
+        def get(worker, **headers):
+            with patch.object(MyProductViewset, 'response_cache', worker):
+                return self.client.get(CATALOG_URL, **headers)
+
+        etags = [get(worker)['ETag'] for worker in workers]
+        self.assertEqual(get(workers[1])['X-Cache'], 'HIT')
+
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(user=self.user, name='Lunch')
+        created = self.client.post(reverse('product:myproducts-list'), {
+            'title': 'Salad', 'time_minutes': 5, 'price': 5,
+            'categories': category.id
+        })
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        workers[0].invalidate()
+
+        res = get(workers[1], HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+        # The new ETag goes with the new body, so revalidating is a 304
+        again = get(workers[1], HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.get()
+
+        self.assertNotIn('X-Cache', self.get())
+
+
+class ResponseCacheTests(TestCase):
+    # Test the two cache tiers and the recompute lock
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_shared_tier_between_workers(self):
+        # Test that workers share entries and invalidations
+        first = ResponseCache('t', 60, 0, 10, alias='catalog')
+        second = ResponseCache('t', 60, 0, 10, alias='catalog')
+
+        first.get_or_compute('page', lambda: 'one')
+        self.assertEqual(
+            second.get_or_compute('page', lambda: 'two'), ('one', 'hit')
+        )
+
+        first.invalidate()
+        self.assertEqual(
+            second.get_or_compute('page', lambda: 'two'), ('two', 'miss')
+        )
+
+    def test_stale_entry_served_while_locked(self):
+        cache = ResponseCache('t', 0, 60, 10)
+        cache.get_or_compute('page', lambda: 'old')
+        key = f't:{cache.generation()}:page'
+
+        self.assertTrue(cache._acquire(key))
+        self.assertEqual(
+            cache.get_or_compute('page', lambda: 'new'), ('old', 'stale')
+        )
+        cache._release(key)
+        self.assertEqual(
+            cache.get_or_compute('page', lambda: 'new'), ('new', 'miss')
+        )
+
+    def test_cold_entry_computed_once(self):
+        # Test that concurrent misses wait for a single computation
+        cache = ResponseCache('t', 60, 0, 10)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'page'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache.get_or_compute('page', compute)[0]
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['page'] * 5)
+
+    def test_uncacheable_values_not_stored(self):
+        cache = ResponseCache('t', 60, 0, 10)
+
+        cache.get_or_compute('missing', lambda: None)
+
+        self.assertEqual(
+            cache.get_or_compute('missing', lambda: 'x'), ('x', 'miss')
+        )
@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+
+PRODUCTS_URL = reverse('product:myproducts-list')
+CATALOG_URL = reverse('product:products-list')
+TAGS_URL = reverse('product:tag-list')
+
+
+def detail_url(product_id):
+    return reverse('product:myproducts-detail', args=[product_id])
+
+
+def create_product(client, title):
+    # Create a product through the API
+    category = Category.objects.first()
+    return client.post(PRODUCTS_URL, {
+        'title': title, 'time_minutes': 10, 'price': '5.00',
+        'categories': category.id, 'tags': []
+    }, format='json')
+
+
+class ConditionalRequestTests(TestCase):
+    # Test ETag and Last-Modified handling of the read endpoints
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        Category.objects.create(user=self.user, name='Dinner')
+        create_product(self.client, 'Curry')
+
+    def test_unchanged_list_not_modified(self):
+        # Test that a matching If-None-Match skips serialization
+        res = self.client.get(PRODUCTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                PRODUCTS_URL, HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_write_changes_etag(self):
+        # Test that creating a product invalidates the previous ETag
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+        create_product(self.client, 'Salad')
+
+        res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_update_and_delete_change_detail_etag(self):
+        product = Product.objects.get(user=self.user)
+        url = detail_url(product.id)
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(url, {'title': 'Hot Curry'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Hot Curry')
+
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+        self.client.delete(url)
+        res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        res = self.client.get(PRODUCTS_URL)
+
+        res = self.client.get(
+            PRODUCTS_URL, HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_varies_by_query(self):
+        # Test that each page and filter gets its own validator
+        first = self.client.get(PRODUCTS_URL)['ETag']
+        filtered = self.client.get(PRODUCTS_URL, {'tags': '1'})['ETag']
+
+        self.assertNotEqual(first, filtered)
+
+    def test_other_user_writes_keep_etag(self):
+        # Test that per user lists ignore writes of other users
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+        other = get_user_model().objects.create_user(
+            'other@root.com', 'Welcome1234'
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+        create_product(client, 'Steak')
+
+        res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['Cache-Control'], 'private, no-cache')
+
+    def test_public_catalog_changes_on_any_write(self):
+        client = APIClient()
+        res = client.get(CATALOG_URL)
+        self.assertEqual(res['Cache-Control'], 'no-cache')
+        self.assertEqual(
+            client.get(CATALOG_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+            .status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        create_product(self.client, 'Salad')
+
+        res = client.get(CATALOG_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_writes_outside_viewsets_change_etag(self):
+        # Test that writes from the admin, shell or commands count too
+        catalog = APIClient().get(CATALOG_URL)['ETag']
+        tags = self.client.get(TAGS_URL)['ETag']
+
+        product = Product.objects.get(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        product.tags.add(tag)
+
+        res = APIClient().get(CATALOG_URL, HTTP_IF_NONE_MATCH=catalog)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=tags)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_list_conditional(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.assertEqual(
+            self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.count(), 1)
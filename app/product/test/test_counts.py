@@ -0,0 +1,188 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+from product.bulk import ProductImporter, assign_tags
+
+PRODUCTS_URL = reverse('product:myproducts-list')
+TAGS_URL = reverse('product:tag-list')
+CATEGORIES_URL = reverse('product:category-list')
+
+
+class ProductCountTests(TestCase):
+    # Test the product counts kept on tags and categories
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.lunch = Category.objects.create(user=self.user, name='Lunch')
+        self.dinner = Category.objects.create(user=self.user, name='Dinner')
+
+    def product(self, **params):
+        return Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5, **params
+        )
+
+    def assertCounts(self, **expected):
+        counts = {
+            obj.name.lower(): obj.product_count
+            for model in (Tag, Category) for obj in model.objects.all()
+        }
+        self.assertEqual({name: counts[name] for name in expected}, expected)
+
+    def test_category_create_change_and_delete(self):
+        product = self.product(categories=self.lunch)
+        self.assertCounts(lunch=1, dinner=0)
+
+        product = Product.objects.get(pk=product.pk)
+        product.categories = self.dinner
+        product.save()
+        self.assertCounts(lunch=0, dinner=1)
+
+        product.title = 'Stew'
+        product.save(update_fields=['title'])
+        Product.objects.only('title').get(pk=product.pk).save()
+        self.assertCounts(lunch=0, dinner=1)
+
+        product.delete()
+        self.assertCounts(lunch=0, dinner=0)
+
+    def test_category_change_on_deferred_row(self):
+        product = self.product(categories=self.lunch)
+
+        product = Product.objects.only('title').get(pk=product.pk)
+        product.categories = None
+        product.save()
+
+        self.assertCounts(lunch=0)
+
+    def test_tag_links_counted_from_both_sides(self):
+        first = self.product()
+        second = self.product()
+
+        first.tags.add(self.vegan, self.spicy)
+        first.tags.add(self.vegan)
+        self.spicy.product_set.add(second)
+        self.assertCounts(vegan=1, spicy=2)
+
+        # Removing a link that does not exist changes nothing
+        second.tags.remove(self.vegan, self.spicy)
+        self.assertCounts(vegan=1, spicy=1)
+
+        first.tags.set([self.spicy])
+        self.assertCounts(vegan=0, spicy=1)
+
+        second.tags.add(self.vegan)
+        self.vegan.product_set.clear()
+        first.tags.clear()
+        self.assertCounts(vegan=0, spicy=0)
+
+    def test_product_delete_releases_tags(self):
+        product = self.product(categories=self.lunch)
+        product.tags.add(self.vegan, self.spicy)
+
+        product.delete()
+
+        self.assertCounts(vegan=0, spicy=0, lunch=0)
+
+    def test_bulk_assignment_and_import(self):
+        products = [self.product(), self.product()]
+        ids = [product.pk for product in products]
+
+        assign_tags(self.user, ids, [self.vegan.pk, self.spicy.pk])
+        self.assertCounts(vegan=2, spicy=2)
+        assign_tags(self.user, ids[:1], [self.vegan.pk], mode='replace')
+        self.assertCounts(vegan=2, spicy=1)
+        assign_tags(self.user, ids, [self.vegan.pk], mode='remove')
+        self.assertCounts(vegan=0, spicy=1)
+
+        ProductImporter(self.user).run(enumerate([
+            {'title': 'Dal', 'time_minutes': 5, 'price': '2.00',
+             'categories': 'Lunch', 'tags': ['Vegan', 'Spicy']},
+            {'title': 'Rice', 'time_minutes': 5, 'price': '1.00',
+             'categories': 'Lunch', 'tags': ['Vegan']},
+        ]))
+        self.assertCounts(vegan=2, spicy=2, lunch=2)
+
+    def test_reconcile_repairs_drift(self):
+        product = self.product(categories=self.lunch)
+        product.tags.add(self.vegan)
+        Tag.objects.update(product_count=7)
+        out = StringIO()
+
+        call_command('reconcile_product_counts', '--dry-run', stdout=out)
+        self.assertIn('Would repair 2 tags counts', out.getvalue())
+        self.assertCounts(vegan=7)
+
+        call_command('reconcile_product_counts', batch_size=1, stdout=out)
+        self.assertIn('Repaired 2 tags counts', out.getvalue())
+        self.assertIn('Repaired 0 categories counts', out.getvalue())
+        self.assertCounts(vegan=1, spicy=0, lunch=1)
+
+
+class ProductCountApiTests(TestCase):
+    # Test listing tags and categories with their counts
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Spicy')
+        self.lunch = Category.objects.create(user=self.user, name='Lunch')
+
+    def test_with_counts(self):
+        product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5,
+            categories=self.lunch
+        )
+        product.tags.add(self.vegan)
+
+        tags = self.client.get(TAGS_URL, {'with_counts': 1})
+        categories = self.client.get(CATEGORIES_URL, {'with_counts': 1})
+        plain = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [(item['name'], item['product_count'])
+             for item in tags.data['results']],
+            [('Vegan', 1), ('Spicy', 0)]
+        )
+        self.assertEqual(categories.data['results'][0]['product_count'], 1)
+        self.assertNotIn('product_count', plain.data['results'][0])
+
+    def test_assigned_only_reads_counter(self):
+        # The version check, then the page
+        with self.assertNumQueries(2) as context:
+            self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        sql = context.captured_queries[-1]['sql']
+        self.assertIn('product_count', sql)
+        self.assertNotIn('core_product', sql)
+
+    def test_counts_follow_product_writes(self):
+        # Test that a product write invalidates the counted list's ETag
+        etag = self.client.get(TAGS_URL, {'with_counts': 1})['ETag']
+
+        self.client.post(PRODUCTS_URL, {
+            'title': 'Curry', 'time_minutes': 5, 'price': 5,
+            'categories': self.lunch.pk, 'tags': [self.vegan.pk]
+        })
+        res = self.client.get(TAGS_URL, {'with_counts': 1},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['product_count'], 1)
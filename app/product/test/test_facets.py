@@ -0,0 +1,161 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+from product.cache import ResponseCache
+from product.views import ProductViewset
+
+FACETS_URL = reverse('product:myproducts-facets')
+PRODUCTS_URL = reverse('product:myproducts-list')
+
+
+def sample_product(user, **params):
+    # Create a sample product
+    defaults = {
+        'title': 'Sample Product',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Product.objects.create(user=user, **defaults)
+
+
+@override_settings(PRODUCT_FACET_PRICE_BUCKETS=(5, 10))
+class ProductFacetTests(TestCase):
+    # Test counting products per tag, category and price bucket
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.lunch = Category.objects.create(user=self.user, name='Lunch')
+        self.dinner = Category.objects.create(user=self.user, name='Dinner')
+
+        curry = sample_product(self.user, price=4, categories=self.lunch)
+        curry.tags.add(self.vegan, self.spicy)
+        dal = sample_product(self.user, price=7.5, categories=self.lunch)
+        dal.tags.add(self.vegan)
+        sample_product(self.user, price=12, categories=self.dinner)
+        sample_product(self.user, price=10)
+
+        other = get_user_model().objects.create_user(
+            'other@root.com',
+            'Welcome1234'
+        )
+        sample_product(other, price=1)
+
+    def facets(self, params=None):
+        res = self.client.get(FACETS_URL, params or {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_unfiltered_facets(self):
+        data = self.facets()
+
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['tags'], [
+            {'id': self.vegan.id, 'count': 2},
+            {'id': self.spicy.id, 'count': 1},
+        ])
+        self.assertEqual(data['categories'], [
+            {'id': self.lunch.id, 'count': 2},
+            {'id': self.dinner.id, 'count': 1},
+        ])
+        self.assertEqual(data['price'], [
+            {'min': None, 'max': 5, 'count': 1},
+            {'min': 5, 'max': 10, 'count': 1},
+            {'min': 10, 'max': None, 'count': 2},
+        ])
+
+    def test_filtered_facets(self):
+        data = self.facets({'categories': str(self.lunch.id)})
+
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['tags'], [
+            {'id': self.vegan.id, 'count': 2},
+            {'id': self.spicy.id, 'count': 1},
+        ])
+        self.assertEqual(data['categories'],
+                         [{'id': self.lunch.id, 'count': 2}])
+        self.assertEqual([bucket['count'] for bucket in data['price']],
+                         [1, 1, 0])
+
+    def test_counts_match_list(self):
+        # Test that facets count what the list shows for the same filter
+        params = {'tags': str(self.vegan.id), 'price_min': '5'}
+
+        data = self.facets(params)
+        res = self.client.get(PRODUCTS_URL, params)
+
+        self.assertEqual(data['count'], len(res.data['results']))
+        self.assertEqual(data['count'], 1)
+
+    def test_price_range(self):
+        data = self.facets({'price_min': '7.5', 'price_max': '10'})
+
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['tags'], [{'id': self.vegan.id, 'count': 1}])
+
+    def test_invalid_price_range(self):
+        for params in ({'price_min': 'cheap'}, {'price_max': '-1'},
+                       {'price_min': '10', 'price_max': '5'}):
+            res = self.client.get(FACETS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_per_filter_signature(self):
+        tags = f'{self.vegan.id},{self.spicy.id}'
+        first = self.client.get(FACETS_URL, {'tags': tags})
+        same = self.client.get(
+            FACETS_URL, {'tags': f'{self.spicy.id},{self.vegan.id}',
+                         'page_size': 5}
+        )
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(same['X-Cache'], 'HIT')
+
+        sample_product(self.user, price=1).tags.add(self.vegan)
+        res = self.client.get(FACETS_URL, {'tags': tags})
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['count'], first.data['count'] + 1)
+
+    def test_writes_seen_by_every_worker(self):
+        # Test that another worker's cached facets do not outlive a write
+        workers = [ResponseCache('workers', 60, 30, 10) for _ in range(2)]
+
+        def facets(worker):
+            with patch.object(ProductViewset, 'facet_cache', worker):
+                return self.client.get(FACETS_URL)
+
+        for worker in workers:
+            facets(worker)
+        self.client.post(PRODUCTS_URL, {
+            'title': 'Soup', 'time_minutes': 5, 'price': 3,
+            'categories': self.lunch.id
+        })
+        workers[0].invalidate()
+
+        res = facets(workers[1])
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['count'], 5)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_grouped_queries(self):
+        # Test that filtered facets take the version check, one pass over
+        # the products and one over the tag links
+        with self.assertNumQueries(3):
+            self.client.get(FACETS_URL, {'categories': str(self.lunch.id)})
+        # Unfiltered ones read the tag and category counters instead
+        with self.assertNumQueries(4):
+            self.client.get(FACETS_URL)
@@ -0,0 +1,146 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product, ProductImageVariant
+from product import fast, serializers
+from product.fast import FastJSONRenderer, ValuesSerializer, get_fast_plan
+from product.listing import refresh_listings
+
+
+# Strings JSON encoders are known to disagree on
+AWKWARD = 'Crème "brûlée" \\ </script> \u2028\u2029 \x01\t 😀'
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    # Test the fast renderer produces JSONRenderer's bytes
+
+    def test_same_bytes(self):
+        data = {'results': [{'id': 1, 'title': AWKWARD, 'tags': [],
+                             'link': None, 'ready': True}]}
+
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_encoded_by_orjson(self):
+        # Test that the fast path runs when orjson is installed
+        data = {'results': [{'id': 1, 'title': AWKWARD}]}
+        with patch('product.fast.orjson.dumps',
+                   wraps=fast.orjson.dumps) as dumps:
+            ret = FastJSONRenderer().render(data)
+
+        dumps.assert_called_once_with(data)
+        self.assertEqual(ret, JSONRenderer().render(data))
+
+    def test_without_orjson(self):
+        with patch('product.fast.orjson', None):
+            self.assertEqual(FastJSONRenderer().render({'title': AWKWARD}),
+                             JSONRenderer().render({'title': AWKWARD}))
+
+    def test_indented_requests_use_json(self):
+        renderer = FastJSONRenderer()
+
+        ret = renderer.render([1], 'application/json; indent=2')
+
+        self.assertEqual(ret, b'[\n  1\n]')
+
+
+class FastPlanTests(SimpleTestCase):
+    # Test which serializers the fast path can render
+
+    def test_list_serializers_supported(self):
+        for serializer_class in (serializers.ProductSerializer,
+                                 serializers.ProductListingSerializer,
+                                 serializers.TagSerializer):
+            self.assertIsNotNone(get_fast_plan(serializer_class))
+
+    def test_nested_objects_not_supported(self):
+        self.assertIsNone(get_fast_plan(serializers.ProductDetailSerializer))
+
+
+class FastListDifferentialTests(TestCase):
+    # Test fast list responses are byte-identical to the serializers'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(user=self.user, name=AWKWARD)
+        Category.objects.create(user=self.user, name='Unused')
+        tags = [Tag.objects.create(user=self.user, name=f'{AWKWARD} {i}')
+                for i in range(4)]
+        for i in range(5):
+            product = Product.objects.create(
+                user=self.user, title=f'{AWKWARD} {i}', time_minutes=i,
+                price='1.10', link='' if i % 2 else AWKWARD,
+                categories=category if i % 3 else None
+            )
+            product.tags.set(tags[i % 4:])
+        ProductImageVariant.objects.create(
+            product=product, name='thumb', format='webp',
+            file='uploads/product/variants/a é.webp', width=1, height=1
+        )
+        ProductImageVariant.objects.create(
+            product=product, name='thumb', format='jpeg',
+            file='uploads/product/variants/a é.jpg', width=1, height=1
+        )
+        refresh_listings([product.id])
+
+    def assert_identical(self, url, **params):
+        pages = 0
+        while url:
+            with override_settings(FAST_LIST_SERIALIZATION=False):
+                expected = self.client.get(url, params)
+            with override_settings(FAST_LIST_SERIALIZATION=True):
+                actual = self.client.get(url, params)
+
+            self.assertEqual(actual.status_code, 200)
+            self.assertEqual(actual.content, expected.content)
+            url, params = expected.json().get('next'), {}
+            pages += 1
+        self.assertGreater(pages, 1)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_product_lists(self):
+        for reads_listing in (True, False):
+            with override_settings(PRODUCT_LISTING_READS=reads_listing):
+                self.assert_identical(reverse('product:myproducts-list'),
+                                      page_size=2)
+                self.assert_identical(reverse('product:products-list'),
+                                      page_size=2)
+
+    def test_filtered_list(self):
+        self.assert_identical(
+            reverse('product:myproducts-list'),
+            page_size=1, tags=str(Tag.objects.last().id)
+        )
+
+    def test_attribute_lists(self):
+        self.assert_identical(reverse('product:tag-list'), page_size=3)
+        self.assert_identical(reverse('product:category-list'), page_size=1)
+
+    @override_settings(FAST_LIST_SERIALIZATION=True)
+    def test_fast_path_used(self):
+        render = ValuesSerializer.render
+        with patch.object(ValuesSerializer, 'render', autospec=True,
+                          side_effect=render) as mock:
+            self.client.get(reverse('product:myproducts-list'))
+            self.client.get(reverse('product:tag-list'))
+
+        self.assertEqual(mock.call_count, 2)
+
+    @override_settings(FAST_LIST_SERIALIZATION=True)
+    def test_browsable_api_unaffected(self):
+        res = self.client.get(reverse('product:tag-list'),
+                              HTTP_ACCEPT='text/html')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'<html', res.content)
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+
+PRODUCTS_URL = reverse('product:myproducts-list')
+TAGS_URL = reverse('product:tag-list')
+CATEGORIES_URL = reverse('product:category-list')
+
+
+def sample_product(user, **params):
+    # Create a sample product
+    defaults = {
+        'title': 'Sample Product',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Product.objects.create(user=user, **defaults)
+
+
+class ProductFilterTests(TestCase):
+    # Test filtering products by tags and categories
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.curry = sample_product(self.user, title='Curry')
+        self.curry.tags.add(self.vegan, self.spicy)
+        self.salad = sample_product(self.user, title='Salad')
+        self.salad.tags.add(self.vegan)
+        self.steak = sample_product(self.user, title='Steak')
+
+    def titles(self, params):
+        res = self.client.get(PRODUCTS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in res.data['results']]
+
+    def test_any_tag_returns_each_product_once(self):
+        # Test that a product matching several tags is not duplicated
+        titles = self.titles({'tags': f'{self.vegan.id},{self.spicy.id}'})
+
+        self.assertEqual(titles, ['Salad', 'Curry'])
+
+    def test_all_tags(self):
+        # Test that tags_match=all requires every tag
+        titles = self.titles({
+            'tags': f'{self.vegan.id},{self.spicy.id}',
+            'tags_match': 'all'
+        })
+
+        self.assertEqual(titles, ['Curry'])
+
+    def test_duplicate_ids_ignored(self):
+        # Test that repeating an ID does not break an all-match
+        titles = self.titles({
+            'tags': f'{self.spicy.id},{self.spicy.id}',
+            'tags_match': 'all'
+        })
+
+        self.assertEqual(titles, ['Curry'])
+
+    def test_filter_by_category(self):
+        category = Category.objects.create(user=self.user, name='Lunch')
+        self.salad.categories = category
+        self.salad.save()
+
+        titles = self.titles({'categories': str(category.id)})
+
+        self.assertEqual(titles, ['Salad'])
+
+    def test_invalid_ids_rejected(self):
+        # Test that malformed IDs are a client error, not a server error
+        for value in ('1,a', '-1', '1.5'):
+            res = self.client.get(PRODUCTS_URL, {'tags': value})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('tags', res.data)
+
+    def test_invalid_tags_match_rejected(self):
+        res = self.client.get(
+            PRODUCTS_URL, {'tags': '1', 'tags_match': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(API_MAX_FILTER_IDS=3)
+    def test_id_list_capped(self):
+        # Test that oversized ID lists are rejected
+        res = self.client.get(PRODUCTS_URL, {'categories': '1,2,3,4'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_any_match_runs_without_distinct(self):
+        # Test that the filter relies on EXISTS instead of a DISTINCT join
+        with self.assertNumQueries(2) as context:
+            self.client.get(PRODUCTS_URL, {'tags': str(self.vegan.id)})
+
+        sql = context.captured_queries[1]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+
+class ProductAttrFilterTests(TestCase):
+    # Test the assigned_only filter of tags and categories
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_assigned_categories_unique(self):
+        # Test that a category used by two products is listed once
+        used = Category.objects.create(user=self.user, name='Lunch')
+        Category.objects.create(user=self.user, name='Dinner')
+        sample_product(self.user, categories=used)
+        sample_product(self.user, categories=used)
+
+        res = self.client.get(CATEGORIES_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            [item['name'] for item in res.data['results']], ['Lunch']
+        )
+
+    def test_invalid_assigned_only(self):
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,193 @@
+import os
+import shutil
+import struct
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MediaBlob, Product, ImageJob
+from product import images
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload_url(product_id):
+    # Return url for product image upload
+    return reverse('product:myproducts-upload-image', args=[product_id])
+
+
+def exif_bytes(tag, value):
+    # An EXIF block holding one ASCII or SHORT tag, as JPEG APP1 payload
+    if isinstance(value, str):
+        data = value.encode() + b'\0'
+        entry = struct.pack('<HHII', tag, 2, len(data), 26)
+    else:
+        data = b''
+        entry = struct.pack('<HHIHH', tag, 3, 1, value, 0)
+    ifd = struct.pack('<H', 1) + entry + struct.pack('<I', 0)
+    return b'Exif\0\0' + b'II*\0' + struct.pack('<I', 8) + ifd + data
+
+
+def sample_product(user, **params):
+    # Create a sample product
+    defaults = {
+        'title': 'Sample Product',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Product.objects.create(user=user, **defaults)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImagePipelineTests(TestCase):
+    # Test queuing and rendering product image variants
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.product = sample_product(user=self.user)
+
+    def upload(self, size=(1600, 1200), exif=True, mode='RGB'):
+        # Upload a JPEG carrying EXIF data, or a half transparent PNG
+        # for RGBA, to the product; `exif` may also be the EXIF block
+        fmt, color = ('PNG', (255, 0, 0, 128)) if mode == 'RGBA' \
+            else ('JPEG', 'red')
+        with tempfile.NamedTemporaryFile(suffix=f'.{fmt.lower()}') as ntf:
+            img = Image.new(mode, size, color=color)
+            params = {}
+            if exif is True:
+                params['exif'] = exif_bytes(0x010f, 'Camera maker')
+            elif exif:
+                params['exif'] = exif
+            img.save(ntf, format=fmt, **params)
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.product.id),
+                {'image': ntf},
+                format='multipart'
+            )
+
+    def test_upload_queues_job(self):
+        # Test that an upload is stored and queued, not processed inline
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Product.IMAGE_PENDING)
+        self.assertEqual(res.data['image_variants'], [])
+        job = ImageJob.objects.get(product=self.product)
+        self.assertEqual(job.status, ImageJob.PENDING)
+
+    def test_process_job_renders_variants(self):
+        # Test that a job renders every size and format without metadata
+        self.upload()
+        job = images.claim_jobs(10)[0]
+
+        images.process_job(job)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_status, Product.IMAGE_READY)
+        variants = self.product.image_variants.all()
+        self.assertEqual(len(variants), 6)
+        large = variants.get(name='large', format='jpeg')
+        self.assertEqual((large.width, large.height), (1200, 900))
+        with Image.open(large.file.path) as rendered:
+            self.assertNotIn('exif', rendered.info)
+        webp = variants.get(name='thumb', format='webp')
+        with Image.open(webp.file.path) as rendered:
+            self.assertEqual(rendered.format, 'WEBP')
+
+    def test_small_images_not_upscaled(self):
+        # Test that variants never exceed the original size
+        self.upload(size=(100, 50), exif=False)
+
+        images.process_job(images.claim_jobs(10)[0])
+
+        large = self.product.image_variants.get(name='large', format='jpeg')
+        self.assertEqual((large.width, large.height), (100, 50))
+
+    def test_exif_orientation_applied(self):
+        # Test that a rotated photo is rendered upright
+        self.upload(size=(400, 200), exif=exif_bytes(0x0112, 6))
+
+        images.process_job(images.claim_jobs(10)[0])
+
+        thumb = self.product.image_variants.get(name='thumb', format='jpeg')
+        self.assertEqual((thumb.width, thumb.height), (75, 150))
+        with Image.open(thumb.file.path) as rendered:
+            self.assertEqual(rendered.size, (75, 150))
+
+    def test_alpha_kept_where_supported(self):
+        # Test that WebP keeps transparency and JPEG is flattened
+        self.upload(size=(100, 50), exif=False, mode='RGBA')
+
+        images.process_job(images.claim_jobs(10)[0])
+
+        variants = self.product.image_variants.filter(name='thumb')
+        with Image.open(variants.get(format='webp').file.path) as webp:
+            self.assertEqual(webp.mode, 'RGBA')
+        with Image.open(variants.get(format='jpeg').file.path) as jpeg:
+            self.assertEqual(jpeg.mode, 'RGB')
+
+    def test_claimed_jobs_not_claimed_twice(self):
+        # Test that a running job is not handed to a second worker
+        self.upload()
+
+        self.assertEqual(len(images.claim_jobs(10)), 1)
+        self.assertEqual(images.claim_jobs(10), [])
+
+    def test_failed_job_retried_then_failed(self):
+        # Test that a broken source is retried and finally marked failed
+        self.upload()
+        os.remove(self.product.__class__.objects.get().image.path)
+
+        for attempt in range(3):
+            job = images.claim_jobs(10)[0]
+            images.process_job(job)
+
+        job.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(self.product.image_status, Product.IMAGE_FAILED)
+
+    def test_worker_pool_drains_queue(self):
+        # Test that the process pool worker handles every queued job
+        self.upload()
+
+        handled = images.run_worker(1, 10, 0, once=True)
+
+        self.assertEqual(handled, 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_status, Product.IMAGE_READY)
+
+    def test_replaced_variants_released(self):
+        # Test that re-rendered variants move their blob references
+        self.upload()
+        images.process_job(images.claim_jobs(10)[0])
+        old = set(self.product.image_variants.values_list('file', flat=True))
+        self.upload(size=(800, 600))
+
+        images.process_job(images.claim_jobs(10)[0])
+
+        new = set(self.product.image_variants.values_list('file', flat=True))
+        blobs = dict(MediaBlob.objects.values_list('name', 'refcount'))
+        self.assertEqual(len(old | new), 12)
+        self.assertEqual({blobs[name] for name in old}, {0})
+        self.assertEqual({blobs[name] for name in new}, {1})
@@ -0,0 +1,198 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag, Category, Product, ProductImageVariant, ProductListing
+)
+from product.bulk import ProductImporter
+from product.listing import refresh_listings
+
+
+PRODUCTS_URL = reverse('product:myproducts-list')
+CATALOG_URL = reverse('product:products-list')
+
+
+def sample_product(user, **params):
+    defaults = {'title': 'Curry', 'time_minutes': 5, 'price': 5}
+    defaults.update(params)
+    return Product.objects.create(user=user, **defaults)
+
+
+class ProductListingSyncTests(TestCase):
+    # Test that listing rows follow writes to products and their relations
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.category = Category.objects.create(user=self.user, name='Food')
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.product = sample_product(self.user, categories=self.category)
+        self.product.tags.add(self.spicy, self.vegan)
+
+    def listing(self, product=None):
+        return ProductListing.objects.get(product=product or self.product)
+
+    def test_product_copied(self):
+        listing = self.listing()
+
+        self.assertEqual(listing.title, 'Curry')
+        self.assertEqual(listing.user, self.user)
+        self.assertEqual(listing.category_id, self.category.id)
+        self.assertEqual(listing.category_name, 'Food')
+        self.assertEqual(json.loads(listing.tag_ids),
+                         [self.vegan.id, self.spicy.id])
+        self.assertEqual(json.loads(listing.tag_names), ['Vegan', 'Spicy'])
+
+    def test_product_update_and_delete(self):
+        self.product.title = 'Soup'
+        self.product.save()
+        self.assertEqual(self.listing().title, 'Soup')
+
+        self.product.delete()
+        self.assertFalse(ProductListing.objects.exists())
+
+    def test_tags_removed(self):
+        self.product.tags.remove(self.vegan)
+        self.assertEqual(json.loads(self.listing().tag_ids), [self.spicy.id])
+
+        self.product.tags.clear()
+        self.assertEqual(json.loads(self.listing().tag_ids), [])
+
+    def test_reverse_tag_changes(self):
+        # Test adding and clearing products from the tag side
+        other = sample_product(self.user, title='Soup')
+
+        self.vegan.product_set.add(other)
+        self.assertEqual(json.loads(self.listing(other).tag_names),
+                         ['Vegan'])
+
+        self.vegan.product_set.clear()
+        self.assertEqual(json.loads(self.listing(other).tag_names), [])
+        self.assertEqual(json.loads(self.listing().tag_names), ['Spicy'])
+
+    def test_renames_propagate(self):
+        self.vegan.name = 'Plant based'
+        self.vegan.save()
+        self.category.name = 'Meals'
+        self.category.save()
+
+        listing = self.listing()
+        self.assertEqual(json.loads(listing.tag_names),
+                         ['Plant based', 'Spicy'])
+        self.assertEqual(listing.category_name, 'Meals')
+
+    def test_deletes_propagate(self):
+        self.vegan.delete()
+        self.category.delete()
+
+        listing = self.listing()
+        self.assertEqual(json.loads(listing.tag_ids), [self.spicy.id])
+        self.assertIsNone(listing.category_id)
+        self.assertEqual(listing.category_name, '')
+
+    def test_image_variants_copied(self):
+        ProductImageVariant.objects.create(
+            product=self.product, name='thumb', format='webp',
+            file='uploads/product/variants/a.webp', width=200, height=100
+        )
+        refresh_listings([self.product.id])
+
+        self.assertEqual(json.loads(self.listing().image_variants), [{
+            'name': 'thumb', 'format': 'webp', 'width': 200, 'height': 100,
+            'file': 'uploads/product/variants/a.webp',
+        }])
+
+    def test_bulk_import_copied(self):
+        ProductImporter(self.user).run([
+            (1, {'title': 'Imported', 'time_minutes': 1, 'price': '1.00',
+                 'categories': 'Food', 'tags': ['Vegan']}),
+        ])
+
+        listing = ProductListing.objects.get(title='Imported')
+        self.assertEqual(listing.category_name, 'Food')
+        self.assertEqual(json.loads(listing.tag_names), ['Vegan'])
+
+    def test_rebuild_command(self):
+        ProductListing.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_product_listing', stdout=out)
+
+        self.assertEqual(self.listing().category_name, 'Food')
+        self.assertIn('Rebuilt 1 listings', out.getvalue())
+
+
+class ProductListingReadTests(TestCase):
+    # Test the lists read from the listing render like the product tables
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(user=self.user, name='Food')
+        self.tags = [Tag.objects.create(user=self.user, name=f'Tag {i}')
+                     for i in range(3)]
+        for i in range(3):
+            product = sample_product(
+                self.user, title=f'Product {i}', price='4.50',
+                categories=category
+            )
+            product.tags.set(self.tags[:i])
+        ProductImageVariant.objects.create(
+            product=product, name='thumb', format='webp',
+            file='uploads/product/variants/a.webp', width=200, height=100
+        )
+        refresh_listings([product.id])
+
+    def assert_same_as_tables(self, url, params=None):
+        listing = self.client.get(url, params)
+        with override_settings(PRODUCT_LISTING_READS=False,
+                               RESPONSE_CACHE_ENABLED=False):
+            tables = self.client.get(url, params)
+
+        for item in tables.json()['results']:
+            item['tags'].sort()
+        self.assertEqual(listing.json(), tables.json())
+        return listing.json()['results']
+
+    def test_product_list_matches(self):
+        results = self.assert_same_as_tables(PRODUCTS_URL)
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(results[0]['image_variants'][0]['file']
+                        .startswith('http://testserver/'))
+
+    def test_filtered_list_matches(self):
+        results = self.assert_same_as_tables(
+            PRODUCTS_URL, {'tags': str(self.tags[1].id)}
+        )
+
+        self.assertEqual([item['title'] for item in results], ['Product 2'])
+
+    def test_catalog_list_matches(self):
+        self.assert_same_as_tables(CATALOG_URL, {'page_size': 2})
+
+    def test_other_users_excluded(self):
+        other = get_user_model().objects.create_user(
+            'other@root.com',
+            'Welcome1234'
+        )
+        sample_product(other, title='Hidden')
+
+        res = self.client.get(PRODUCTS_URL)
+
+        self.assertNotIn('Hidden', [item['title'] for item in res.data
+                                    ['results']])
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Product
+
+CATALOG_URL = reverse('product:products-list')
+TAGS_URL = reverse('product:tag-list')
+
+
+def sample_product(user, **params):
+    # Create a sample product
+    defaults = {
+        'title': 'Sample Product',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Product.objects.create(user=user, **defaults)
+
+
+class KeysetPaginationTests(TestCase):
+    # Test cursor pagination of the product and attribute lists
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, **params):
+        # Follow the `next` cursors and return every page
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_catalog_pages_newest_first(self):
+        # Test that walking the catalog returns each product exactly once
+        products = [
+            sample_product(self.user, title=f'Product {i}') for i in range(7)
+        ]
+
+        pages = self.walk(CATALOG_URL, page_size=3)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(ids, [p.id for p in reversed(products)])
+
+    def test_cursor_is_opaque(self):
+        # Test that the next link carries an encoded cursor, not an offset
+        for i in range(3):
+            sample_product(self.user)
+
+        res = self.client.get(CATALOG_URL, {'page_size': 2})
+
+        self.assertIn('cursor=', res.data['next'])
+        self.assertNotIn('offset=', res.data['next'])
+        self.assertIsNone(res.data['previous'])
+
+    @override_settings(API_MAX_PAGE_SIZE=4)
+    def test_page_size_is_capped(self):
+        # Test that clients cannot request more than the hard cap
+        for i in range(6):
+            sample_product(self.user)
+
+        res = self.client.get(CATALOG_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 4)
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_invalid_page_size_uses_default(self):
+        for i in range(3):
+            sample_product(self.user)
+
+        for page_size in ('0', '-3', 'ten', ''):
+            res = self.client.get(CATALOG_URL, {'page_size': page_size})
+
+            self.assertEqual(len(res.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        # Test that a tampered cursor is rejected
+        res = self.client.get(CATALOG_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_paged_by_name(self):
+        # Test that tags keep their name ordering across pages
+        for name in ('Apple', 'Banana', 'Cherry', 'Date', 'Elder'):
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.walk(TAGS_URL, page_size=2)
+
+        names = [item['name'] for page in pages for item in page]
+        self.assertEqual(names, ['Elder', 'Date', 'Cherry', 'Banana', 'Apple'])
+
+    def test_deep_page_costs_the_same(self):
+        # Test that a late page runs as many queries as the first one
+        for i in range(6):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        with self.assertNumQueries(2):
+            self.client.get(TAGS_URL, {'page_size': 2})
+        with self.assertNumQueries(2):
+            self.client.get(second.data['next'])
@@ -13,17 +13,17 @@ from rest_framework.test import APIClient
 from core.models import Product, Tag, Category
 from product.serializers import ProductSerializer, ProductDetailSerializer
 
-PRODUCTS_URL = reverse('product:myproduct-list')
+PRODUCTS_URL = reverse('product:myproducts-list')
 
 
 def image_upload_url(product_id):
     # Return url for product image upload
-    return reverse('product:product-upload-image', args=[product_id])
+    return reverse('product:myproducts-upload-image', args=[product_id])
 
 
 def detail_url(product_id):
     # Getting product detail url
-    return reverse('product:product-detail', args=[product_id])
+    return reverse('product:myproducts-detail', args=[product_id])
 
 
 def sample_tag(user, name='Main Course'):
@@ -83,7 +83,7 @@ class PrivateProductAPITest(TestCase):
         serializer = ProductSerializer(products, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_products_limited_to_user(self):
         # Test that products in the list belong to the auth user
@@ -100,14 +100,15 @@ class PrivateProductAPITest(TestCase):
         serializer = ProductSerializer(products, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_product_detail(self):
         # Test viewing product detail
         product = sample_product(user=self.user)
         product.tags.add(sample_tag(user=self.user))
-        product.categories.add(sample_category(user=self.user))
+        product.categories = sample_category(user=self.user)
+        product.save()
 
         url = detail_url(product.id)
         res = self.client.get(url)
@@ -120,6 +121,7 @@ class PrivateProductAPITest(TestCase):
         # Test creating product
         payload = {
             'title': 'Chocolate Cheescake',
+            'categories': sample_category(user=self.user).id,
             'time_minutes': 30,
             'price': 5.00
         }
@@ -127,6 +129,7 @@ class PrivateProductAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         product = Product.objects.get(id=res.data['id'])
+        self.assertEqual(product.categories_id, payload.pop('categories'))
         for key in payload.keys():
             self.assertEqual(payload[key], getattr(product, key))
 
@@ -136,6 +139,7 @@ class PrivateProductAPITest(TestCase):
         tag2 = sample_tag(user=self.user, name='Tag 2')
         payload = {
             'title': 'Test product with two tags',
+            'categories': sample_category(user=self.user).id,
             'tags': [tag1.id, tag2.id],
             'time_minutes': 30,
             'price': 10.00
@@ -150,12 +154,11 @@ class PrivateProductAPITest(TestCase):
         self.assertIn(tag2, tags)
 
     def test_create_product_with_categories(self):
-        """Test creating product with categories"""
-        category1 = sample_category(user=self.user, name='Category 1')
-        category2 = sample_category(user=self.user, name='Category 2')
+        """Test creating product with a category"""
+        category = sample_category(user=self.user, name='Category 1')
         payload = {
             'title': 'Test product with categories',
-            'categories': [category1.id, category2.id],
+            'categories': category.id,
             'time_minutes': 45,
             'price': 15.00
         }
@@ -164,10 +167,7 @@ class PrivateProductAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         product = Product.objects.get(id=res.data['id'])
-        categories = product.categories.all()
-        self.assertEqual(categories.count(), 2)
-        self.assertIn(category1, categories)
-        self.assertIn(category2, categories)
+        self.assertEqual(product.categories, category)
 
     def test_partial_update_product(self):
         # Test updating product with patch
@@ -196,6 +196,7 @@ class PrivateProductAPITest(TestCase):
 
         payload = {
             'title': 'Spagheti Carbonaro',
+            'categories': sample_category(user=self.user).id,
             'time_minutes': 25,
             'price': 5.00
         }
@@ -267,9 +268,9 @@ class ProductImageUploadTests(TestCase):
         serializer1 = ProductSerializer(product1)
         serializer2 = ProductSerializer(product2)
         serializer3 = ProductSerializer(product3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_products_by_categories(self):
         """Test returning products with specific categories"""
@@ -277,8 +278,10 @@ class ProductImageUploadTests(TestCase):
         product2 = sample_product(user=self.user, title='Chicken cacciatore')
         category1 = sample_category(user=self.user, name='Feta cheese')
         category2 = sample_category(user=self.user, name='Chicken')
-        product1.categories.add(category1)
-        product2.categories.add(category2)
+        product1.categories = category1
+        product1.save()
+        product2.categories = category2
+        product2.save()
         product3 = sample_product(user=self.user, title='Steak and mushrooms')
 
         res = self.client.get(
@@ -289,6 +292,6 @@ class ProductImageUploadTests(TestCase):
         serializer1 = ProductSerializer(product1)
         serializer2 = ProductSerializer(product2)
         serializer3 = ProductSerializer(product3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
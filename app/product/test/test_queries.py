@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+from product.optimization import get_related_plan
+from product.serializers import ProductSerializer, ProductDetailSerializer
+
+PRODUCTS_URL = reverse('product:myproducts-list')
+CATALOG_URL = reverse('product:products-list')
+
+
+def detail_url(product_id):
+    # Getting product detail url
+    return reverse('product:myproducts-detail', args=[product_id])
+
+
+class RelatedPlanTests(TestCase):
+    # Test the relations picked for each serializer
+
+    def test_list_serializer_plan(self):
+        # Test that pk-only relations skip the join but prefetch tags
+        select, prefetch = get_related_plan(ProductSerializer)
+
+        self.assertEqual(select, ())
+        self.assertEqual(prefetch[0], ('tags', ['id']))
+
+    def test_detail_serializer_plan(self):
+        # Test that nested serializers join or prefetch their columns
+        select, prefetch = get_related_plan(ProductDetailSerializer)
+
+        self.assertEqual(select, ('categories',))
+        self.assertEqual(prefetch[0], ('tags', ['id', 'name']))
+
+    def test_reverse_relation_plan(self):
+        # Test that reverse relations keep the column they are grouped by
+        select, prefetch = get_related_plan(ProductSerializer)
+
+        source, only = prefetch[1]
+        self.assertEqual(source, 'image_variants')
+        self.assertIn('product', only)
+
+
+class ProductQueryCountTests(TestCase):
+    # Test that product endpoints run a constant number of queries
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        self.category = Category.objects.create(user=self.user, name='Food')
+
+    def create_products(self, count):
+        # Create products that each carry every tag and a category
+        products = []
+        for i in range(count):
+            product = Product.objects.create(
+                user=self.user,
+                title=f'Product {i}',
+                time_minutes=5,
+                price=5.00,
+                categories=self.category
+            )
+            product.tags.set(self.tags)
+            products.append(product)
+
+        return products
+
+    def assert_constant_queries(self, url, params=None, expected=2):
+        # Check the query count stays the same as the product count grows
+        for count in (1, 10):
+            self.create_products(count)
+            with self.assertNumQueries(expected):
+                res = self.client.get(url, params or {})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_products(self):
+        self.assert_constant_queries(PRODUCTS_URL)
+
+    def test_list_catalog(self):
+        self.assert_constant_queries(CATALOG_URL)
+
+    def test_filtered_list(self):
+        self.assert_constant_queries(
+            PRODUCTS_URL,
+            {'tags': ','.join(str(tag.id) for tag in self.tags[:2])}
+        )
+
+    def test_product_detail(self):
+        # Test that a detail view joins the category and prefetches tags
+        product = self.create_products(1)[0]
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(product.id))
+
+        self.assertEqual(res.data['categories']['name'], 'Food')
+        self.assertEqual(len(res.data['tags']), 3)
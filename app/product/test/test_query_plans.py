@@ -0,0 +1,100 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Tag, Category, Product
+from product import views
+
+
+def plan_problems(queryset):
+    """Return the full scans and sorts the database plans for a query
+
+    On PostgreSQL sequential scans are disabled for the transaction so
+    a `Seq Scan` in the plan means no usable index exists, regardless
+    of how small the test tables are.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = json.loads(queryset.explain(format='json'))
+
+        def walk(node):
+            if node.get('Node Type') == 'Seq Scan':
+                yield f'Seq Scan on {node["Relation Name"]}'
+            for child in node.get('Plans', []):
+                yield from walk(child)
+
+        return list(walk(plan[0]['Plan']))
+
+    problems = []
+    for line in queryset.explain().splitlines():
+        if re.search(r'\bSCAN (TABLE )?core_', line) or \
+                'TEMP B-TREE FOR ORDER BY' in line:
+            problems.append(line)
+    return problems
+
+
+class QueryPlanTests(TestCase):
+    # Test that the product endpoints are served from indexes
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.category = Category.objects.create(user=self.user, name='Food')
+        product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5,
+            categories=self.category
+        )
+        product.tags.add(self.tag)
+
+    def page_queryset(self, viewset, params=None):
+        # Build the exact queryset a list request pages through
+        django_request = self.factory.get('/', params or {})
+        force_authenticate(django_request, user=self.user)
+        view = viewset(action='list', format_kwarg=None)
+        view.request = Request(django_request)
+        view.request.user = self.user
+
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        ordering = paginator.get_ordering(view.request, queryset, view)
+        return queryset.order_by(*ordering)[:paginator.max_page_size]
+
+    def assert_indexed(self, queryset):
+        self.assertEqual(plan_problems(queryset), [])
+
+    def test_product_list(self):
+        self.assert_indexed(self.page_queryset(views.ProductViewset))
+
+    def test_product_list_by_tags(self):
+        self.assert_indexed(self.page_queryset(
+            views.ProductViewset, {'tags': str(self.tag.id)}
+        ))
+
+    def test_product_list_by_categories(self):
+        self.assert_indexed(self.page_queryset(
+            views.ProductViewset, {'categories': str(self.category.id)}
+        ))
+
+    def test_tag_list(self):
+        self.assert_indexed(self.page_queryset(views.TagViewSet))
+
+    def test_tag_list_assigned_only(self):
+        self.assert_indexed(self.page_queryset(
+            views.TagViewSet, {'assigned_only': 1}
+        ))
+
+    def test_category_list_assigned_only(self):
+        self.assert_indexed(self.page_queryset(
+            views.CategoryViewSet, {'assigned_only': 1}
+        ))
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import Tag, Category, Product
+from product.search import SearchQuery
+
+
+SEARCH_URL = reverse('product:myproducts-search')
+CATALOG_SEARCH_URL = reverse('product:products-search')
+
+
+def sample_product(user, title, category=None, tags=()):
+    product = Product.objects.create(
+        user=user, title=title, time_minutes=5, price=5,
+        categories=category
+    )
+    product.tags.set(tags)
+    return product
+
+
+class SearchQueryTests(SimpleTestCase):
+    # Test parsing the search parameter
+
+    def test_last_term_is_prefix_while_typing(self):
+        query = SearchQuery('Chicken Cur')
+
+        self.assertEqual(query.terms, ['chicken'])
+        self.assertEqual(query.prefix, 'cur')
+        self.assertEqual(query.tsquery(), "'chicken' & 'cur':*")
+
+    def test_trailing_space_ends_prefix(self):
+        query = SearchQuery('chicken curry ')
+
+        self.assertEqual(query.terms, ['chicken', 'curry'])
+        self.assertIsNone(query.prefix)
+
+    @override_settings(SEARCH_MIN_PREFIX=3)
+    def test_short_prefix_matched_exactly(self):
+        self.assertIsNone(SearchQuery('chicken cu').prefix)
+
+    @override_settings(SEARCH_MAX_TERMS=2)
+    def test_rejects_empty_and_long_queries(self):
+        for text in ('', ' !? ', 'a b c'):
+            with self.assertRaises(ValidationError):
+                SearchQuery(text)
+
+
+class ProductSearchApiTests(TestCase):
+    # Test ranked search over titles, tag names and category names
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.curry_tag = Tag.objects.create(user=self.user, name='Curry')
+        self.dinner = Category.objects.create(user=self.user, name='Dinner')
+        self.chicken = sample_product(self.user, 'Chicken curry',
+                                      category=self.dinner)
+        self.rice = sample_product(self.user, 'Rice', category=self.dinner,
+                                   tags=[self.curry_tag])
+        self.soup = sample_product(self.user, 'Tomato soup')
+
+    def titles(self, res):
+        return [item['title'] for item in res.data['results']]
+
+    def test_ranks_title_above_tag(self):
+        res = self.client.get(SEARCH_URL, {'q': 'curry '})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), ['Chicken curry', 'Rice'])
+        ranks = [item['rank'] for item in res.data['results']]
+        self.assertGreater(ranks[0], ranks[1])
+
+    def test_every_term_must_match(self):
+        res = self.client.get(SEARCH_URL, {'q': 'dinner rice '})
+
+        self.assertEqual(self.titles(res), ['Rice'])
+
+    def test_prefix_search(self):
+        res = self.client.get(SEARCH_URL, {'q': 'tom'})
+
+        self.assertEqual(self.titles(res), ['Tomato soup'])
+        self.assertEqual(res.data['results'][0]['id'], self.soup.id)
+
+    def test_paginates_in_rank_order(self):
+        seen = []
+        url, params = SEARCH_URL, {'q': 'cu', 'page_size': 1}
+        while url:
+            res = self.client.get(url, params)
+            seen += self.titles(res)
+            url, params = res.data['next'], None
+
+        self.assertEqual(seen, ['Chicken curry', 'Rice'])
+
+    def test_follows_renames(self):
+        self.curry_tag.name = 'Spicy'
+        self.curry_tag.save()
+
+        res = self.client.get(SEARCH_URL, {'q': 'spicy '})
+
+        self.assertEqual(self.titles(res), ['Rice'])
+
+    def test_combines_with_filters(self):
+        res = self.client.get(SEARCH_URL, {
+            'q': 'curry ', 'tags': str(self.curry_tag.id)
+        })
+
+        self.assertEqual(self.titles(res), ['Rice'])
+
+    def test_scoped_to_user(self):
+        other = get_user_model().objects.create_user(
+            'other@root.com',
+            'Welcome1234'
+        )
+        sample_product(other, 'Beef curry')
+
+        res = self.client.get(SEARCH_URL, {'q': 'beef'})
+        self.assertEqual(self.titles(res), [])
+
+        self.client.force_authenticate(None)
+        res = self.client.get(CATALOG_SEARCH_URL, {'q': 'beef'})
+        self.assertEqual(self.titles(res), ['Beef curry'])
+
+    def test_missing_query_rejected(self):
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_query(self):
+        self.client.force_authenticate(None)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(CATALOG_SEARCH_URL, {'q': 'chicken cu'})
+
+        self.assertEqual(self.titles(res), ['Chicken curry'])
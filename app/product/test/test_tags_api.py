@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -17,6 +19,21 @@ class PublicTagsAPITest(TestCase):
     def setUp(self):
         self.client = APIClient()
 
+    def test_anonymous_list_empty(self):
+        # Test that anonymous users can list tags but own none
+        user = get_user_model().objects.create_user(
+            'root@root.com',
+            'Welcome@1234'
+        )
+        Tag.objects.create(user=user, name='Vegan')
+
+        for url in (TAGS_URL, reverse('product:category-list')):
+            for params in ({}, {'assigned_only': 1}):
+                res = self.client.get(url, params)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.data['results'], [])
+
     # def test_login_required(self):
     #     # Test that login is required for retrieving tags
     #     res = self.client.get(TAGS_URL)
@@ -46,7 +63,7 @@ class PrivateTagsAPITest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         # Test that tags returned are for the authenticated user
@@ -60,8 +77,8 @@ class PrivateTagsAPITest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successfully(self):
         # Test creating a new tag
@@ -74,6 +91,26 @@ class PrivateTagsAPITest(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_tag_duplicate(self):
+        # Test a user cannot have two tags with the same name
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 1)
+
+    def test_create_tag_duplicate_race(self):
+        # Test that a name taken between validation and insert is a 400
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with patch.object(TagSerializer, 'validate_name',
+                          lambda self, value: value):
+            res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+
     def test_create_tag_invalid(self):
         # Creating a tag with invalid payload
         payload = {'name': ''}
@@ -96,8 +133,8 @@ class PrivateTagsAPITest(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_inique(self):
 
@@ -121,4 +158,4 @@ class PrivateTagsAPITest(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,169 @@
+import io
+import shutil
+import struct
+import tempfile
+import zlib
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product
+from product import uploads
+from product.views import ProductViewset
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes(size=(40, 30), fmt='JPEG', **params):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color='red').save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def png_claiming(width, height):
+    # A tiny PNG whose header claims the given dimensions
+    data = bytearray(image_bytes((1, 1), 'PNG'))
+    ihdr = data[12:29]
+    ihdr[4:12] = struct.pack('>II', width, height)
+    data[12:29] = ihdr
+    data[29:33] = struct.pack('>I', zlib.crc32(bytes(ihdr)))
+    return bytes(data)
+
+
+class ProbeImageTests(TestCase):
+
+    def test_formats_read_from_headers(self):
+        for fmt, params in (('JPEG', {}), ('PNG', {}), ('GIF', {}),
+                            ('WEBP', {}), ('WEBP', {'lossless': True})):
+            data = image_bytes((321, 123), fmt, **params)
+            self.assertEqual(
+                uploads.probe_image(data[:64 * 1024]), (fmt, 321, 123)
+            )
+
+    def test_partial_header_unreadable(self):
+        with self.assertRaises(uploads.UnreadableImage):
+            uploads.probe_image(image_bytes()[:20])
+        with self.assertRaises(uploads.UnreadableImage):
+            uploads.probe_image(b'not an image')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    # Test the limits enforced while an image upload streams in
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'root@root.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5
+        )
+
+    def upload(self, data, name='photo.jpg'):
+        upload = io.BytesIO(data)
+        upload.name = name
+        return self.client.post(
+            reverse('product:myproducts-upload-image',
+                    args=[self.product.id]),
+            {'image': upload},
+            format='multipart'
+        )
+
+    def assertNotStored(self):
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.image)
+
+    def test_valid_image_stored(self):
+        res = self.upload(image_bytes())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image.name.endswith('.jpg'))
+
+    def test_name_follows_probed_format(self):
+        # Test that the client's file name cannot pick the served type
+        res = self.upload(image_bytes(fmt='PNG'), 'evil.html')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image.name.endswith('.png'))
+        served = self.client.get(self.product.image.url)
+        self.assertEqual(served['Content-Type'], 'image/png')
+
+    def test_header_after_large_metadata(self):
+        # Test that headers past the first chunks are still found
+        data = image_bytes(icc_profile=b'\0' * (150 * 1024))
+
+        res = self.upload(data)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(PRODUCT_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels(self):
+        res = self.upload(png_claiming(20000, 20000), 'bomb.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', res.data['image'][0])
+        self.assertNotStored()
+
+    def test_decompression_bomb_rejected_without_decoding(self):
+        bomb = png_claiming(50000, 50000)
+        with patch('PIL.ImageFile.ImageFile.load') as load:
+            res = self.upload(bomb, 'bomb.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        load.assert_not_called()
+
+    def test_not_an_image(self):
+        res = self.upload(b'x' * 1000, 'notes.jpg')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotStored()
+
+    def test_format_not_accepted(self):
+        res = self.upload(image_bytes(fmt='BMP'), 'photo.bmp')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('formats', res.data['image'][0])
+
+    @override_settings(PRODUCT_IMAGE_MAX_BYTES=10 * 1024)
+    def test_request_too_large(self):
+        # Test that the declared body length is refused before reading
+        res = self.upload(image_bytes() + b'\0' * (200 * 1024))
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertNotStored()
+
+    @override_settings(PRODUCT_IMAGE_MAX_BYTES=100 * 1024)
+    def test_file_grows_too_large(self):
+        res = self.upload(image_bytes() + b'\0' * (120 * 1024))
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertNotStored()
+
+    @override_settings(PRODUCT_IMAGE_MAX_PIXELS=100 * 100)
+    def test_checked_without_upload_handler(self):
+        with patch.object(ProductViewset, 'upload_handler_class', None):
+            bomb = self.upload(png_claiming(20000, 20000), 'bomb.png')
+            valid = self.upload(image_bytes())
+
+        self.assertEqual(bomb.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(valid.status_code, status.HTTP_200_OK)
@@ -0,0 +1,186 @@
+import io
+import struct
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+
+# Most bytes buffered to find an image's dimensions; JPEG metadata such
+# as EXIF and ICC profiles comes before them
+HEADER_BYTES = 256 * 1024
+# Room for the multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+INVALID_IMAGE = serializers.ImageField.default_error_messages['invalid_image']
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'upload_too_large'
+
+    def __init__(self):
+        super().__init__(
+            _('Images may be at most %d bytes.') %
+            settings.PRODUCT_IMAGE_MAX_BYTES
+        )
+
+
+class InvalidImage(Exception):
+    # An upload that is not an acceptable image
+    pass
+
+
+class UnreadableImage(InvalidImage):
+    # Bytes without a readable image header, possibly only truncated
+    pass
+
+
+def _webp_size(head):
+    # Canvas size from the first chunk of a WebP file, as Pillow cannot
+    # read it from a partial file
+    chunk = head[12:16]
+    if chunk == b'VP8X' and len(head) >= 30:
+        width, height = struct.unpack('<II', head[24:27] + b'\0' +
+                                      head[27:30] + b'\0')
+        return width + 1, height + 1
+    if chunk == b'VP8 ' and len(head) >= 30 and \
+            head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L' and len(head) >= 25 and head[20] == 0x2f:
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    raise UnreadableImage(INVALID_IMAGE)
+
+
+def probe_image(head):
+    """Return `(format, width, height)` from the first bytes of an image
+
+    Only headers are parsed; no pixel is decoded. Raises
+    `UnreadableImage` when the bytes do not start an image, or not yet a
+    complete header.
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return ('WEBP',) + _webp_size(head)
+    try:
+        with Image.open(io.BytesIO(head)) as image:
+            return image.format, image.width, image.height
+    except Image.DecompressionBombError:
+        raise InvalidImage(_('Image has too many pixels.'))
+    except Exception:
+        raise UnreadableImage(INVALID_IMAGE)
+
+
+def check_image(head):
+    """Probe an image header and enforce the upload format and pixel limits
+
+    Rejecting oversized dimensions here, before anything decodes the
+    bitmap, is what keeps decompression bombs cheap to refuse.
+    """
+    fmt, width, height = probe_image(head)
+    formats = settings.PRODUCT_IMAGE_UPLOAD_FORMATS
+    if fmt not in formats:
+        raise InvalidImage(
+            _('Upload an image in one of these formats: %s.') %
+            ', '.join(sorted(set(formats)))
+        )
+    if width * height > settings.PRODUCT_IMAGE_MAX_PIXELS:
+        raise InvalidImage(
+            _('Images may have at most %d pixels.') %
+            settings.PRODUCT_IMAGE_MAX_PIXELS
+        )
+
+    return fmt, width, height
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Stream image uploads to temporary files, checking them on the way
+
+    Each upload holds at most one chunk plus `HEADER_BYTES` in memory,
+    whatever its size. Request bodies over PRODUCT_IMAGE_MAX_BYTES are
+    refused from their Content-Length before a byte is read, files
+    growing past it as soon as they do, and files whose header is not
+    an acceptable image as soon as the header has arrived.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length and content_length > \
+                settings.PRODUCT_IMAGE_MAX_BYTES + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra
+        )
+        self.size = 0
+        self.head = b''
+        self.image_info = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.PRODUCT_IMAGE_MAX_BYTES:
+            self.abort()
+            raise UploadTooLarge()
+        if self.image_info is None:
+            self.head += raw_data[:HEADER_BYTES - len(self.head)]
+            self.inspect(complete=len(self.head) >= HEADER_BYTES)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.image_info is None:
+            self.inspect(complete=True)
+        self.head = b''
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.image_info = self.image_info
+        return self.file
+
+    def inspect(self, complete):
+        # Accept or refuse the image once its header is readable; until
+        # then, a truncated header is only an error at the end
+        try:
+            self.image_info = check_image(self.head)
+        except UnreadableImage as exc:
+            if complete:
+                self.reject(exc)
+        except InvalidImage as exc:
+            self.reject(exc)
+
+    def reject(self, exc):
+        self.abort()
+        raise ValidationError({self.field_name: [exc.args[0]]})
+
+    def abort(self):
+        # Closing the temporary file deletes it
+        self.file.close()
+
+
+class UploadImageField(serializers.FileField):
+    """An image field checked from its headers, never decoding the bitmap
+
+    Files streamed by `ImageUploadHandler` are already checked; others
+    have their first `HEADER_BYTES` read and checked the same way.
+    """
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        if getattr(file, 'image_info', None) is None:
+            if file.size > settings.PRODUCT_IMAGE_MAX_BYTES:
+                raise UploadTooLarge()
+            file.seek(0)
+            head = file.read(HEADER_BYTES)
+            file.seek(0)
+            try:
+                file.image_info = check_image(head)
+            except InvalidImage as exc:
+                raise ValidationError(exc.args[0])
+        return file
@@ -1,84 +1,207 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 
 from rest_framework import viewsets, mixins, status
 
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny, DjangoModelPermissionsOrAnonReadOnly
 
-from core.models import Tag, Category, Product
+from core.models import Tag, Category, Product, CollectionVersion
+from user.authentication import CachedTokenAuthentication
 from product.permissions import IsSupplierOrReadOnly
+from product.pagination import KeysetPagination
+from product.filters import ProductFilter, ProductAttrFilter
+from product.optimization import QuerysetOptimizationMixin
+from product.conditional import ConditionalReadMixin
+from product.cache import CachedResponseMixin, catalog_cache
+from product.listing import ListingReadMixin
+from product.search import SearchMixin
+from product.facets import FacetsMixin
+from product.fast import FastListMixin
+from product.images import enqueue_image_job
+from product.uploads import ImageUploadHandler
+from product.bulk import (
+    PARSERS, AttrBulkWriter, BulkTagsSerializer, ProductImporter,
+    assign_tags, decode_lines, iter_export
+)
 from product import serializers
 
 
-class BaseProductAttrViewset(viewsets.GenericViewSet,
+class BaseProductAttrViewset(ConditionalReadMixin,
+                             FastListMixin,
+                             viewsets.GenericViewSet,
                              mixins.ListModelMixin,
                              mixins.CreateModelMixin):
     """Base viewset for user owned product attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsSupplierOrReadOnly,)
+    pagination_class = KeysetPagination
+    keyset_ordering = '-name'
+
+    # Serializer adding `product_count`, for `with_counts=1`
+    count_serializer_class = None
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
+        queryset = ProductAttrFilter(self.request.query_params).filter(
+            self.queryset
         )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(product__isnull=False)
+        if not self.request.user.is_authenticated:
+            # Reads are open to anyone, but anonymous users own nothing
+            queryset = queryset.none()
+        else:
+            queryset = queryset.filter(user=self.request.user)
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.order_by('-name')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and \
+                ProductAttrFilter(self.request.query_params).with_counts:
+            return self.count_serializer_class
+
+        return super().get_serializer_class()
+
+    def get_version_keys(self):
+        # Counts change with the user's products, not only their own rows
+        keys = super().get_version_keys()
+        if ProductAttrFilter(self.request.query_params).reads_counts:
+            keys += CollectionVersion.objects.keys(
+                'products', self.request.user
+            )
+        return keys
 
     def perform_create(self, serializer):
         """Create a new object"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # A concurrent create took the name after it was validated
+            name = serializer.validated_data['name']
+            raise ValidationError({'name': [serializer.name_taken(name)]})
+
+    def get_bulk_items(self, request):
+        # The request body must be a list of at most API_MAX_BULK_ITEMS
+        limit = settings.API_MAX_BULK_ITEMS
+        if not isinstance(request.data, list):
+            raise ValidationError({'detail': ['Expected a list of items.']})
+        if len(request.data) > limit:
+            raise ValidationError(
+                {'detail': [f'Send at most {limit} items at a time.']}
+            )
+        return request.data
+
+    def bulk_response(self, results, success_status):
+        counts = Counter(result['status'] for result in results)
+        code = success_status
+        if results and counts[AttrBulkWriter.INVALID] == len(results):
+            code = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            'counts': dict(counts),
+            'results': results,
+        }, status=code)
+
+    @action(methods=['POST', 'PUT'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create a list of objects, or upsert them by name with PUT"""
+        upsert = request.method == 'PUT'
+        results = AttrBulkWriter(self.queryset.model, request.user).write(
+            self.get_bulk_items(request), upsert=upsert
+        )
+        created = any(
+            result['status'] == AttrBulkWriter.CREATED for result in results
+        )
+
+        return self.bulk_response(
+            results,
+            status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete the objects of a list of IDs"""
+        results = AttrBulkWriter(self.queryset.model, request.user).delete(
+            self.get_bulk_items(request)
+        )
+
+        return self.bulk_response(results, status.HTTP_200_OK)
 
 
 class TagViewSet(BaseProductAttrViewset):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
+    version_collections = ('tags',)
 
 
 class CategoryViewSet(BaseProductAttrViewset):
     # Manage categories in the database
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
+    count_serializer_class = serializers.CategoryCountSerializer
+    version_collections = ('categories',)
 
 
-class MyProductViewset(viewsets.ReadOnlyModelViewSet):
+class MyProductViewset(ConditionalReadMixin,
+                       CachedResponseMixin,
+                       SearchMixin,
+                       ListingReadMixin,
+                       FastListMixin,
+                       QuerysetOptimizationMixin,
+                       viewsets.ReadOnlyModelViewSet):
     # Manage products in the database
 
     serializer_class = serializers.ProductSerializer
     queryset = Product.objects.all()
+    pagination_class = KeysetPagination
+    keyset_ordering = '-pk'
+    version_collections = ('products',)
+    version_per_user = False
+    response_cache = catalog_cache
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
 
 
-class ProductViewset(viewsets.ModelViewSet, ):
+class ProductViewset(ConditionalReadMixin,
+                     SearchMixin,
+                     FacetsMixin,
+                     ListingReadMixin,
+                     FastListMixin,
+                     QuerysetOptimizationMixin,
+                     viewsets.ModelViewSet):
     # Manage products in the database
 
     serializer_class = serializers.ProductSerializer
     queryset = Product.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = '-pk'
+    # Details nest tag and category names, so their writes count too
+    version_collections = ('products', 'tags', 'categories')
+    # Streams image uploads to disk; None keeps Django's upload handlers
+    upload_handler_class = ImageUploadHandler
 
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
 
     def get_queryset(self):
         # Retrieve the products to the authenticated user
-        tags = self.request.query_params.get('tags')
-        categories = self.request.query_params.get('categories')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if categories:
-            category_ids = self._params_to_ints(categories)
-            queryset = queryset.filter(categories__id__in=category_ids)
+        category_field = 'category_id' if self.reads_listing() \
+            else 'categories_id'
+        queryset = ProductFilter(self.request.query_params).filter(
+            self.get_source_queryset(), category_field=category_field
+        )
 
         return queryset.filter(user=self.request.user)
 
@@ -89,7 +212,7 @@ class ProductViewset(viewsets.ModelViewSet, ):
         elif self.action == 'upload_image':
             return serializers.ProductImageSerializer
 
-        return self.serializer_class
+        return super().get_serializer_class()
 
     def perform_create(self, serializer):
         """Create a new product"""
@@ -99,6 +222,8 @@ class ProductViewset(viewsets.ModelViewSet, ):
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         # Upload an image to the product
+        if self.upload_handler_class is not None:
+            request.upload_handlers = [self.upload_handler_class(request)]
         product = self.get_object()
         serializer = self.get_serializer(
             product,
@@ -106,7 +231,7 @@ class ProductViewset(viewsets.ModelViewSet, ):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            enqueue_image_job(serializer.save())
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -116,3 +241,55 @@ class ProductViewset(viewsets.ModelViewSet, ):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST'], detail=False, url_path='bulk-tags')
+    def bulk_tags(self, request):
+        # Add, remove or replace tags on many products at once
+        serializer = BulkTagsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        report = assign_tags(
+            request.user, data['products'], data['tags'], data['mode']
+        )
+
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(methods=['POST'], detail=False, url_path='import')
+    def import_products(self, request):
+        # Stream NDJSON or CSV products from the request body
+        fmt = 'csv' if 'csv' in request.content_type else 'ndjson'
+        if request.stream is None:
+            return Response(
+                {'detail': 'Request body is empty.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = PARSERS[fmt](decode_lines(request.stream))
+        report = ProductImporter(request.user).run(rows)
+        code = status.HTTP_201_CREATED if report['created'] else \
+            status.HTTP_400_BAD_REQUEST
+
+        return Response(report, status=code)
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export_products(self, request):
+        # Stream the user's products as NDJSON or CSV
+        fmt = request.query_params.get('type', 'ndjson')
+        if fmt not in PARSERS:
+            return Response(
+                {'type': [f'Choose one of: {", ".join(PARSERS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type = {
+            'ndjson': 'application/x-ndjson',
+            'csv': 'text/csv',
+        }[fmt]
+        queryset = Product.objects.filter(user=request.user)
+
+        response = StreamingHttpResponse(
+            iter_export(queryset, fmt),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="products.{fmt}"'
+        return response
@@ -0,0 +1,135 @@
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+
+token_cache = LRUCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL
+)
+
+# When each token was last invalidated in this process, kept past the
+# life of any local entry looked up before it
+invalidated_at = LRUCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=2 * settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+def token_digest(key):
+    """Return the cache key for a token, never the token itself"""
+    return 'authtoken:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _shared_cache():
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def _user_fields():
+    # Every concrete column of the user but its password hash
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def dump_entry(user, token, generation):
+    """Return what the shared tier keeps for a token
+
+    The user's password hash is left out; it is loaded from the
+    database should a view ever read it.
+    """
+    return {
+        'generation': generation,
+        'user': [getattr(user, name) for name in _user_fields()],
+        'created': token.created,
+    }
+
+
+def load_entry(key, entry):
+    # Rebuild `(user, token)` from `dump_entry` without a query
+    model = get_user_model()
+    user = model.from_db(
+        router.db_for_read(model), _user_fields(), entry['user']
+    )
+    token = Token.from_db(
+        router.db_for_read(Token), ['key', 'user_id', 'created'],
+        [key, user.pk, entry['created']]
+    )
+    token.user = user
+    return (user, token)
+
+
+def invalidate_token(key):
+    """Drop a token from the local and the shared cache tier
+
+    The shared tier also bumps the token's generation, so an entry that
+    a request looked up before now and writes afterwards is ignored.
+    """
+    digest = token_digest(key)
+    invalidated_at.set(digest, time.monotonic())
+    token_cache.delete(digest)
+    shared = _shared_cache()
+    if shared is not None:
+        generation = f'{digest}:generation'
+        shared.add(generation, 0, None)
+        try:
+            shared.incr(generation)
+        except ValueError:
+            # Evicted between add and incr
+            shared.set(generation, 1, None)
+        shared.delete(digest)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token and its user
+
+    Lookups hit an in-process LRU first and then the optional shared
+    cache named by `AUTH_TOKEN_SHARED_CACHE` before falling back to the
+    database. Entries are invalidated by `user.signals` when the token
+    is deleted or the user is saved; the local TTL bounds how long other
+    workers can serve a stale entry.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        cached = token_cache.get(digest)
+        if cached is not None:
+            looked_up, entry = cached
+            if looked_up > invalidated_at.get(digest, float('-inf')):
+                user, token = entry
+                # Hand out a copy so views cannot mutate the cached user
+                return (copy.copy(user), token)
+
+        looked_up = time.monotonic()
+        entry = None
+        shared = _shared_cache()
+        if shared is not None:
+            generation_key = f'{digest}:generation'
+            found = shared.get_many([digest, generation_key])
+            generation = found.get(generation_key, 0)
+            stored = found.get(digest)
+            if stored is not None and stored['generation'] == generation:
+                entry = load_entry(key, stored)
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            if shared is not None:
+                shared.set(
+                    digest, dump_entry(*entry, generation),
+                    settings.AUTH_TOKEN_SHARED_CACHE_TTL
+                )
+        token_cache.set(digest, (looked_up, entry))
+
+        user, token = entry
+        return (copy.copy(user), token)
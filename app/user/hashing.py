@@ -0,0 +1,115 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import partial
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import hashers
+from django.db import connections
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import Throttled
+
+
+class HashingBusy(Throttled):
+    default_detail = _('Too many sign-ins in progress, please retry.')
+    default_code = 'hashing_busy'
+
+
+class BoundedExecutor:
+    """Thread pool refusing work once `workers + queue_size` are pending
+
+    Password hashing releases the GIL, so a few threads use the cores
+    while the request threads wait on them. Past the bound, or when the
+    work is still queued after `timeout`, callers get a `HashingBusy`
+    (HTTP 429) instead of queueing without limit. Work that has started
+    is always waited for.
+    """
+
+    def __init__(self, workers, queue_size):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hash'
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, fn, *args, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy(wait=settings.PASSWORD_HASH_RETRY_AFTER)
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda future: self._slots.release())
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise HashingBusy(wait=settings.PASSWORD_HASH_RETRY_AFTER)
+            return future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """Return this process's executor, created lazily after any fork"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = BoundedExecutor(
+                settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run(fn, *args):
+    return executor().run(fn, *args, timeout=settings.PASSWORD_HASH_TIMEOUT)
+
+
+def make_password(password):
+    """Hash a password on the executor"""
+    return run(hashers.make_password, password)
+
+
+def _with_connections(shared, fn, *args, **kwargs):
+    # Run on the caller's database connections, so the work sees its
+    # transaction and opens none of its own
+    for alias, connection in shared.items():
+        connections[alias] = connection
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        for alias in shared:
+            del connections[alias]
+
+
+def authenticate(request=None, **credentials):
+    """Run `django.contrib.auth.authenticate` on the executor
+
+    The configured backends, `is_active` checks and `user_login_failed`
+    all apply; `ModelBackend` also upgrades stored hashes whose hasher
+    or cost is out of date, so the cost can be tuned without breaking
+    existing passwords. The caller blocks until the work finishes, so
+    its connections are lent to the executor thread meanwhile.
+    """
+    shared = {connection.alias: connection
+              for connection in connections.all()}
+    for connection in shared.values():
+        connection.inc_thread_sharing()
+    try:
+        return executor().run(
+            partial(_with_connections, shared, auth.authenticate,
+                    request, **credentials),
+            timeout=settings.PASSWORD_HASH_TIMEOUT
+        )
+    finally:
+        for connection in shared.values():
+            connection.dec_thread_sharing()
@@ -1,8 +1,10 @@
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from user import hashing
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object"""
@@ -14,7 +16,10 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create a new user with encrypted password and return it"""
-        return get_user_model().objects.create_user(**validated_data)
+        password = hashing.make_password(validated_data.pop('password'))
+        return get_user_model().objects.create_user_from_hash(
+            encoded_password=password, **validated_data
+        )
 
     def update(self, instance, validated_data):
         # Update a user, setting the password correctly and return it
@@ -22,7 +27,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            user.password = hashing.make_password(password)
             user.save()
 
         return user
@@ -41,7 +46,7 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
+        user = hashing.authenticate(
             request=self.context.get('request'),
             username=email,
             password=password
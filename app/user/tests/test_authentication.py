@@ -0,0 +1,135 @@
+import pickle
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user.authentication import (
+    CachedTokenAuthentication, token_cache, token_digest
+)
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating requests through the token cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='root@root.com',
+            password='Welcome1234',
+            name='Root'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_token_lookup_is_cached(self):
+        # Test that only the first request looks the token up
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_not_cached(self):
+        # Test that unknown tokens keep failing
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(token_cache), 0)
+
+    def test_deleted_token_rejected(self):
+        # Test that deleting a token evicts it from the cache
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        # Test that deactivating a user evicts their token
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_refreshes_user(self):
+        # Test that a password change through the API drops the entry
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        self.assertEqual(len(token_cache), 0)
+
+
+@override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+class SharedTokenCacheTests(TestCase):
+    """Test the shared tier of the token cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='root@root.com',
+            password='Welcome1234',
+            name='Root'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.clear()
+        cache.clear()
+
+    def test_shared_entry_without_password(self):
+        # Test that another worker rebuilds the user without the hash
+        self.auth.authenticate_credentials(self.token.key)
+        entry = cache.get(token_digest(self.token.key))
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(entry))
+        self.assertEqual(user.email, 'root@root.com')
+        self.assertEqual(token.key, self.token.key)
+        self.assertTrue(user.check_password('Welcome1234'))
+
+    def test_late_write_after_invalidation_ignored(self):
+        # Test that a lookup racing an invalidation is not served later
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def racing(auth, key):
+            entry = lookup(auth, key)
+            self.user.save()
+            return entry
+
+        with patch.object(TokenAuthentication, 'authenticate_credentials',
+                          racing):
+            self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.token.key)
@@ -0,0 +1,172 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model, user_login_failed
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashing
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+
+def saturated_executor():
+    # An executor whose only slot is held until the returned event is set
+    executor = hashing.BoundedExecutor(workers=1, queue_size=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    threading.Thread(target=executor.run, args=(hold,)).start()
+    started.wait(5)
+    return executor, release
+
+
+class BoundedExecutorTests(SimpleTestCase):
+    # Test the back-pressure of the hashing executor
+
+    def test_runs_work(self):
+        executor = hashing.BoundedExecutor(workers=2, queue_size=1)
+
+        self.assertEqual(executor.run(pow, 2, 10), 1024)
+
+    def test_rejects_past_queue_limit(self):
+        executor, release = saturated_executor()
+
+        with self.assertRaises(hashing.HashingBusy) as context:
+            executor.run(pow, 2, 10)
+
+        self.assertEqual(context.exception.status_code, 429)
+        release.set()
+
+    def test_slot_freed_when_work_finishes(self):
+        executor, release = saturated_executor()
+        release.set()
+        executor._executor.shutdown(wait=True)
+
+        self.assertTrue(executor._slots.acquire(blocking=False))
+
+
+class PasswordHashingApiTests(TestCase):
+    # Test that login and signup hash passwords through the executor
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_busy_login_returns_429(self):
+        get_user_model().objects.create_user('root@root.com', 'Welcome1234')
+        executor, release = saturated_executor()
+
+        with patch('user.hashing.executor', return_value=executor):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'root@root.com', 'password': 'Welcome1234'
+            })
+        release.set()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_busy_signup_returns_429(self):
+        executor, release = saturated_executor()
+
+        with patch('user.hashing.executor', return_value=executor):
+            res = self.client.post(CREATE_USER_URL, {
+                'email': 'new@root.com', 'password': 'Welcome1234',
+                'name': 'New'
+            })
+        release.set()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(get_user_model().objects.exists())
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_signup_uses_configured_cost(self):
+        self.client.post(CREATE_USER_URL, {
+            'email': 'new@root.com', 'password': 'Welcome1234', 'name': 'New'
+        })
+
+        user = get_user_model().objects.get(email='new@root.com')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('Welcome1234'))
+
+    def test_login_rehashes_outdated_cost(self):
+        # Test a changed cost upgrades stored hashes without a reset
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            get_user_model().objects.create_user(
+                'root@root.com', 'Welcome1234'
+            )
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'root@root.com', 'password': 'Welcome1234'
+            })
+            user = get_user_model().objects.get(email='root@root.com')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+            self.assertTrue(user.check_password('Welcome1234'))
+
+    def test_wrong_password_keeps_hash(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                'root@root.com', 'Welcome1234'
+            )
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'root@root.com', 'password': 'wrong'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_inactive_user_rejected(self):
+        get_user_model().objects.create_user(
+            'root@root.com', 'Welcome1234', is_active=False
+        )
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'root@root.com', 'password': 'Welcome1234'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_failed_login_signalled(self):
+        # Test that failures go through `django.contrib.auth.authenticate`
+        get_user_model().objects.create_user('root@root.com', 'Welcome1234')
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials['username'])
+
+        user_login_failed.connect(receiver)
+        try:
+            self.client.post(TOKEN_URL, {
+                'email': 'root@root.com', 'password': 'wrong'
+            })
+        finally:
+            user_login_failed.disconnect(receiver)
+
+        self.assertEqual(failures, ['root@root.com'])
+
+    @override_settings(AUTHENTICATION_BACKENDS=[
+        'django.contrib.auth.backends.AllowAllUsersModelBackend'
+    ])
+    def test_configured_backends_apply(self):
+        get_user_model().objects.create_user(
+            'root@root.com', 'Welcome1234', is_active=False
+        )
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'root@root.com', 'password': 'Welcome1234'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)